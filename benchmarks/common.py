@@ -0,0 +1,202 @@
+"""
+Benchmark Helpers
+Latency summaries, JSON result files and a seeded database for benchmarks.
+"""
+# --------------------------------------------------------------------------------
+import json
+import math
+import os
+import platform
+import sys
+from datetime import datetime
+
+from bot_instance import SQL_URL_RC
+from database.models import (
+    Base,
+    Event,
+    Questionary,
+    RegEvent,
+    User,
+    UserXEvent,
+    Vacancy,
+    async_session,
+    engine,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BENCH_EVENT = "event01_01_30"
+PAST_EVENT = "event01_01_29"
+SCANNER_ID = 1
+FIRST_USER_ID = 1000
+
+
+# --------------------------------------------------------------------------------
+def require_bench_db() -> None:
+    """
+    Refuse to run against the configured production database.
+
+    Benchmarks drop and re-create all tables, so an explicit DB_URL
+    pointing at a throwaway database is required.
+
+    Returns:
+        None
+    """
+    if not os.getenv("DB_URL"):
+        sys.exit(
+            "Укажите DB_URL тестовой базы, например "
+            "DB_URL=sqlite+aiosqlite:///bench.db DB_ECHO=0 python -m benchmarks.load_test"
+        )
+
+
+# --------------------------------------------------------------------------------
+def percentile(samples: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        samples (list[float]): Sorted samples.
+        q (float): Percentile in [0, 100].
+
+    Returns:
+        float: Percentile value or 0.0 for no samples.
+    """
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+# --------------------------------------------------------------------------------
+def summarize(samples: list[float]) -> dict:
+    """
+    Summarize latencies in milliseconds.
+
+    Args:
+        samples (list[float]): Latencies in seconds.
+
+    Returns:
+        dict: count, mean, p50, p95, p99 and max in milliseconds.
+    """
+    ordered = sorted(samples)
+    ms = lambda value: round(value * 1000, 3)
+    return {
+        "count": len(ordered),
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+# --------------------------------------------------------------------------------
+def write_results(name: str, results: dict, params: dict) -> str:
+    """
+    Store a benchmark run as JSON for later comparison.
+
+    Args:
+        name (str): Benchmark name used as the file prefix.
+        results (dict): Measured values.
+        params (dict): Run parameters.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    started = datetime.utcnow()
+    path = os.path.join(RESULTS_DIR, f"{name}-{started.strftime('%Y%m%dT%H%M%S')}.json")
+    document = {
+        "benchmark": name,
+        "created_at": started.isoformat(),
+        "python": platform.python_version(),
+        "database": SQL_URL_RC.split("://", 1)[0],
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return path
+
+
+# --------------------------------------------------------------------------------
+def user_ids(count: int) -> list[int]:
+    """
+    Identifiers of seeded users.
+
+    Args:
+        count (int): Number of users.
+
+    Returns:
+        list[int]: User identifiers.
+    """
+    return list(range(FIRST_USER_ID, FIRST_USER_ID + count))
+
+
+# --------------------------------------------------------------------------------
+def scanner_ids(count: int) -> list[int]:
+    """
+    Identifiers of seeded face control scanners, starting with SCANNER_ID.
+
+    Args:
+        count (int): Number of scanners.
+
+    Returns:
+        list[int]: Scanner identifiers.
+    """
+    return list(range(SCANNER_ID, SCANNER_ID + count))
+
+
+# --------------------------------------------------------------------------------
+async def seed_database(users: int, registered: int, scanners: int = 1) -> None:
+    """
+    Re-create the schema and fill it with a synthetic club.
+
+    Creates `scanners` superuser scanners, `users` users with questionnaires, one
+    active event with the first `registered` users registered on it, a
+    past event they all attended and a vacancy for the questionnaire.
+
+    Args:
+        users (int): Number of regular users.
+        registered (int): Users registered on BENCH_EVENT.
+        scanners (int): Scanner accounts, fewer than FIRST_USER_ID.
+
+    Returns:
+        None
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    ids = user_ids(users)
+    async with async_session() as session:
+        session.add_all(
+            User(id=scanner_id, handler=f"scanner{scanner_id}", is_superuser=True)
+            for scanner_id in scanner_ids(scanners)
+        )
+        session.add(Event(
+            name=BENCH_EVENT, desc="Нагрузочный тест", date="01.01.30",
+            time="18:00", place="ауд. 101", status="in_progress",
+        ))
+        session.add(Event(
+            name=PAST_EVENT, desc="Прошлое событие", date="01.01.29",
+            time="18:00", place="ауд. 101", status="ended",
+        ))
+        session.add(Vacancy(name="Аналитик"))
+        session.add_all(
+            User(id=user_id, handler=f"user{user_id}", money=user_id % 97)
+            for user_id in ids
+        )
+        await session.flush()
+        session.add_all(Questionary(user_id=user_id) for user_id in ids)
+        session.add_all(
+            UserXEvent(user_id=user_id, event_name=BENCH_EVENT, status="reg", first_contact="0")
+            for user_id in ids[:registered]
+        )
+        session.add_all(
+            UserXEvent(user_id=user_id, event_name=PAST_EVENT, status="been", first_contact="0")
+            for user_id in ids[:registered]
+        )
+        session.add_all(
+            RegEvent(id=user_id, name="Иван", surname="Иванов", phone="+70000000000")
+            for user_id in ids[:registered]
+        )
+        await session.commit()
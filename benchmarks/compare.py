@@ -0,0 +1,86 @@
+"""
+Benchmark Compare
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/micro-OLD.json benchmarks/results/micro-NEW.json
+
+Exits with status 1 when a p50 grew by more than --threshold, so the
+command can gate CI.
+"""
+# --------------------------------------------------------------------------------
+import argparse
+import json
+import sys
+
+
+# --------------------------------------------------------------------------------
+def flatten(results: dict, prefix: str = "") -> dict[str, dict]:
+    """
+    Collect latency summaries from nested results.
+
+    Args:
+        results (dict): Results section of a result file.
+        prefix (str): Name prefix of the current level.
+
+    Returns:
+        dict[str, dict]: Summaries by dotted name.
+    """
+    found = {}
+    for name, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        path = f"{prefix}{name}"
+        if "p50_ms" in value:
+            found[path] = value
+        found.update(flatten(value, path + "."))
+    return found
+
+
+# --------------------------------------------------------------------------------
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """
+    Print a side-by-side p50/p95 table.
+
+    Args:
+        old (dict): Baseline result file.
+        new (dict): Candidate result file.
+        threshold (float): Allowed relative p50 growth, e.g. 0.2.
+
+    Returns:
+        list[str]: Names of regressed benchmarks.
+    """
+    before, after = flatten(old["results"]), flatten(new["results"])
+    regressed = []
+    print(f"{'benchmark':<48}{'p50 old':>10}{'p50 new':>10}{'p95 old':>10}{'p95 new':>10}{'change':>9}")
+    for name in sorted(before.keys() & after.keys()):
+        a, b = before[name], after[name]
+        change = (b["p50_ms"] - a["p50_ms"]) / a["p50_ms"] if a["p50_ms"] else 0.0
+        mark = ""
+        if change > threshold:
+            regressed.append(name)
+            mark = " !"
+        print(f"{name:<48}{a['p50_ms']:>10}{b['p50_ms']:>10}{a['p95_ms']:>10}{b['p95_ms']:>10}"
+              f"{change:>+9.0%}{mark}")
+    return regressed
+
+
+# --------------------------------------------------------------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 growth")
+    args = parser.parse_args()
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    regressed = compare(old, new, args.threshold)
+    if regressed:
+        print(f"\nРегрессия: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+# --------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
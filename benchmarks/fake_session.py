@@ -0,0 +1,58 @@
+"""
+Fake Bot Session
+Bot API session answering every request locally with a simulated round trip.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import time
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe, TelegramMethod
+from aiogram.types import Message, User
+
+
+# --------------------------------------------------------------------------------
+class FakeSession(BaseSession):
+    """
+    Session that never touches the network.
+
+    Methods returning a Message get a message echoing the request text,
+    GetMe gets a bot user and everything else gets True.
+
+    Args:
+        latency (float): Simulated Bot API round trip in seconds.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls[method.__api_method__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Bench", username="bench_bot")
+        if method.__returning__ is Message:
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", None) or 0
+            return Message.model_validate(
+                {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": getattr(method, "text", None) or getattr(method, "caption", None),
+                },
+                context={"bot": bot},
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,314 @@
+"""
+Load Test
+Replay synthetic updates through the real dispatcher and report latency.
+
+Run against a throwaway database, the schema is re-created:
+
+    DB_URL=sqlite+aiosqlite:///bench.db DB_ECHO=0 python -m benchmarks.load_test --users 2000
+
+Each scenario is a set of per-user sessions; updates of one session are
+fed in order, sessions run concurrently. Bot API calls are answered by
+FakeSession after --api-latency seconds and the send queue rate limit is
+lifted to --send-rate, so results measure the bot itself. Scans in
+qr_scan are spread over --scanners face control chats: replies to one
+chat are sent one at a time, so with a single scanner the latency would
+mostly be the wait in that chat's send queue rather than check-in cost.
+"""
+# --------------------------------------------------------------------------------
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject, Update
+
+from benchmarks.common import (
+    BENCH_EVENT,
+    require_bench_db,
+    scanner_ids,
+    seed_database,
+    summarize,
+    user_ids,
+    write_results,
+)
+from benchmarks.fake_session import FakeSession
+from bot_instance import bot
+from confige import BotConfig
+from database.checkin_cache import checkin_cache
+from database.event_cache import event_cache
+from database.role_cache import role_cache
+from handlers.quest import Questionnaire
+from handlers.qr_utils import make_qr_token
+from handlers.send_queue import send_queue
+from keyboards.callbacks import VerifyQr
+from main import register_routers
+
+SCENARIOS = ("start", "qr_scan", "questionnaire", "top")
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+# --------------------------------------------------------------------------------
+class HandlerRecorder(BaseMiddleware):
+    """
+    Inner middleware collecting raw handler durations.
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        callback = data["handler"].callback
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.samples[callback.__name__].append(time.perf_counter() - started)
+
+
+# --------------------------------------------------------------------------------
+def _from_user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "Бенч", "username": f"user{user_id}"}
+
+
+# --------------------------------------------------------------------------------
+def message_update(user_id: int, text: str) -> Update:
+    """
+    Build a private text message update.
+
+    Args:
+        user_id (int): Sender and chat identifier.
+        text (str): Message text.
+
+    Returns:
+        Update: Update mounted to the bot.
+    """
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _from_user(user_id),
+            "text": text,
+        },
+    }, context={"bot": bot})
+
+
+# --------------------------------------------------------------------------------
+def callback_update(user_id: int, data: str) -> Update:
+    """
+    Build an inline button press on a bot message.
+
+    Args:
+        user_id (int): Presser and chat identifier.
+        data (str): Callback data.
+
+    Returns:
+        Update: Update mounted to the bot.
+    """
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_message_ids)),
+            "from": _from_user(user_id),
+            "chat_instance": "bench",
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": bot.id, "is_bot": True, "first_name": "Bench"},
+                "text": "…",
+            },
+        },
+    }, context={"bot": bot})
+
+
+# --------------------------------------------------------------------------------
+async def _set_state(dp: Dispatcher, user_id: int, state) -> None:
+    key = StorageKey(bot_id=bot.id, chat_id=user_id, user_id=user_id)
+    await dp.storage.set_state(key, state)
+
+
+# --------------------------------------------------------------------------------
+async def build_sessions(dp: Dispatcher, scenario: str, args) -> list[list[Update]]:
+    """
+    Generate update sessions of a scenario.
+
+    Args:
+        dp (Dispatcher): Dispatcher whose FSM storage is prepared.
+        scenario (str): Scenario name.
+        args (argparse.Namespace): Run parameters.
+
+    Returns:
+        list[list[Update]]: Ordered updates per session.
+    """
+    seeded = user_ids(args.users)
+    if scenario == "start":
+        # New users following a registration deep link
+        fresh = range(seeded[-1] + 1, seeded[-1] + 1 + args.updates)
+        return [[message_update(user_id, f"/start reg_{BENCH_EVENT}")] for user_id in fresh]
+    if scenario == "qr_scan":
+        # Face control scans a pass and lets the attendee in, scanners take turns
+        attendees = seeded[:min(args.updates, args.registered)]
+        scanners = itertools.cycle(scanner_ids(args.scanners))
+        return [
+            [
+                message_update(scanner_id, f"/start {make_qr_token(user_id, BENCH_EVENT)}"),
+                callback_update(scanner_id, VerifyQr(user_id=user_id, event_name=BENCH_EVENT, action="allow").pack()),
+            ]
+            for user_id, scanner_id in zip(attendees, scanners)
+        ]
+    if scenario == "questionnaire":
+        # First part of the team application, one answer per step
+        applicants = seeded[:args.updates // 5]
+        for user_id in applicants:
+            await _set_state(dp, user_id, Questionnaire.full_name)
+        answers = ("Иванов Иван Иванович", "Бакалавриат", "2", "Экономика", "ivan@edu.hse.ru")
+        return [[message_update(user_id, text) for text in answers] for user_id in applicants]
+    if scenario == "top":
+        for user_id in seeded[:args.updates]:
+            await _set_state(dp, user_id, None)
+        return [[message_update(user_id, "/top")] for user_id in seeded[:args.updates]]
+    raise ValueError(scenario)
+
+
+# --------------------------------------------------------------------------------
+async def replay(dp: Dispatcher, sessions: list[list[Update]], concurrency: int) -> tuple[list[float], float]:
+    """
+    Feed sessions concurrently, updates of a session in order.
+
+    Args:
+        dp (Dispatcher): Dispatcher under test.
+        sessions (list[list[Update]]): Update sessions.
+        concurrency (int): Sessions processed at the same time.
+
+    Returns:
+        tuple[list[float], float]: Per-update latencies and wall time in seconds.
+    """
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_session(updates: list[Update]) -> None:
+        async with semaphore:
+            for update in updates:
+                started = time.perf_counter()
+                await dp.feed_update(bot, update)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(updates) for updates in sessions))
+    return latencies, time.perf_counter() - started
+
+
+# --------------------------------------------------------------------------------
+async def run(args) -> dict:
+    """
+    Seed the database and replay all selected scenarios.
+
+    Args:
+        args (argparse.Namespace): Run parameters.
+
+    Returns:
+        dict: Results per scenario.
+    """
+    await seed_database(args.users, args.registered, args.scanners)
+    session = FakeSession(latency=args.api_latency)
+    bot.session = session
+    send_queue.set_rate(args.send_rate)
+    await role_cache.load()
+    await event_cache.load()
+    await checkin_cache.load()
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp["config"] = BotConfig(admin_ids=[], welcome_message="")
+    register_routers(dp)
+    recorder = HandlerRecorder()
+    dp.message.middleware(recorder)
+    dp.callback_query.middleware(recorder)
+
+    results = {}
+    for scenario in args.scenarios:
+        sessions = await build_sessions(dp, scenario, args)
+        recorder.samples.clear()
+        session.calls.clear()
+        latencies, wall = await replay(dp, sessions, args.concurrency)
+        results[scenario] = {
+            "updates": len(latencies),
+            "wall_s": round(wall, 3),
+            "updates_per_sec": round(len(latencies) / wall, 1) if wall else 0.0,
+            "latency": summarize(latencies),
+            "handlers": {
+                name: {**summarize(samples), "updates_per_sec": round(len(samples) / wall, 1)}
+                for name, samples in recorder.samples.items()
+            },
+            "api_calls": dict(session.calls),
+        }
+    await checkin_cache.flush()
+    await send_queue.close()
+    return results
+
+
+# --------------------------------------------------------------------------------
+def print_report(results: dict) -> None:
+    """
+    Print a per-handler latency table.
+
+    Args:
+        results (dict): Results per scenario.
+
+    Returns:
+        None
+    """
+    header = f"{'scenario/handler':<40}{'n':>7}{'upd/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for scenario, result in results.items():
+        latency = result["latency"]
+        print(f"{scenario:<40}{latency['count']:>7}{result['updates_per_sec']:>9}"
+              f"{latency['p50_ms']:>9}{latency['p95_ms']:>9}{latency['p99_ms']:>9}")
+        for name, stats in result["handlers"].items():
+            print(f"  {name:<38}{stats['count']:>7}{stats['updates_per_sec']:>9}"
+                  f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+
+
+# --------------------------------------------------------------------------------
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест диспетчера")
+    parser.add_argument("--users", type=int, default=2000, help="seeded users")
+    parser.add_argument("--registered", type=int, default=1000, help="users registered on the event")
+    parser.add_argument("--updates", type=int, default=1000, help="updates per scenario")
+    parser.add_argument("--concurrency", type=int, default=100, help="sessions in flight")
+    parser.add_argument("--scanners", type=int, default=100, help="face control chats scanning passes in qr_scan")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="simulated Bot API round trip, s")
+    parser.add_argument("--send-rate", type=float, default=100000.0, help="send queue rate limit, msg/s")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    return parser.parse_args()
+
+
+# --------------------------------------------------------------------------------
+def main() -> None:
+    require_bench_db()
+    args = parse_args()
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    print_report(results)
+    print(f"\nРезультаты сохранены в {write_results('load_test', results, vars(args))}")
+
+
+# --------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Micro Benchmarks
+QR rendering, XLSX export and per-call latency of database helpers.
+
+Run against a throwaway database, the schema is re-created:
+
+    DB_URL=sqlite+aiosqlite:///bench.db DB_ECHO=0 python -m benchmarks.micro
+
+Results are written to benchmarks/results/micro-*.json; compare two runs
+with ``python -m benchmarks.compare OLD NEW``.
+"""
+# --------------------------------------------------------------------------------
+import argparse
+import asyncio
+import logging
+import random
+import string
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.common import (
+    BENCH_EVENT,
+    PAST_EVENT,
+    SCANNER_ID,
+    require_bench_db,
+    seed_database,
+    summarize,
+    user_ids,
+    write_results,
+)
+from benchmarks.fake_session import FakeSession
+from bot_instance import bot
+from database import req
+from handlers.qr_utils import create_styled_qr_code
+from handlers.send_queue import send_queue
+from statistics import stat
+
+
+# --------------------------------------------------------------------------------
+def measure(func, repeat: int) -> dict:
+    """
+    Time a synchronous call.
+
+    Args:
+        func (Callable[[], Any]): Call to time.
+        repeat (int): Number of runs.
+
+    Returns:
+        dict: Latency summary.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# --------------------------------------------------------------------------------
+async def measure_async(func, repeat: int) -> dict:
+    """
+    Time an asynchronous call run sequentially.
+
+    Args:
+        func (Callable[[], Awaitable]): Call to time.
+        repeat (int): Number of runs.
+
+    Returns:
+        dict: Latency summary.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# --------------------------------------------------------------------------------
+def bench_qr(sizes: list[int], repeat: int) -> dict:
+    """
+    Render QR codes of different payload sizes.
+
+    Args:
+        sizes (list[int]): Payload lengths in characters.
+        repeat (int): Runs per size.
+
+    Returns:
+        dict: Summary per payload size.
+    """
+    results = {}
+    for size in sizes:
+        payload = "https://t.me/bench_bot?start=" + "".join(random.choices(string.ascii_letters, k=size))
+        results[f"qr_render_{size}"] = measure(lambda: create_styled_qr_code(payload), repeat)
+    return results
+
+
+# --------------------------------------------------------------------------------
+def _write_xlsx(df: pd.DataFrame) -> bytes:
+    """
+    Write a sheet the way statistics.stat exporters do.
+
+    Args:
+        df (pd.DataFrame): Exported rows.
+
+    Returns:
+        bytes: XLSX file content.
+    """
+    with BytesIO() as buffer:
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name="Users")
+            writer.sheets["Users"].set_column('H:H', 50)
+        return buffer.getvalue()
+
+
+# --------------------------------------------------------------------------------
+def bench_xlsx(rows: list[int], repeat: int) -> dict:
+    """
+    Export user statistics sheets of different sizes.
+
+    Args:
+        rows (list[int]): Row counts.
+        repeat (int): Runs per size.
+
+    Returns:
+        dict: Summary per row count.
+    """
+    results = {}
+    for count in rows:
+        df = pd.DataFrame({
+            "ID": range(count),
+            "Handler": [f"user{i}" for i in range(count)],
+            "Is Superuser": False,
+            "Event Count": 3,
+            "Strick": 1,
+            "Money": 10,
+            "Referral Count": 0,
+            "Visited Events": "Нагрузочный тест (01.01.30 18:00)",
+        })
+        results[f"xlsx_export_{count}"] = measure(lambda: _write_xlsx(df), repeat)
+    return results
+
+
+# --------------------------------------------------------------------------------
+async def bench_stat(repeat: int) -> dict:
+    """
+    Run get_stat_* exporters end to end against the seeded database.
+
+    Args:
+        repeat (int): Runs per exporter.
+
+    Returns:
+        dict: Summary per exporter.
+    """
+    exporters = {
+        "get_stat_all": lambda: stat.get_stat_all(SCANNER_ID),
+        "get_stat_all_in_ev": lambda: stat.get_stat_all_in_ev(SCANNER_ID, PAST_EVENT),
+        "get_stat_quest": lambda: stat.get_stat_quest(SCANNER_ID),
+        "get_stat_reg": lambda: stat.get_stat_reg(SCANNER_ID, BENCH_EVENT),
+        "get_stat_reg_out": lambda: stat.get_stat_reg_out(SCANNER_ID, BENCH_EVENT),
+    }
+    return {name: await measure_async(func, repeat) for name, func in exporters.items()}
+
+
+# --------------------------------------------------------------------------------
+async def bench_db(users: int, registered: int, repeat: int) -> dict:
+    """
+    Time read and write helpers of database.req on random rows.
+
+    Args:
+        users (int): Seeded users.
+        registered (int): Users registered on the event.
+        repeat (int): Calls per helper.
+
+    Returns:
+        dict: Summary per helper.
+    """
+    ids = user_ids(users)
+    reg_ids = ids[:registered]
+    fresh = iter(range(ids[-1] + 1, ids[-1] + 1 + repeat))
+    any_user = lambda: random.choice(ids)
+    reg_user = lambda: random.choice(reg_ids)
+    calls = {
+        "get_user": lambda: req.get_user(any_user()),
+        "create_user": lambda: req.create_user(next(fresh), {"handler": "bench"}),
+        "add_money": lambda: req.add_money(any_user(), 1),
+        "get_event": lambda: req.get_event(BENCH_EVENT),
+        "get_user_x_event_row": lambda: req.get_user_x_event_row(reg_user(), BENCH_EVENT),
+        "update_user_x_event_row_status": lambda: req.update_user_x_event_row_status(
+            reg_user(), BENCH_EVENT, "reg"),
+        "get_reg_event": lambda: req.get_reg_event(reg_user()),
+        "get_all_user_events": lambda: req.get_all_user_events(reg_user()),
+        "get_check_in_view": lambda: req.get_check_in_view(reg_user(), BENCH_EVENT, SCANNER_ID),
+        "get_top_10_users_by_money": req.get_top_10_users_by_money,
+        "get_user_rank_by_money": lambda: req.get_user_rank_by_money(any_user()),
+        "get_reg_users": lambda: req.get_reg_users(BENCH_EVENT),
+        "get_users_unreg_tg_id": lambda: req.get_users_unreg_tg_id(BENCH_EVENT),
+    }
+    return {name: await measure_async(func, repeat) for name, func in calls.items()}
+
+
+# --------------------------------------------------------------------------------
+async def run(args) -> dict:
+    """
+    Run all benchmark groups.
+
+    Args:
+        args (argparse.Namespace): Run parameters.
+
+    Returns:
+        dict: Summary per benchmark.
+    """
+    results = {}
+    results.update(bench_qr(args.qr_sizes, args.repeat))
+    results.update(bench_xlsx(args.xlsx_rows, args.xlsx_repeat))
+    await seed_database(args.users, args.registered)
+    bot.session = FakeSession()
+    send_queue.set_rate(100000.0)
+    results.update(await bench_db(args.users, args.registered, args.repeat))
+    results.update(await bench_stat(args.xlsx_repeat))
+    await send_queue.close()
+    return results
+
+
+# --------------------------------------------------------------------------------
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Микробенчмарки QR, XLSX и запросов к БД")
+    parser.add_argument("--repeat", type=int, default=200, help="runs per QR size and DB helper")
+    parser.add_argument("--qr-sizes", type=int, nargs="+", default=[16, 128, 512], help="payload lengths")
+    parser.add_argument("--xlsx-rows", type=int, nargs="+", default=[1000, 10000, 100000], help="sheet sizes")
+    parser.add_argument("--xlsx-repeat", type=int, default=3, help="runs per sheet size and exporter")
+    parser.add_argument("--users", type=int, default=10000, help="seeded users")
+    parser.add_argument("--registered", type=int, default=2000, help="users registered on the event")
+    return parser.parse_args()
+
+
+# --------------------------------------------------------------------------------
+def main() -> None:
+    require_bench_db()
+    args = parse_args()
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    for name, summary in results.items():
+        print(f"{name:<40}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}")
+    print(f"\nРезультаты сохранены в {write_results('micro', results, vars(args))}")
+
+
+# --------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Unregistered Recipients Benchmark
+NOT IN subquery against the NOT EXISTS anti-join for the "post to unregistered" mailing.
+
+Run against a throwaway database, the schema is re-created:
+
+    DB_URL=postgresql+asyncpg://.../bench DB_ECHO=0 python -m benchmarks.unreg_query
+
+Both queries are timed with the (event_name, user_id) index and, with
+--without-index, again after dropping it; results are written to
+benchmarks/results/unreg_query-*.json.
+"""
+# --------------------------------------------------------------------------------
+import argparse
+import asyncio
+import logging
+import random
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import BENCH_EVENT, require_bench_db, seed_database, user_ids, write_results
+from benchmarks.micro import measure_async
+from database.models import Event, User, UserXEvent, async_session, engine
+from database.req import iter_users_unreg_tg_id, unreg_users_query
+
+INDEX_NAME = "ix_user_x_event_event_user"
+
+
+# --------------------------------------------------------------------------------
+def legacy_query(event_name: str):
+    """
+    Recipient query as it was before the anti-join rewrite.
+
+    Args:
+        event_name (str): Event name.
+
+    Returns:
+        Select: Query of User.id.
+    """
+    return select(User.id).where(
+        ~User.id.in_(
+            select(UserXEvent.user_id)
+            .where(UserXEvent.event_name == event_name)
+        )
+    ).where(User.delivery_status.is_(None))
+
+
+# --------------------------------------------------------------------------------
+async def seed_history(users: int, events: int, share: float) -> None:
+    """
+    Add past events with random registrations so user_x_event is large.
+
+    Args:
+        users (int): Seeded users.
+        events (int): Number of extra events.
+        share (float): Share of users registered on each event.
+
+    Returns:
+        None
+    """
+    ids = user_ids(users)
+    async with async_session() as session:
+        for number in range(events):
+            name = f"history{number:04d}"
+            session.add(Event(name=name, desc=name, date="01.01.20", time="18:00", place="-", status="ended"))
+            await session.flush()
+            await session.execute(
+                insert(UserXEvent),
+                [
+                    {"user_id": user_id, "event_name": name, "status": "been", "first_contact": "0"}
+                    for user_id in random.sample(ids, int(users * share))
+                ],
+            )
+        await session.commit()
+
+
+# --------------------------------------------------------------------------------
+async def fetch_all(query) -> list[int]:
+    async with async_session() as session:
+        return (await session.execute(query)).scalars().all()
+
+
+async def first_page() -> None:
+    async for _ in iter_users_unreg_tg_id(BENCH_EVENT):
+        return
+
+
+# --------------------------------------------------------------------------------
+async def bench(repeat: int) -> dict:
+    """
+    Time both queries, full fetch and the first streamed page.
+
+    Args:
+        repeat (int): Runs per query.
+
+    Returns:
+        dict: Summary per query.
+    """
+    legacy = await fetch_all(legacy_query(BENCH_EVENT))
+    anti_join = await fetch_all(unreg_users_query(BENCH_EVENT))
+    if sorted(legacy) != sorted(anti_join):
+        raise SystemExit("Запросы вернули разных получателей")
+    return {
+        "not_in": await measure_async(lambda: fetch_all(legacy_query(BENCH_EVENT)), repeat),
+        "not_exists": await measure_async(lambda: fetch_all(unreg_users_query(BENCH_EVENT)), repeat),
+        "not_exists_first_page": await measure_async(first_page, repeat),
+    }
+
+
+# --------------------------------------------------------------------------------
+async def run(args) -> dict:
+    """
+    Seed the database and run the benchmark, optionally also without the index.
+
+    Args:
+        args (argparse.Namespace): Run parameters.
+
+    Returns:
+        dict: Summaries by index presence.
+    """
+    await seed_database(args.users, args.registered)
+    await seed_history(args.users, args.events, args.share)
+    index = next(i for i in UserXEvent.__table__.indexes if i.name == INDEX_NAME)
+    results = {"with_index": await bench(args.repeat)}
+    if args.without_index:
+        # Without the index the correlated anti-join scans user_x_event per
+        # user on engines that cannot hash it, e.g. SQLite: keep sizes small
+        async with engine.begin() as conn:
+            await conn.run_sync(index.drop)
+        results["without_index"] = await bench(args.repeat)
+    return results
+
+
+# --------------------------------------------------------------------------------
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NOT IN против NOT EXISTS для рассылки незарегистрированным")
+    parser.add_argument("--repeat", type=int, default=50, help="runs per query")
+    parser.add_argument("--users", type=int, default=50000, help="seeded users")
+    parser.add_argument("--registered", type=int, default=5000, help="users registered on the event")
+    parser.add_argument("--events", type=int, default=50, help="past events in user_x_event")
+    parser.add_argument("--share", type=float, default=0.2, help="share of users registered per past event")
+    parser.add_argument("--without-index", action="store_true", help="also time both queries without the index")
+    return parser.parse_args()
+
+
+# --------------------------------------------------------------------------------
+def main() -> None:
+    require_bench_db()
+    args = parse_args()
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    for group, summaries in results.items():
+        print(group)
+        for name, summary in summaries.items():
+            print(f"  {name:<38}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['p99_ms']:>10}")
+    print(f"\nРезультаты сохранены в {write_results('unreg_query', results, vars(args))}")
+
+
+# --------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,8 @@ import logging
 import os
 import sys
 
+from monitoring.logs import parse_levels, setup_logging
+
 # --------------------------------------------------------------------------------
 # Add local lida module to path
 sys.path.append(os.path.join(sys.path[0], 'lida'))
@@ -22,11 +24,25 @@ load_dotenv('.env')
 # --------------------------------------------------------------------------------
 # Configuration constants
 token = os.getenv('TOKEN_API_TG')
-SQL_URL_RC = (
+# DB_URL overrides the Postgres settings, e.g. a local stand-in for benchmarks
+SQL_URL_RC = os.getenv('DB_URL') or (
     f'postgresql+asyncpg://{os.getenv("DB_USER")}:'
     f'{os.getenv("DB_PASS")}@{os.getenv("DB_HOST")}:'
     f'{os.getenv("DB_PORT")}/{os.getenv("DB_NAME")}'
 )
+# SQL statement logging at INFO of sqlalchemy.engine, off unless DB_ECHO=1 for debugging
+DB_ECHO = os.getenv('DB_ECHO', '0') not in ('0', 'false', 'False')
+# Secret for signing QR tokens; derived from the bot token when not set
+QR_SECRET = os.getenv('QR_SECRET')
+# Local Prometheus endpoint; METRICS_PORT=0 disables it
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+# Span export: JSONL file and/or OTLP/HTTP JSON collector, e.g. http://127.0.0.1:4318/v1/traces
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT')
+# Local timezone for scheduled posts and quiet hours window "HH-HH", e.g. "23-9"
+BOT_TZ = os.getenv('BOT_TZ', 'Europe/Moscow')
+QUIET_HOURS = os.getenv('QUIET_HOURS', '23-9')
 
 # --------------------------------------------------------------------------------
 # Initialize Bot instance
@@ -42,10 +58,15 @@ bot = Bot(
 )
 
 # --------------------------------------------------------------------------------
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+# Configure logging: records are written by a background thread
+LOG_LEVELS = parse_levels(os.getenv('LOG_LEVELS', ''))
+if DB_ECHO:
+    LOG_LEVELS.setdefault('sqlalchemy.engine', 'INFO')
+log_listener = setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'json'),
+    levels=LOG_LEVELS,
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', '1.0')),
 )
 logger = logging.getLogger(__name__)
 
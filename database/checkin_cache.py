@@ -0,0 +1,250 @@
+"""
+Check-in Cache
+In-memory registration index for active events with write-behind check-ins.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import time
+from typing import Awaitable, Callable, NamedTuple
+
+from bot_instance import logger
+from database.req import check_in, get_check_in_index, on_event_change
+from database.role_cache import role_cache
+from handlers.qr_utils import event_key
+
+RETRY_INTERVAL = 30.0
+
+
+# --------------------------------------------------------------------------------
+class Attendee(NamedTuple):
+    """
+    Attendee details shown on the scan screen.
+
+    Doubles as the user and the registration record for rendering, so
+    surname, name, fathername and phone are None without a RegEvent row.
+    """
+    id: int
+    handler: str
+    surname: str | None
+    name: str | None
+    fathername: str | None
+    phone: str | None
+
+
+# --------------------------------------------------------------------------------
+class CheckInCache:
+    """
+    Registrations of in-progress events indexed by user ID.
+
+    Scans are answered from memory; 'been' status flips are queued and
+    written to the database in batches with check_in, and stay queued while
+    the database is unavailable. Hooks registered with on_check_in are
+    awaited for every pair the database confirms as a new check-in, so
+    rewards are applied once. A queued check-in the database rejects,
+    because the registration is no longer 'reg' there, is logged, dropped
+    from the index and passed to the on_check_in_rejected hooks. Lookups the index cannot answer (unknown
+    registration, event or staff member) return None so the caller can
+    fall back to the database.
+
+    Events created or changed through database.req reload the index right
+    away via the on_event_change hook, so ended events stop being served.
+
+    Args:
+        flush_interval (float): Seconds between write-behind flushes.
+        refresh_interval (float): Seconds between full index reloads.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, refresh_interval: float = 300.0):
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self._events: dict = {}
+        self._event_keys: dict[bytes, str] = {}
+        self._attendees: dict[int, Attendee] = {}
+        self._statuses: dict[tuple[int, str], str] = {}
+        self._pending: dict[tuple[int, str], int] = {}
+        self._check_in_hooks: list[Callable[[int, str, int], Awaitable[None]]] = []
+        self._rejected_hooks: list[Callable[[int, str, int], Awaitable[None]]] = []
+        self._next_load = 0.0
+
+    # ----------------------------------------------------------------------------
+    async def load(self) -> bool:
+        """
+        Rebuild the index from the database keeping unflushed check-ins.
+
+        Returns:
+            bool: False if the database could not be read.
+        """
+        index = await get_check_in_index()
+        if not index:
+            self._next_load = time.monotonic() + min(self.refresh_interval, RETRY_INTERVAL)
+            return False
+        attendees = {}
+        statuses = {}
+        for user_id, event_name, status, handler, surname, name, fathername, phone in index['rows']:
+            attendees[user_id] = Attendee(user_id, handler, surname, name, fathername, phone)
+            statuses[(user_id, event_name)] = status
+        for key in self._pending:
+            if key in statuses:
+                statuses[key] = 'been'
+        self._events = {event.name: event for event in index['events']}
+        self._event_keys = {event_key(name): name for name in self._events}
+        self._attendees = attendees
+        self._statuses = statuses
+        self._next_load = time.monotonic() + self.refresh_interval
+        logger.info(f"Кэш проверки QR: {len(statuses)} регистраций, {len(self._events)} событий")
+        return True
+
+    # ----------------------------------------------------------------------------
+    def on_check_in(self, hook: Callable[[int, str, int], Awaitable[None]]) -> None:
+        """
+        Register a callback applying the effects of a confirmed check-in.
+
+        Args:
+            hook (Callable[[int, str, int], Awaitable[None]]): Awaited with
+                user ID, event name and the verifying staff member's ID.
+
+        Returns:
+            None
+        """
+        self._check_in_hooks.append(hook)
+
+    def on_check_in_rejected(self, hook: Callable[[int, str, int], Awaitable[None]]) -> None:
+        """
+        Register a callback for a queued check-in the database rejected.
+
+        Args:
+            hook (Callable[[int, str, int], Awaitable[None]]): Awaited with
+                user ID, event name and the verifying staff member's ID.
+
+        Returns:
+            None
+        """
+        self._rejected_hooks.append(hook)
+
+    async def _on_event_change(self, name: str) -> None:
+        await self.load()
+
+    # ----------------------------------------------------------------------------
+    def lookup(self, user_id: int, event_name: str, scanner_id: int) -> dict | None:
+        """
+        Build check-in view from memory.
+
+        Args:
+            user_id (int): Attendee Telegram ID from the QR code.
+            event_name (str): Event name from the QR code.
+            scanner_id (int): Telegram ID of the user who scanned the code.
+
+        Returns:
+            dict | None: Same keys as get_check_in_view or None on a miss.
+        """
+        event = self._events.get(event_name)
+        status = self._statuses.get((user_id, event_name))
+        if event is None or status is None:
+            return None
+        roles = role_cache.roles(scanner_id)
+        if not roles.staff and scanner_id != user_id:
+            # Staff granted after the last reload are only known to the database
+            return None
+        attendee = self._attendees[user_id]
+        return {
+            'user': attendee,
+            'event': event,
+            'status': status,
+            'reg_event': attendee if attendee.surname is not None else None,
+            'scanner_is_superuser': roles.superuser,
+            'scanner_is_face_control': roles.face_control,
+        }
+
+    # ----------------------------------------------------------------------------
+    def event_name_by_key(self, key: bytes) -> str | None:
+        """
+        Resolve short event key from a QR token.
+
+        Args:
+            key (bytes): Event key from the token.
+
+        Returns:
+            str | None: Name of the cached event or None.
+        """
+        return self._event_keys.get(key)
+
+    # ----------------------------------------------------------------------------
+    def mark_been(self, user_id: int, event_name: str, verified_by: int) -> bool | None:
+        """
+        Record a check-in in memory and queue it for writing.
+
+        Args:
+            user_id (int): Attendee Telegram ID.
+            event_name (str): Event name.
+            verified_by (int): Telegram ID of the staff member who let them in.
+
+        Returns:
+            bool | None: True for a new check-in, False if already checked
+                in or closed as a no-show, None if the registration is not cached.
+        """
+        key = (user_id, event_name)
+        status = self._statuses.get(key)
+        if status is None:
+            return None
+        if status != 'reg':
+            return False
+        self._statuses[key] = 'been'
+        self._pending[key] = verified_by
+        return True
+
+    # ----------------------------------------------------------------------------
+    async def flush(self) -> None:
+        """
+        Write queued check-ins in one UPDATE; keep them queued on failure
+        and report the ones the database rejects.
+
+        Returns:
+            None
+        """
+        if not self._pending:
+            return
+        batch = dict(self._pending)
+        checked_in = await check_in(list(batch))
+        if checked_in is None:
+            logger.warning(f"Не удалось записать {len(batch)} отметок о посещении, повтор позже")
+            return
+        for key in batch:
+            self._pending.pop(key, None)
+        for user_id, event_name in checked_in:
+            await self._run_hooks(self._check_in_hooks, user_id, event_name, batch[(user_id, event_name)])
+        for user_id, event_name in batch.keys() - set(checked_in):
+            # Changed in the database meanwhile, e.g. by mark_no_shows or another
+            # instance: forget the cached status so the next scan asks the database
+            logger.warning(f"Отметка о посещении {user_id} ({event_name}) отклонена базой данных: "
+                           f"регистрация уже не в статусе 'reg'")
+            self._statuses.pop((user_id, event_name), None)
+            await self._run_hooks(self._rejected_hooks, user_id, event_name, batch[(user_id, event_name)])
+
+    async def _run_hooks(self, hooks: list, user_id: int, event_name: str, verified_by: int) -> None:
+        for hook in hooks:
+            try:
+                await hook(user_id, event_name, verified_by)
+            except Exception as e:
+                logger.exception(f"Ошибка обработки отметки о посещении {user_id} ({event_name}): {e}")
+
+    # ----------------------------------------------------------------------------
+    async def run(self) -> None:
+        """
+        Keep the index fresh and flush check-ins until cancelled.
+
+        Returns:
+            None
+        """
+        try:
+            while True:
+                if time.monotonic() >= self._next_load:
+                    await self.load()
+                await self.flush()
+                await asyncio.sleep(self.flush_interval)
+        finally:
+            await self.flush()
+
+
+# --------------------------------------------------------------------------------
+checkin_cache = CheckInCache()
+on_event_change(checkin_cache._on_event_change)
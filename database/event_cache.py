@@ -0,0 +1,255 @@
+"""
+Event Cache
+In-memory events, giveaway hosts and per-user registration sets.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import time
+
+from bot_instance import logger
+from database.req import (
+    get_all_hosts_in_event_ids,
+    get_all_user_events,
+    get_event,
+    get_event_index,
+    get_user_event_names,
+    get_user_x_event_row,
+    on_event_change,
+    on_registration_change,
+)
+
+RETRY_INTERVAL = 30.0
+# Registration sets are re-read after this many seconds
+REGISTRATION_TTL = 300.0
+# Expired registration sets are pruned once this many users are cached
+REGISTRATION_CACHE_SIZE = 10000
+
+
+# --------------------------------------------------------------------------------
+class EventCache:
+    """
+    All events with the giveaway hosts of events in progress.
+
+    Only a handful of events are active at a time, so the whole set is
+    warmed at startup. Events created or changed through database.req are
+    refreshed right away by the on_event_change hook; other changes are
+    picked up by the periodic reload.
+
+    Active event names each user is registered on are cached for
+    REGISTRATION_TTL seconds and updated in place by the
+    on_registration_change hook when database.req adds or removes a
+    registration.
+
+    Args:
+        refresh_interval (float): Seconds between full reloads.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self._events: dict = {}
+        self._hosts: dict[str, frozenset[int]] = {}
+        self._registrations: dict[int, tuple[frozenset[str], float]] = {}
+        # Users whose registrations changed, to detect writes racing a read
+        self._touched: set[int] = set()
+        self._loaded = False
+
+    # ----------------------------------------------------------------------------
+    async def load(self) -> bool:
+        """
+        Reload events and hosts from the database.
+
+        Returns:
+            bool: False if the database could not be read; old data is kept.
+        """
+        index = await get_event_index()
+        self._loaded = bool(index)
+        if not index:
+            return False
+        hosts: dict[str, set[int]] = {}
+        for event_name, user_id in index['hosts']:
+            hosts.setdefault(event_name, set()).add(user_id)
+        self._events = {event.name: event for event in index['events']}
+        self._hosts = {event_name: frozenset(ids) for event_name, ids in hosts.items()}
+        # Sets only cover events active when they were read
+        self._registrations.clear()
+        self._touched.clear()
+        logger.info(f"Кэш событий: {len(self._events)} событий, активных {len(self.active_names())}")
+        return True
+
+    # ----------------------------------------------------------------------------
+    async def refresh(self, name: str) -> None:
+        """
+        Reload the cache after an event or its hosts changed; the set is
+        small enough to be re-read whole.
+
+        Args:
+            name (str): Changed event name.
+
+        Returns:
+            None
+        """
+        if not await self.load():
+            # Database error: forget the event so lookups fall back to queries
+            self._events.pop(name, None)
+            self._hosts.pop(name, None)
+
+    # ----------------------------------------------------------------------------
+    def names(self) -> list[str]:
+        """
+        Names of all events, for keyboards.
+
+        Returns:
+            list[str]: Event names.
+        """
+        return list(self._events)
+
+    def active_names(self) -> list[str]:
+        """
+        Names of events in progress, for keyboards.
+
+        Returns:
+            list[str]: Event names.
+        """
+        return [name for name, event in self._events.items() if event.status == 'in_progress']
+
+    def is_active(self, name: str) -> bool:
+        event = self._events.get(name)
+        return event is not None and event.status == 'in_progress'
+
+    # ----------------------------------------------------------------------------
+    async def get(self, name: str):
+        """
+        Resolve an event, querying the database only for unknown names.
+
+        Args:
+            name (str): Event name.
+
+        Returns:
+            Event or str: Event object or "not created", like get_event.
+        """
+        event = self._events.get(name)
+        if event is not None:
+            return event
+        event = await get_event(name)
+        if event is not None and event != "not created":
+            self._events[name] = event
+        return event
+
+    async def hosts(self, name: str) -> frozenset[int]:
+        """
+        Giveaway hosts of an event, from memory for active events.
+
+        Args:
+            name (str): Event name.
+
+        Returns:
+            frozenset[int]: Host user IDs.
+        """
+        if self.is_active(name):
+            return self._hosts.get(name, frozenset())
+        return frozenset(await get_all_hosts_in_event_ids(name) or ())
+
+    async def registrations(self, user_id: int) -> frozenset[str]:
+        """
+        Names of active events the user is registered on.
+
+        Args:
+            user_id (int): Telegram user ID.
+
+        Returns:
+            frozenset[str]: Event names.
+        """
+        cached = self._registrations.get(user_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        self._touched.discard(user_id)
+        names = await get_user_event_names(user_id, self.active_names())
+        if names is None:
+            return frozenset()
+        names = frozenset(names)
+        if user_id not in self._touched:
+            self._prune()
+            self._registrations[user_id] = (names, time.monotonic() + REGISTRATION_TTL)
+        return names
+
+    async def is_registered(self, user_id: int, event_name: str) -> bool:
+        """
+        Check a registration, from memory for active events.
+
+        Args:
+            user_id (int): Telegram user ID.
+            event_name (str): Event name.
+
+        Returns:
+            bool: Whether the user has a UserXEvent row for the event.
+        """
+        if self.is_active(event_name):
+            return event_name in await self.registrations(user_id)
+        return await get_user_x_event_row(user_id, event_name) not in (None, "not created")
+
+    async def user_events(self, user_id: int) -> list:
+        """
+        Active events the user is registered on.
+
+        Args:
+            user_id (int): Telegram user ID.
+
+        Returns:
+            list[Event]: Events in progress.
+        """
+        if not self._loaded:
+            return await get_all_user_events(user_id) or []
+        names = await self.registrations(user_id)
+        return [event for name, event in self._events.items() if name in names]
+
+    # ----------------------------------------------------------------------------
+    def _on_registration(self, user_id: int, event_name: str, registered: bool) -> None:
+        """
+        Apply a registration written through database.req to a cached set.
+
+        Args:
+            user_id (int): Telegram user ID.
+            event_name (str): Event name.
+            registered (bool): Whether the row was created or deleted.
+
+        Returns:
+            None
+        """
+        self._touched.add(user_id)
+        cached = self._registrations.get(user_id)
+        if cached is None:
+            return
+        names, expires = cached
+        if registered and self.is_active(event_name):
+            self._registrations[user_id] = (names | {event_name}, expires)
+        elif not registered:
+            self._registrations[user_id] = (names - {event_name}, expires)
+
+    def _prune(self) -> None:
+        if len(self._registrations) < REGISTRATION_CACHE_SIZE:
+            return
+        now = time.monotonic()
+        self._registrations = {
+            user_id: cached for user_id, cached in self._registrations.items() if cached[1] > now
+        }
+        if len(self._registrations) >= REGISTRATION_CACHE_SIZE:
+            self._registrations.clear()
+
+    # ----------------------------------------------------------------------------
+    async def run(self) -> None:
+        """
+        Reload events periodically until cancelled; the first load is
+        expected to be awaited at startup.
+
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(self.refresh_interval if self._loaded else RETRY_INTERVAL)
+            await self.load()
+
+
+# --------------------------------------------------------------------------------
+event_cache = EventCache()
+on_event_change(event_cache.refresh)
+on_registration_change(event_cache._on_registration)
@@ -1,11 +1,11 @@
 """
 Database Models
-SQLAlchemy models for users, events, vacancies, and registrations.
+SQLAlchemy models for users, events, vacancies, registrations, and scheduled posts.
 """
 
 # --------------------------------------------------------------------------------
 
-from sqlalchemy import Column, Integer, String, Boolean, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, BigInteger, ForeignKey, Index, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase
 
@@ -13,7 +13,8 @@ from bot_instance import SQL_URL_RC
 
 # --------------------------------------------------------------------------------
 
-engine = create_async_engine(url=SQL_URL_RC, echo=True)
+# SQL echo goes through the logging queue, see DB_ECHO in bot_instance
+engine = create_async_engine(url=SQL_URL_RC)
 async_session = async_sessionmaker(engine)
 
 
@@ -40,6 +41,9 @@ class User(Base):
         first_contact (str): First contact value.
         money (int): Amount of money.
         ref_cnt (int): Referral count.
+        delivery_status (str | None): Undeliverable reason ('blocked',
+            'deactivated' or 'chat_not_found'); None when reachable.
+        delivery_failed_at (str | None): ISO timestamp of the failed delivery.
 
     Returns:
         User: SQLAlchemy user model instance.
@@ -54,6 +58,8 @@ class User(Base):
     first_contact = Column(String, default='')
     money = Column(Integer, nullable=False, default=1)
     ref_cnt = Column(Integer, nullable=False, default=0)
+    delivery_status = Column(String, nullable=True)
+    delivery_failed_at = Column(String, nullable=True)  # Store as ISO format string
 
 
 # --------------------------------------------------------------------------------
@@ -149,6 +155,10 @@ class UserXEvent(Base):
         UserXEvent: SQLAlchemy user-event relation model.
     """
     __tablename__ = "user_x_event"
+    __table_args__ = (
+        # Registration lookups and the "not registered" anti-join
+        Index("ix_user_x_event_event_user", "event_name", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("user.id"), nullable=False)
@@ -344,13 +354,94 @@ class FaceControl(Base):
 # --------------------------------------------------------------------------------
 
 
+class ScheduledPost(Base):
+    """ScheduledPost model for mailings sent later by the scheduler.
+
+    Args:
+        id (Integer): Primary key.
+        target (String): Recipients: 'all', 'event', 'unreg' or 'reminder'.
+        event_name (String): Foreign key to event for event targets.
+        payload (String): Serialized mailing payload (JSON).
+        run_at (String): UTC send time.
+        status (String): 'pending', 'running', 'done', 'failed', 'cancelled' or 'expired'.
+        sent_cnt (Integer): Recipients processed so far.
+        last_user_id (BigInteger): Last recipient of the saved page, used to resume.
+        resume_at (String): UTC time a mailing paused for quiet hours continues.
+        created_by (BigInteger): Foreign key to user (admin) who scheduled it.
+        created_at (String): Timestamp of creation.
+
+    Returns:
+        ScheduledPost: SQLAlchemy scheduled post model instance.
+    """
+    __tablename__ = "scheduled_post"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    target = Column(String, nullable=False)
+    event_name = Column(String, ForeignKey("event.name"), nullable=True)
+    payload = Column(String, nullable=False)
+    run_at = Column(String, nullable=False, index=True)  # Store as ISO format string (UTC)
+    status = Column(String, nullable=False, default='pending')
+    sent_cnt = Column(Integer, nullable=False, default=0)
+    last_user_id = Column(BigInteger, nullable=True)
+    resume_at = Column(String, nullable=True)  # Store as ISO format string (UTC)
+    created_by = Column(BigInteger, ForeignKey("user.id"), nullable=False)
+    created_at = Column(String, nullable=False)  # Store as ISO format string
+
+
+# --------------------------------------------------------------------------------
+
+
+class NetworkingAssignment(Base):
+    """NetworkingAssignment model for topics of the current networking round.
+
+    Args:
+        user_id (BigInteger): Primary key, Telegram user ID.
+        topic (String): Assigned topic.
+        assigned_at (String): Timestamp of assignment.
+
+    Returns:
+        NetworkingAssignment: SQLAlchemy networking assignment model instance.
+    """
+    __tablename__ = "networking_assignment"
+
+    user_id = Column(BigInteger, primary_key=True)
+    topic = Column(String, nullable=False)
+    assigned_at = Column(String, nullable=False)  # Store as ISO format string
+
+
+# --------------------------------------------------------------------------------
+
+
 async def async_main():
     """Initialize database schema.
 
-    Connects to the database and creates all tables.
+    Connects to the database and creates all tables, plus nullable
+    columns and indexes added to tables that already exist.
 
     Returns:
         None
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _add_missing_columns(conn) -> None:
+    """Add declared nullable columns absent from existing tables."""
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+
+
+def _create_missing_indexes(conn) -> None:
+    """Create declared indexes absent from existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
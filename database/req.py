@@ -5,14 +5,17 @@ CRUD operations for users, events, vacancies, and networking.
 """
 
 # --------------------------------------------------------------------------------
-from sqlalchemy import (distinct, delete, func, select, and_, over)
+from sqlalchemy import (distinct, delete, exists, func, insert, select, and_, or_, over, tuple_, update)
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import aliased
 from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable
 
 from database.models import (
     Event,
     GiveAwayHost,
     Networking,
+    NetworkingAssignment,
     Questionary,
     RegEvent,
     RefGiveAway,
@@ -22,8 +25,10 @@ from database.models import (
     QRCode,
     async_session, EventAttendance,
     FaceControl,
+    ScheduledPost,
 )
 from errors.errors import (
+    DatabaseConnectionError,
     Error404,
     Error409,
     EventNameError,
@@ -31,6 +36,52 @@ from errors.errors import (
 )
 from errors.handlers import db_error_handler
 
+# Awaited with the event name after an event or its hosts change
+_event_change_hooks: list[Callable[[str], Awaitable[None]]] = []
+
+
+# --------------------------------------------------------------------------------
+def on_event_change(hook: Callable[[str], Awaitable[None]]) -> None:
+    """
+    Register a callback invalidating event data cached outside the database.
+
+    Args:
+        hook (Callable[[str], Awaitable[None]]): Awaited with the event name.
+
+    Returns:
+        None
+    """
+    _event_change_hooks.append(hook)
+
+
+async def _event_changed(name: str) -> None:
+    for hook in _event_change_hooks:
+        await hook(name)
+
+
+# Called with user ID, event name and whether the user is now registered
+_registration_hooks: list[Callable[[int, str, bool], None]] = []
+
+
+def on_registration_change(hook: Callable[[int, str, bool], None]) -> None:
+    """
+    Register a callback keeping cached registration sets in step with
+    UserXEvent rows created or deleted through this module.
+
+    Args:
+        hook (Callable[[int, str, bool], None]): Called with user ID, event
+            name and the new registration state.
+
+    Returns:
+        None
+    """
+    _registration_hooks.append(hook)
+
+
+def _registration_changed(user_id: int, event_name: str, registered: bool) -> None:
+    for hook in _registration_hooks:
+        hook(user_id, event_name, registered)
+
 
 # --------------------------------------------------------------------------------
 @db_error_handler
@@ -193,23 +244,75 @@ async def update_user(tg_id: int, data: dict):
 
 # --------------------------------------------------------------------------------
 @db_error_handler
-async def get_users_tg_id():
+async def get_users_tg_id(include_dead: bool = False):
     """
     Fetch all distinct Telegram IDs of users.
 
+    Args:
+        include_dead (bool): Include users marked as undeliverable.
+
     Returns:
         list[int]: List of user Telegram IDs.
     """
     async with async_session() as session:
-        result = await session.execute(
-            select(distinct(User.id))
-        )
+        query = select(distinct(User.id))
+        if not include_dead:
+            query = query.where(User.delivery_status.is_(None))
+        result = await session.execute(query)
         ids = result.scalars().all()
         if not ids:
             raise Error404
         return ids
 
 
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def mark_user_undeliverable(tg_id: int, status: str):
+    """
+    Mark a user as unreachable so mailings skip them.
+
+    Args:
+        tg_id (int): Telegram user identifier.
+        status (str): Reason: 'blocked', 'deactivated' or 'chat_not_found'.
+
+    Returns:
+        None
+    """
+    async with async_session() as session:
+        await session.execute(
+            update(User)
+            .where(User.id == tg_id)
+            .values(
+                delivery_status=status,
+                delivery_failed_at=datetime.utcnow().isoformat(),
+            )
+        )
+        await session.commit()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def reset_delivery_status(tg_id: int | None = None) -> int:
+    """
+    Clear undeliverable flags for one user or for everyone.
+
+    Args:
+        tg_id (int | None): Telegram user identifier or None for all users.
+
+    Returns:
+        int: Number of users whose flags were cleared.
+    """
+    async with async_session() as session:
+        query = update(User).where(User.delivery_status.is_not(None))
+        if tg_id is not None:
+            query = query.where(User.id == tg_id)
+        result = await session.execute(
+            query.values(delivery_status=None, delivery_failed_at=None)
+        )
+        await session.commit()
+        return result.rowcount
+
+
 # --------------------------------------------------------------------------------
 @db_error_handler
 async def get_all_users():
@@ -250,46 +353,28 @@ async def get_questionary(tg_id: int):
 
 # --------------------------------------------------------------------------------
 @db_error_handler
-async def create_questionary(tg_id: int):
-    """
-    Create a new questionary for a user.
-
-    Args:
-        tg_id (int): Telegram user identifier.
-
-    Returns:
-        None
+async def save_questionaries(drafts: dict[int, dict]) -> bool:
     """
-    async with async_session() as session:
-        q = await get_questionary(tg_id)
-        if q == "not created":
-            session.add(Questionary(user_id=tg_id))
-            await session.commit()
-        else:
-            raise Error409
-
+    Upsert questionnaire answers of several users in one transaction.
 
-# --------------------------------------------------------------------------------
-@db_error_handler
-async def update_questionary(tg_id: int, data: dict):
-    """
-    Update existing questionary data.
+    Questionary.user_id is not unique in the schema, so each row is
+    updated in place and inserted only when the user has none yet.
 
     Args:
-        tg_id (int): Telegram user identifier.
-        data (dict): Fields to update with values.
+        drafts (dict[int, dict]): Answers by Telegram user identifier.
 
     Returns:
-        None
+        bool: True once committed.
     """
     async with async_session() as session:
-        q = await get_questionary(tg_id)
-        if q == "not created":
-            raise Error404
-        for key, value in data.items():
-            setattr(q, key, value)
-        session.add(q)
+        for tg_id, data in drafts.items():
+            result = await session.execute(
+                update(Questionary).where(Questionary.user_id == tg_id).values(**data)
+            )
+            if result.rowcount == 0:
+                session.add(Questionary(user_id=tg_id, **data))
         await session.commit()
+        return True
 
 
 # --------------------------------------------------------------------------------
@@ -350,6 +435,7 @@ async def create_event(name: str, data: dict):
             data["status"] = "in_progress"
             session.add(Event(**data))
             await session.commit()
+            await _event_changed(name)
             return "all ok"
         raise EventNameError
 
@@ -375,6 +461,7 @@ async def update_event(name: str, data: dict):
             setattr(evt, key, value)
         session.add(evt)
         await session.commit()
+        await _event_changed(name)
 
 
 # --------------------------------------------------------------------------------
@@ -549,6 +636,7 @@ async def delete_user_x_event_row(user_id: int, event_name: str):
             )
         )
         await session.commit()
+        _registration_changed(user_id, event_name, False)
 
 
 # --------------------------------------------------------------------------------
@@ -581,6 +669,7 @@ async def create_user_x_event_row(
                 )
             )
             await session.commit()
+            _registration_changed(user_id, event_name, True)
         else:
             raise Error409
 
@@ -680,25 +769,29 @@ async def get_random_user_from_event_wth_bad(
 
 # --------------------------------------------------------------------------------
 @db_error_handler
-async def get_users_tg_id_in_event(event_name: str):
+async def get_users_tg_id_in_event(event_name: str, include_dead: bool = False):
     """
     Fetch IDs of users in event with status 'been'.
 
     Args:
         event_name (str): Event name.
+        include_dead (bool): Include users marked as undeliverable.
 
     Returns:
         list[int]: List of user IDs.
     """
     async with async_session() as session:
-        result = await session.execute(
-            select(distinct(UserXEvent.user_id)).where(
-                and_(
-                    UserXEvent.event_name == event_name,
-                    UserXEvent.status == 'been',
-                )
+        query = select(distinct(UserXEvent.user_id)).where(
+            and_(
+                UserXEvent.event_name == event_name,
+                UserXEvent.status == 'been',
             )
         )
+        if not include_dead:
+            query = query.join(User, User.id == UserXEvent.user_id).where(
+                User.delivery_status.is_(None)
+            )
+        result = await session.execute(query)
         ids = result.scalars().all()
         if not ids:
             raise Error404
@@ -708,33 +801,99 @@ async def get_users_tg_id_in_event(event_name: str):
 # --------------------------------------------------------------------------------
 
 @db_error_handler
-async def get_users_tg_id_in_event_bad(event_name: str):
+async def get_users_tg_id_in_event_bad(event_name: str, include_dead: bool = False):
     """
     Retrieve distinct Telegram user IDs registered in an event.
 
     Args:
         event_name (str): Name of the event.
+        include_dead (bool): Include users marked as undeliverable.
 
     Returns:
         list[int]: List of Telegram user IDs.
     """
     async with async_session() as session:
-        users_tg_id = await session.execute(
-            select(
-                distinct(UserXEvent.user_id)
-            ).where(
-                and_(
-                    UserXEvent.event_name == event_name,
-                    UserXEvent.status == 'reg'
-                )
+        query = select(
+            distinct(UserXEvent.user_id)
+        ).where(
+            and_(
+                UserXEvent.event_name == event_name,
+                UserXEvent.status == 'reg'
             )
         )
+        if not include_dead:
+            query = query.join(User, User.id == UserXEvent.user_id).where(
+                User.delivery_status.is_(None)
+            )
+        users_tg_id = await session.execute(query)
         users_tg_ids = users_tg_id.scalars().all()
         if not users_tg_ids:
             raise Error404
         return users_tg_ids
 
 
+# --------------------------------------------------------------------------------
+
+@db_error_handler
+async def get_event_participants(event_name: str) -> list[tuple[int, str, bool]]:
+    """
+    Retrieve attendees and no-shows of an event in one query.
+
+    Args:
+        event_name (str): Event name.
+
+    Returns:
+        list[tuple[int, str, bool]]: User ID, status ('been' or 'reg') and
+        whether messages can be delivered to the user.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(
+                UserXEvent.user_id,
+                UserXEvent.status,
+                User.delivery_status.is_(None),
+            ).outerjoin(
+                User, User.id == UserXEvent.user_id
+            ).where(
+                and_(
+                    UserXEvent.event_name == event_name,
+                    UserXEvent.status.in_(('been', 'reg')),
+                )
+            ).distinct()
+        )
+        return [tuple(row) for row in result.all()]
+
+
+# --------------------------------------------------------------------------------
+
+@db_error_handler
+async def mark_no_shows(event_name: str, user_ids: list[int]) -> int:
+    """
+    Reset streaks of registered users who did not come and mark them 'nbeen'.
+
+    Args:
+        event_name (str): Event name.
+        user_ids (list[int]): Telegram user IDs.
+
+    Returns:
+        int: Number of updated UserXEvent rows.
+    """
+    if not user_ids:
+        return 0
+    async with async_session() as session:
+        await session.execute(update(User).where(User.id.in_(user_ids)).values(strick=0))
+        result = await session.execute(
+            update(UserXEvent).where(
+                and_(
+                    UserXEvent.event_name == event_name,
+                    UserXEvent.user_id.in_(user_ids),
+                )
+            ).values(status='nbeen')
+        )
+        await session.commit()
+        return result.rowcount
+
+
 # --------------------------------------------------------------------------------
 
 @db_error_handler
@@ -901,6 +1060,61 @@ async def check_completly_reg_event(tg_id: int):
         return True
 
 
+# --------------------------------------------------------------------------------
+
+@db_error_handler
+async def save_reg_event_registration(
+        tg_id: int,
+        form: dict,
+        event_name: str,
+        first_contact: str,
+) -> bool:
+    """
+    Save a filled registration form, register the user on the event and
+    create the QR code record in one transaction.
+
+    Args:
+        tg_id (int): Telegram user ID for registration.
+        form (dict): RegEvent fields with values.
+        event_name (str): Event name.
+        first_contact (str): Initial contact detail.
+
+    Returns:
+        bool: True once committed.
+    """
+    async with async_session() as session:
+        await session.merge(RegEvent(id=tg_id, **form))
+        registered = await session.scalar(
+            select(exists().where(
+                and_(
+                    UserXEvent.user_id == tg_id,
+                    UserXEvent.event_name == event_name,
+                )
+            ))
+        )
+        if not registered:
+            session.add(
+                UserXEvent(
+                    user_id=tg_id,
+                    event_name=event_name,
+                    first_contact=first_contact,
+                    status='reg',
+                )
+            )
+        session.add(
+            QRCode(
+                user_id=tg_id,
+                event_name=event_name,
+                created_at=datetime.utcnow().isoformat(),
+                is_used=False,
+            )
+        )
+        await session.commit()
+        if not registered:
+            _registration_changed(tg_id, event_name, True)
+        return True
+
+
 # --------------------------------------------------------------------------------
 
 @db_error_handler
@@ -1126,142 +1340,399 @@ async def get_add_winner(host_id: int, event_name: str):
 
 # --------------------------------------------------------------------------------
 
+def unreg_users_query(event_name: str, include_dead: bool = False):
+    """
+    Build the query selecting users not registered in an event.
+
+    A NOT EXISTS anti-join on (event_name, user_id) is used instead of
+    NOT IN over a subquery, which Postgres plans poorly and which is
+    NULL-sensitive.
+
+    Args:
+        event_name (str): Name of the event.
+        include_dead (bool): Include users marked as undeliverable.
+
+    Returns:
+        Select: Query of User.id.
+    """
+    registered = exists().where(
+        and_(
+            UserXEvent.event_name == event_name,
+            UserXEvent.user_id == User.id,
+        )
+    )
+    query = select(User.id).where(~registered)
+    if not include_dead:
+        query = query.where(User.delivery_status.is_(None))
+    return query
+
+
 @db_error_handler
-async def get_users_unreg_tg_id(event_name: str):
+async def get_users_unreg_tg_id(event_name: str, include_dead: bool = False):
     """
     Retrieve IDs of users not registered in an event.
 
     Args:
         event_name (str): Name of the event.
+        include_dead (bool): Include users marked as undeliverable.
 
     Returns:
         list[int]: List of unregistered Telegram user IDs.
     """
     async with async_session() as session:
-        result = await session.execute(
-            select(
-                User.id
-            ).where(
-                ~User.id.in_(
-                    select(UserXEvent.user_id)
-                    .where(UserXEvent.event_name == event_name)
-                )
-            )
-        )
+        result = await session.execute(unreg_users_query(event_name, include_dead))
         users_data = result.scalars().all()
         if not users_data:
             raise Error404
         return users_data
 
 
-# --------------------------------------------------------------------------------
-
 @db_error_handler
-async def get_host(user_id: int, event_name: str):
+async def count_users_unreg(event_name: str, include_dead: bool = False) -> int:
     """
-    Retrieve a GiveAwayHost entry by user and event.
+    Count users not registered in an event.
 
     Args:
-        user_id (int): Telegram user ID of the host.
         event_name (str): Name of the event.
+        include_dead (bool): Include users marked as undeliverable.
 
     Returns:
-        GiveAwayHost: Host data for the event.
+        int: Number of unregistered users.
     """
     async with async_session() as session:
-        host = await session.scalar(
-            select(GiveAwayHost).where(
-                and_(
-                    GiveAwayHost.user_id == user_id,
-                    GiveAwayHost.event_name == event_name
-                )
-            )
+        return await session.scalar(
+            select(func.count()).select_from(unreg_users_query(event_name, include_dead).subquery())
         )
-        if host:
-            return host
-        else:
-            raise Error404
 
 
 # --------------------------------------------------------------------------------
+# Keyset-paginated iteration over large sets: every page is a separate
+# "WHERE key > :last ORDER BY key LIMIT :n" query, so memory stays bounded
+# and no connection is held between pages.
+PAGE_SIZE = 1000
+
 
 @db_error_handler
-async def get_host_by_org_name(org_name: str, event_name: str):
+async def _fetch_page(query, key, after, limit: int) -> list:
     """
-    Retrieve host by organization and event names.
+    Fetch one page of a keyset-paginated query.
 
     Args:
-        org_name (str): Organization name.
-        event_name (str): Event name.
+        query (Select): Query without ordering and limit.
+        key (Column): Unique column the query is paginated by.
+        after: Key of the last row of the previous page, None for the first page.
+        limit (int): Page size.
 
     Returns:
-        GiveAwayHost: Host instance.
-
-    Raises:
-        Error404: If host not found.
+        list: Page rows.
     """
     async with async_session() as session:
-        host = await session.scalar(
-            select(GiveAwayHost)
-            .where(
-                and_(
-                    GiveAwayHost.org_name == org_name,
-                    GiveAwayHost.event_name == event_name,
-                )
-            ),
-        )
-        if host:
-            return host
-        else:
-            raise Error404
+        if after is not None:
+            query = query.where(key > after)
+        result = await session.execute(query.order_by(key).limit(limit))
+        return result.scalars().all()
 
 
-# --------------------------------------------------------------------------------
-@db_error_handler
-async def create_host(user_id: int, event_name: str, org_name: str):
+async def _paginate(query, key, page_size: int, key_of=None, after=None) -> AsyncIterator[list]:
     """
-    Create a new host record if none exists.
+    Yield pages of a query ordered by a unique key.
 
     Args:
-        user_id (int): User identifier.
-        event_name (str): Event name.
-        org_name (str): Organization name.
+        query (Select): Query without ordering and limit.
+        key (Column): Unique column the query is paginated by.
+        page_size (int): Rows per page.
+        key_of (Callable | None): Extracts the key from a row, for entity queries.
+        after: Start after this key, e.g. to resume an interrupted iteration.
 
     Raises:
-        Error409: If host already exists.
+        DatabaseConnectionError: If a page could not be fetched.
     """
-    async with async_session() as session:
-        host = await get_host(user_id)
-        if not host:
-            data = {
-                'user_id': user_id,
-                'event_name': event_name,
-                'org_name': org_name,
-            }
-            host_data = GiveAwayHost(**data)
-            session.add(host_data)
-            await session.commit()
-        else:
-            raise Error409
+    while True:
+        page = await _fetch_page(query, key, after, page_size)
+        if page is None:
+            raise DatabaseConnectionError
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = key_of(page[-1]) if key_of else page[-1]
 
 
 # --------------------------------------------------------------------------------
-@db_error_handler
-async def get_all_hosts_in_event_ids(event_name: str):
+def iter_users_tg_id(include_dead: bool = False, page_size: int = PAGE_SIZE) -> AsyncIterator[list[int]]:
     """
-    Retrieve all host user IDs for an event.
+    Stream Telegram IDs of all users page by page.
 
     Args:
-        event_name (str): Event name.
+        include_dead (bool): Include users marked as undeliverable.
+        page_size (int): IDs per page.
 
     Returns:
-        list[int]: List of user IDs.
+        AsyncIterator[list[int]]: Pages of user IDs.
+    """
+    query = select(User.id)
+    if not include_dead:
+        query = query.where(User.delivery_status.is_(None))
+    return _paginate(query, User.id, page_size)
 
-    Raises:
-        Error404: If no hosts found.
+
+def iter_all_users(page_size: int = PAGE_SIZE) -> AsyncIterator[list[User]]:
     """
-    async with async_session() as session:
-        hosts_ids = await session.execute(
+    Stream user records page by page.
+
+    Args:
+        page_size (int): Users per page.
+
+    Returns:
+        AsyncIterator[list[User]]: Pages of User objects.
+    """
+    return _paginate(select(User), User.id, page_size, key_of=lambda user: user.id)
+
+
+def iter_all_quests(page_size: int = PAGE_SIZE) -> AsyncIterator[list[Questionary]]:
+    """
+    Stream questionaries page by page.
+
+    Args:
+        page_size (int): Questionaries per page.
+
+    Returns:
+        AsyncIterator[list[Questionary]]: Pages of Questionary objects.
+    """
+    return _paginate(select(Questionary), Questionary.id, page_size, key_of=lambda quest: quest.id)
+
+
+def iter_users_tg_id_in_event(
+        event_name: str,
+        include_dead: bool = False,
+        page_size: int = PAGE_SIZE,
+) -> AsyncIterator[list[int]]:
+    """
+    Stream IDs of users with status 'been' in an event page by page.
+
+    Args:
+        event_name (str): Event name.
+        include_dead (bool): Include users marked as undeliverable.
+        page_size (int): IDs per page.
+
+    Returns:
+        AsyncIterator[list[int]]: Pages of user IDs.
+    """
+    query = select(UserXEvent.user_id).where(
+        and_(
+            UserXEvent.event_name == event_name,
+            UserXEvent.status == 'been',
+        )
+    ).distinct()
+    if not include_dead:
+        query = query.join(User, User.id == UserXEvent.user_id).where(
+            User.delivery_status.is_(None)
+        )
+    return _paginate(query, UserXEvent.user_id, page_size)
+
+
+def iter_users_unreg_tg_id(
+        event_name: str,
+        include_dead: bool = False,
+        page_size: int = PAGE_SIZE,
+) -> AsyncIterator[list[int]]:
+    """
+    Stream IDs of users not registered in an event page by page.
+
+    Args:
+        event_name (str): Event name.
+        include_dead (bool): Include users marked as undeliverable.
+        page_size (int): IDs per page.
+
+    Returns:
+        AsyncIterator[list[int]]: Pages of user IDs.
+    """
+    return _paginate(unreg_users_query(event_name, include_dead), User.id, page_size)
+
+
+# --------------------------------------------------------------------------------
+def recipients_query(target: str, event_name: str | None = None, include_dead: bool = False):
+    """
+    Build the recipient query of a scheduled post target.
+
+    Args:
+        target (str): 'all', 'event' (status 'been'), 'unreg' or 'reminder' (status 'reg').
+        event_name (str | None): Event name for event targets.
+        include_dead (bool): Include users marked as undeliverable.
+
+    Returns:
+        Select | None: Query of User.id, or None for an unknown target.
+    """
+    if target == 'unreg':
+        return unreg_users_query(event_name, include_dead)
+    if target == 'all':
+        query = select(User.id)
+    elif target in ('event', 'reminder'):
+        query = select(User.id).join(UserXEvent, UserXEvent.user_id == User.id).where(
+            and_(
+                UserXEvent.event_name == event_name,
+                UserXEvent.status == ('been' if target == 'event' else 'reg'),
+            )
+        ).distinct()
+    else:
+        return None
+    if not include_dead:
+        query = query.where(User.delivery_status.is_(None))
+    return query
+
+
+@db_error_handler
+async def count_recipients(target: str, event_name: str | None = None, after: int | None = None) -> int:
+    """
+    Count deliverable recipients of a scheduled post target.
+
+    Args:
+        target (str): Scheduled post target.
+        event_name (str | None): Event name for event targets.
+        after (int | None): Count only users with a greater ID.
+
+    Returns:
+        int: Number of recipients; 0 for an unknown target.
+    """
+    query = recipients_query(target, event_name)
+    if query is None:
+        return 0
+    if after is not None:
+        query = query.where(User.id > after)
+    async with async_session() as session:
+        return await session.scalar(select(func.count()).select_from(query.subquery()))
+
+
+def iter_recipients(
+        target: str,
+        event_name: str | None = None,
+        after: int | None = None,
+        page_size: int = PAGE_SIZE,
+) -> AsyncIterator[list[int]]:
+    """
+    Stream deliverable recipients of a scheduled post target by ascending ID.
+
+    Args:
+        target (str): Scheduled post target.
+        event_name (str | None): Event name for event targets.
+        after (int | None): Start after this user ID.
+        page_size (int): IDs per page.
+
+    Returns:
+        AsyncIterator[list[int]]: Pages of user IDs.
+    """
+    return _paginate(recipients_query(target, event_name), User.id, page_size, after=after)
+
+
+# --------------------------------------------------------------------------------
+
+@db_error_handler
+async def get_host(user_id: int, event_name: str):
+    """
+    Retrieve a GiveAwayHost entry by user and event.
+
+    Args:
+        user_id (int): Telegram user ID of the host.
+        event_name (str): Name of the event.
+
+    Returns:
+        GiveAwayHost: Host data for the event.
+    """
+    async with async_session() as session:
+        host = await session.scalar(
+            select(GiveAwayHost).where(
+                and_(
+                    GiveAwayHost.user_id == user_id,
+                    GiveAwayHost.event_name == event_name
+                )
+            )
+        )
+        if host:
+            return host
+        else:
+            raise Error404
+
+
+# --------------------------------------------------------------------------------
+
+@db_error_handler
+async def get_host_by_org_name(org_name: str, event_name: str):
+    """
+    Retrieve host by organization and event names.
+
+    Args:
+        org_name (str): Organization name.
+        event_name (str): Event name.
+
+    Returns:
+        GiveAwayHost: Host instance.
+
+    Raises:
+        Error404: If host not found.
+    """
+    async with async_session() as session:
+        host = await session.scalar(
+            select(GiveAwayHost)
+            .where(
+                and_(
+                    GiveAwayHost.org_name == org_name,
+                    GiveAwayHost.event_name == event_name,
+                )
+            ),
+        )
+        if host:
+            return host
+        else:
+            raise Error404
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def create_host(user_id: int, event_name: str, org_name: str):
+    """
+    Create a new host record if none exists.
+
+    Args:
+        user_id (int): User identifier.
+        event_name (str): Event name.
+        org_name (str): Organization name.
+
+    Raises:
+        Error409: If host already exists.
+    """
+    async with async_session() as session:
+        host = await get_host(user_id)
+        if not host:
+            data = {
+                'user_id': user_id,
+                'event_name': event_name,
+                'org_name': org_name,
+            }
+            host_data = GiveAwayHost(**data)
+            session.add(host_data)
+            await session.commit()
+            await _event_changed(event_name)
+        else:
+            raise Error409
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_all_hosts_in_event_ids(event_name: str):
+    """
+    Retrieve all host user IDs for an event.
+
+    Args:
+        event_name (str): Event name.
+
+    Returns:
+        list[int]: List of user IDs.
+
+    Raises:
+        Error404: If no hosts found.
+    """
+    async with async_session() as session:
+        hosts_ids = await session.execute(
             select(distinct(GiveAwayHost.user_id))
             .where(GiveAwayHost.event_name == event_name),
         )
@@ -1486,6 +1957,72 @@ async def get_all_for_networking():
         return networking_data
 
 
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_networking_assignments() -> dict[int, str]:
+    """
+    Retrieve topics assigned in the current networking round.
+
+    Returns:
+        dict[int, str]: Topic by Telegram user ID.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(NetworkingAssignment.user_id, NetworkingAssignment.topic)
+        )
+        return dict(result.all())
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def save_networking_assignments(assignments: dict[int, str]) -> bool:
+    """
+    Store new networking topic assignments in one INSERT.
+
+    Args:
+        assignments (dict[int, str]): Topic by Telegram user ID.
+
+    Returns:
+        bool: True once committed.
+    """
+    if not assignments:
+        return True
+    assigned_at = datetime.utcnow().isoformat()
+    async with async_session() as session:
+        await session.execute(
+            insert(NetworkingAssignment),
+            [
+                {'user_id': user_id, 'topic': topic, 'assigned_at': assigned_at}
+                for user_id, topic in assignments.items()
+            ],
+        )
+        await session.commit()
+        return True
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def clear_networking(user_ids: list[int]) -> int:
+    """
+    Remove users from networking together with their topic assignments.
+
+    Args:
+        user_ids (list[int]): Telegram user IDs.
+
+    Returns:
+        int: Number of removed networking entries.
+    """
+    if not user_ids:
+        return 0
+    async with async_session() as session:
+        result = await session.execute(delete(Networking).where(Networking.id.in_(user_ids)))
+        await session.execute(
+            delete(NetworkingAssignment).where(NetworkingAssignment.user_id.in_(user_ids))
+        )
+        await session.commit()
+        return result.rowcount
+
+
 # --------------------------------------------------------------------------------
 @db_error_handler
 async def delete_all_from_networking():
@@ -1523,6 +2060,41 @@ async def create_qr_code(user_id: int, event_name: str):
         return qr_code
 
 
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def create_qr_codes(user_ids: list[int], event_name: str) -> int:
+    """
+    Create QR code records in one INSERT for users of an event who have none yet.
+
+    Args:
+        user_ids (list[int]): Telegram user identifiers.
+        event_name (str): Event name.
+
+    Returns:
+        int: Number of created records.
+    """
+    if not user_ids:
+        return 0
+    created_at = datetime.utcnow().isoformat()
+    async with async_session() as session:
+        existing = set((await session.execute(
+            select(QRCode.user_id).where(
+                and_(
+                    QRCode.event_name == event_name,
+                    QRCode.user_id.in_(user_ids),
+                )
+            )
+        )).scalars())
+        rows = [
+            {'user_id': user_id, 'event_name': event_name, 'created_at': created_at, 'is_used': False}
+            for user_id in dict.fromkeys(user_ids) if user_id not in existing
+        ]
+        if rows:
+            await session.execute(insert(QRCode), rows)
+            await session.commit()
+        return len(rows)
+
+
 # --------------------------------------------------------------------------------
 @db_error_handler
 async def get_latest_qr_code(user_id: int):
@@ -1591,6 +2163,66 @@ async def record_attendance(user_id: int, event_name: str, verified_by: int):
         return attendance
 
 
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_check_in_view(user_id: int, event_name: str, scanner_id: int):
+    """
+    Fetch everything a QR scan needs in a single joined query.
+
+    Args:
+        user_id (int): Attendee Telegram ID from the QR code.
+        event_name (str): Event name from the QR code.
+        scanner_id (int): Telegram ID of the user who scanned the code.
+
+    Returns:
+        dict or str: Keys user, event, status, reg_event,
+            scanner_is_superuser and scanner_is_face_control, where
+            status and reg_event may be None, or "not found" if the
+            user or event does not exist.
+    """
+    scanner = aliased(User)
+    async with async_session() as session:
+        result = await session.execute(
+            select(
+                User,
+                Event,
+                UserXEvent,
+                RegEvent,
+                select(scanner.is_superuser)
+                .where(scanner.id == scanner_id)
+                .scalar_subquery()
+                .label("scanner_is_superuser"),
+                exists()
+                .where(FaceControl.user_id == scanner_id)
+                .label("scanner_is_face_control"),
+            )
+            .select_from(User)
+            .join(Event, Event.name == event_name)
+            .outerjoin(
+                UserXEvent,
+                and_(
+                    UserXEvent.user_id == User.id,
+                    UserXEvent.event_name == Event.name,
+                ),
+            )
+            .outerjoin(RegEvent, RegEvent.id == User.id)
+            .where(User.id == user_id)
+            .limit(1)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return "not found"
+        user, event, user_x_event, reg_event, is_superuser, is_face_control = row
+        return {
+            'user': user,
+            'event': event,
+            'status': user_x_event.status if user_x_event else None,
+            'reg_event': reg_event,
+            'scanner_is_superuser': bool(is_superuser),
+            'scanner_is_face_control': bool(is_face_control),
+        }
+
+
 # --------------------------------------------------------------------------------
 @db_error_handler
 async def get_user_attendance(user_id: int, event_name: str):
@@ -1615,3 +2247,264 @@ async def get_user_attendance(user_id: int, event_name: str):
             )
         )
         return result.scalar_one_or_none()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def create_scheduled_post(data: dict):
+    """
+    Store a mailing to be sent later by the scheduler.
+
+    Args:
+        data (dict): Fields: target, event_name, payload, run_at, created_by.
+
+    Returns:
+        ScheduledPost: Created scheduled post.
+    """
+    async with async_session() as session:
+        post = ScheduledPost(**data, status='pending', created_at=datetime.utcnow().isoformat())
+        session.add(post)
+        await session.commit()
+        await session.refresh(post)
+        return post
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_due_scheduled_posts(now: str):
+    """
+    Fetch posts whose send time has come, including ones interrupted or
+    paused mid-run whose resume time has come.
+
+    Args:
+        now (str): Current UTC time in ISO format.
+
+    Returns:
+        list[ScheduledPost]: Due posts ordered by send time.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(ScheduledPost)
+            .where(
+                and_(
+                    ScheduledPost.status.in_(('pending', 'running')),
+                    ScheduledPost.run_at <= now,
+                    or_(ScheduledPost.resume_at.is_(None), ScheduledPost.resume_at <= now),
+                )
+            )
+            .order_by(ScheduledPost.run_at)
+        )
+        return result.scalars().all()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_pending_scheduled_posts():
+    """
+    Fetch posts that are not sent yet.
+
+    Returns:
+        list[ScheduledPost]: Pending and running posts ordered by send time.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(ScheduledPost)
+            .where(ScheduledPost.status.in_(('pending', 'running')))
+            .order_by(ScheduledPost.run_at)
+        )
+        return result.scalars().all()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def update_scheduled_post(post_id: int, data: dict):
+    """
+    Update scheduled post fields, e.g. status or the resume checkpoint.
+
+    Args:
+        post_id (int): Scheduled post identifier.
+        data (dict): Fields to update.
+
+    Returns:
+        None
+    """
+    async with async_session() as session:
+        await session.execute(
+            update(ScheduledPost).where(ScheduledPost.id == post_id).values(**data)
+        )
+        await session.commit()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def cancel_scheduled_post(post_id: int) -> bool:
+    """
+    Cancel a scheduled post unless it has already started.
+
+    Args:
+        post_id (int): Scheduled post identifier.
+
+    Returns:
+        bool: True if the post was cancelled.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(ScheduledPost)
+            .where(
+                and_(
+                    ScheduledPost.id == post_id,
+                    ScheduledPost.status == 'pending',
+                )
+            )
+            .values(status='cancelled')
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_check_in_index():
+    """
+    Load data needed to answer QR scans for all active events.
+
+    Returns:
+        dict: Keys events (list[Event] in progress) and rows (user_id,
+            event_name, status, handler, surname, name, fathername, phone
+            for 'reg' and 'been' registrations).
+    """
+    async with async_session() as session:
+        events = (await session.execute(
+            select(Event).where(Event.status == 'in_progress')
+        )).scalars().all()
+        rows = (await session.execute(
+            select(
+                UserXEvent.user_id,
+                UserXEvent.event_name,
+                UserXEvent.status,
+                User.handler,
+                RegEvent.surname,
+                RegEvent.name,
+                RegEvent.fathername,
+                RegEvent.phone,
+            )
+            .join(User, User.id == UserXEvent.user_id)
+            .join(Event, Event.name == UserXEvent.event_name)
+            .outerjoin(RegEvent, RegEvent.id == UserXEvent.user_id)
+            .where(
+                and_(
+                    Event.status == 'in_progress',
+                    UserXEvent.status.in_(('reg', 'been')),
+                )
+            )
+        )).all()
+        return {
+            'events': events,
+            'rows': rows,
+        }
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_event_index():
+    """
+    Load all events and the giveaway hosts of active events.
+
+    Returns:
+        dict: Keys events (list[Event]) and hosts (event_name, user_id
+            pairs for events in progress).
+    """
+    async with async_session() as session:
+        events = (await session.execute(select(Event).order_by(Event.name))).scalars().all()
+        hosts = (await session.execute(
+            select(GiveAwayHost.event_name, GiveAwayHost.user_id)
+            .join(Event, Event.name == GiveAwayHost.event_name)
+            .where(Event.status == 'in_progress')
+        )).all()
+        return {
+            'events': events,
+            'hosts': hosts,
+        }
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_user_event_names(user_id: int, event_names: list[str]) -> list[str]:
+    """
+    Filter events down to those the user is registered on.
+
+    Args:
+        user_id (int): Telegram user ID.
+        event_names (list[str]): Candidate event names.
+
+    Returns:
+        list[str]: Event names with a UserXEvent row of the user.
+    """
+    if not event_names:
+        return []
+    async with async_session() as session:
+        result = await session.execute(
+            select(distinct(UserXEvent.event_name)).where(
+                and_(
+                    UserXEvent.user_id == user_id,
+                    UserXEvent.event_name.in_(event_names),
+                )
+            )
+        )
+        return result.scalars().all()
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def get_roles():
+    """
+    Load IDs of all users with elevated rights.
+
+    Returns:
+        dict: Keys superusers (list[int]) and face_control (list[int]).
+    """
+    async with async_session() as session:
+        superusers = (await session.execute(
+            select(User.id).where(User.is_superuser.is_(True))
+        )).scalars().all()
+        face_control = (await session.execute(
+            select(FaceControl.user_id)
+        )).scalars().all()
+        return {
+            'superusers': superusers,
+            'face_control': face_control,
+        }
+
+
+# --------------------------------------------------------------------------------
+@db_error_handler
+async def check_in(pairs: list[tuple[int, str]]) -> list[tuple[int, str]]:
+    """
+    Mark registrations as attended, only where they are still 'reg'.
+
+    A single conditional UPDATE ... RETURNING decides which check-ins are
+    new, so concurrent scans of one QR code yield exactly one transition
+    and rewards can be applied to the returned pairs only. Rows already
+    closed as no-shows ('nbeen') are left alone.
+
+    Args:
+        pairs (list[tuple[int, str]]): (user_id, event_name) pairs.
+
+    Returns:
+        list[tuple[int, str]]: Pairs that changed to 'been' in this call.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(UserXEvent)
+            .where(
+                and_(
+                    tuple_(UserXEvent.user_id, UserXEvent.event_name).in_(pairs),
+                    UserXEvent.status == 'reg',
+                )
+            )
+            .values(status='been')
+            .returning(UserXEvent.user_id, UserXEvent.event_name)
+        )
+        checked_in = list(dict.fromkeys(tuple(row) for row in result.all()))
+        await session.commit()
+        return checked_in
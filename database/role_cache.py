@@ -0,0 +1,127 @@
+"""
+Role Cache
+In-memory superuser and face control sets for permission checks.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+from typing import NamedTuple
+
+from bot_instance import logger
+from database.req import get_roles
+
+RETRY_INTERVAL = 30.0
+
+
+# --------------------------------------------------------------------------------
+class Roles(NamedTuple):
+    """
+    Rights of one user.
+    """
+    superuser: bool
+    face_control: bool
+
+    @property
+    def staff(self) -> bool:
+        """Whether the user may check QR codes."""
+        return self.superuser or self.face_control
+
+
+# --------------------------------------------------------------------------------
+class RoleCache:
+    """
+    Superuser and face control IDs kept in memory.
+
+    Face control changes made through the bot are applied immediately with
+    grant_face_control / revoke_face_control; superuser flags are only set
+    in the database, so the sets are also reloaded periodically.
+
+    Args:
+        refresh_interval (float): Seconds between full reloads.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self._superusers: frozenset[int] = frozenset()
+        self._face_control: frozenset[int] = frozenset()
+        self._loaded = False
+
+    # ----------------------------------------------------------------------------
+    async def load(self) -> bool:
+        """
+        Reload roles from the database.
+
+        Returns:
+            bool: False if the database could not be read; old roles are kept.
+        """
+        roles = await get_roles()
+        self._loaded = bool(roles)
+        if not roles:
+            return False
+        self._superusers = frozenset(roles['superusers'])
+        self._face_control = frozenset(roles['face_control'])
+        logger.info(
+            f"Кэш ролей: {len(self._superusers)} администраторов, "
+            f"{len(self._face_control)} фейс-контроль"
+        )
+        return True
+
+    # ----------------------------------------------------------------------------
+    def roles(self, user_id: int) -> Roles:
+        """
+        Resolve rights of a user.
+
+        Args:
+            user_id (int): Telegram user ID.
+
+        Returns:
+            Roles: User rights.
+        """
+        return Roles(user_id in self._superusers, user_id in self._face_control)
+
+    def is_superuser(self, user_id: int) -> bool:
+        return user_id in self._superusers
+
+    def is_face_control(self, user_id: int) -> bool:
+        return user_id in self._face_control
+
+    # ----------------------------------------------------------------------------
+    def grant_face_control(self, user_id: int) -> None:
+        """
+        Record a face control user added through the bot.
+
+        Args:
+            user_id (int): Telegram user ID.
+
+        Returns:
+            None
+        """
+        self._face_control = self._face_control | {user_id}
+
+    def revoke_face_control(self, user_id: int) -> None:
+        """
+        Record a face control user removed through the bot.
+
+        Args:
+            user_id (int): Telegram user ID.
+
+        Returns:
+            None
+        """
+        self._face_control = self._face_control - {user_id}
+
+    # ----------------------------------------------------------------------------
+    async def run(self) -> None:
+        """
+        Reload roles periodically until cancelled; the first load is
+        expected to be awaited at startup.
+
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(self.refresh_interval if self._loaded else RETRY_INTERVAL)
+            await self.load()
+
+
+# --------------------------------------------------------------------------------
+role_cache = RoleCache()
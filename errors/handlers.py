@@ -3,6 +3,7 @@ Error Decorators
 Wrappers for database and statistic error handling.
 """
 # --------------------------------------------------------------------------------
+import time
 from functools import wraps
 
 from sqlalchemy.exc import NoResultFound
@@ -15,12 +16,20 @@ from errors.errors import (
     EventNameError,
     VacancyNameError,
 )
+from handlers.send_queue import send_queue
+from monitoring.metrics import DB_ERRORS, DB_LATENCY
+from monitoring.tracing import span
 
 
 # --------------------------------------------------------------------------------
 def db_error_handler(func):
     """
-    Decorator to handle database related exceptions.
+    Decorator to handle database related exceptions, record call latency
+    and error counts per function and trace the call as a db.* span.
+
+    Expected results such as Error404 for a missing row or a name conflict
+    are logged but not counted in DB_ERRORS, so the metric only tracks
+    real database failures.
 
     Args:
         func (Callable): Asynchronous function to wrap.
@@ -31,21 +40,35 @@ def db_error_handler(func):
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except (
-                Error404,
-                DatabaseConnectionError,
-                Error409,
-                EventNameError,
-                VacancyNameError,
-                NoResultFound,
-        ) as e:
-            logger.exception(str(e))
-            return None
-        except Exception as e:
-            logger.exception(f"Неизвестная ошибка: {str(e)}")
-            return None
+        started = time.perf_counter()
+        with span(f"db.{func.__name__}") as current:
+            try:
+                return await func(*args, **kwargs)
+            except (
+                    Error404,
+                    Error409,
+                    EventNameError,
+                    VacancyNameError,
+                    NoResultFound,
+            ) as e:
+                logger.exception(str(e))
+                if current is not None:
+                    current.error = f"{type(e).__name__}: {e}"
+                return None
+            except DatabaseConnectionError as e:
+                DB_ERRORS.inc(function=func.__name__, error=type(e).__name__)
+                logger.exception(str(e))
+                if current is not None:
+                    current.error = f"{type(e).__name__}: {e}"
+                return None
+            except Exception as e:
+                DB_ERRORS.inc(function=func.__name__, error=type(e).__name__)
+                logger.exception(f"Неизвестная ошибка: {str(e)}")
+                if current is not None:
+                    current.error = f"{type(e).__name__}: {e}"
+                return None
+            finally:
+                DB_LATENCY.observe(time.perf_counter() - started, function=func.__name__)
 
     return wrapper
 
@@ -74,9 +97,10 @@ def stat_error_handler(func):
                 f"Произошла ошибка при выполнении функции {func.__name__}: {str(e)}"
             )
             if user_id:
-                await bot.send_message(
-                    user_id,
-                    "Произошла ошибка при генерации отчета. Пожалуйста, попробуйте позже."
+                await send_queue.send(
+                    bot.send_message,
+                    chat_id=user_id,
+                    text="Произошла ошибка при генерации отчета. Пожалуйста, попробуйте позже."
                 )
 
     return wrapper
@@ -1,26 +1,43 @@
-import random
+from datetime import datetime, timezone
 
-from aiogram import Router, F
 from aiogram.filters import Command
+from aiogram.filters.command import CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
-from bot_instance import bot
-from database.req import (get_user, add_vacancy, delete_vacancy, get_users_tg_id, get_all_events,
-                          get_users_tg_id_in_event, get_random_user_from_event, update_event,
-                          get_random_user_from_event_wth_bad, get_all_vacancy_names, get_all_events_in_p,
-                          create_event, get_users_tg_id_in_event_bad, update_user_x_event_row_status, get_add_winner,
-                          get_users_unreg_tg_id, get_all_hosts_in_event_orgs, create_host,
-                          get_host_by_org_name, update_strick, get_all_for_networking, delete_all_from_networking,
-                          add_face_control, remove_face_control, get_face_control, list_face_control)
-from handlers.error import safe_send_message
+from bot_instance import bot, logger
+from database.req import (get_user, add_vacancy, delete_vacancy, count_recipients, iter_users_tg_id,
+                          iter_users_tg_id_in_event, get_random_user_from_event, update_event,
+                          get_random_user_from_event_wth_bad, get_all_vacancy_names,
+                          create_event, get_users_tg_id_in_event_bad, get_add_winner,
+                          count_users_unreg, iter_users_unreg_tg_id, get_all_hosts_in_event_orgs, create_host,
+                          get_host_by_org_name, get_all_for_networking,
+                          add_face_control, remove_face_control, get_face_control, list_face_control,
+                          reset_delivery_status, create_scheduled_post,
+                          get_pending_scheduled_posts, cancel_scheduled_post, get_event_participants,
+                          mark_no_shows)
+from database.event_cache import event_cache
+from database.role_cache import role_cache
+from handlers.error import delete_message, edit_message_text, safe_send_message
+from handlers.mailing import MailingPayload, broadcast, collect_album, fan_out, start_background
+from handlers.networking import run_round as run_networking_round
+from handlers.progress import ProgressReporter
+from handlers.qr_batch import run_pregen
+from handlers.routing import CallbackRouter, Data
+from handlers.scheduler import format_local, parse_local_time, quiet_until, schedule_reminders, utc_iso
+from keyboards.callbacks import FaceControlConfirmRemove, FaceControlRemove, SchedCancel
 from keyboards.keyboards import post_target, post_ev_target, stat_target, apply_winner, vacancy_selection_keyboard, \
-    single_command_button_keyboard, link_ikb, yes_no_link_ikb, unreg_yes_no_link_ikb, get_ref_ikb
+    single_command_button_keyboard, link_ikb, yes_no_link_ikb, unreg_yes_no_link_ikb, get_ref_ikb, sched_target, \
+    scheduled_posts_ikb, pregen_push_ikb
+from middlewares.roles import IsSuperuser
+from monitoring.metrics import count_handled_error
 from statistics.stat import get_stat_all, get_stat_all_in_ev, get_stat_quest, get_stat_ad_give_away, get_stat_reg_out, \
     get_stat_reg
 
-router = Router()
+router = CallbackRouter()
+# Every admin button is superuser-only; other callbacks pass on to the next routers
+router.callback_query.filter(IsSuperuser())
 
 
 class FaceControlState(StatesGroup):
@@ -29,13 +46,9 @@ class FaceControlState(StatesGroup):
     waiting_confirmation = State()  # Waiting for confirmation to remove
 
 
-@router.message(Command("face_control"))
+@router.message(Command("face_control"), IsSuperuser())
 async def cmd_face_control(message: Message):
     """Show face control management menu."""
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="➕ Добавить фейс-контроль", callback_data="face_control_add"),
@@ -53,13 +66,9 @@ async def cmd_face_control(message: Message):
     )
 
 
-@router.callback_query(F.data == "face_control")
+@router.callback_query(Data("face_control"))
 async def face_control_menu(callback: CallbackQuery):
     """Show face control management menu."""
-    user = await get_user(callback.from_user.id)
-    if not user.is_superuser:
-        return
-
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="➕ Добавить фейс-контроль", callback_data="face_control_add"),
@@ -68,7 +77,8 @@ async def face_control_menu(callback: CallbackQuery):
         [InlineKeyboardButton(text="📋 Список фейс-контроль", callback_data="face_control_list")]
     ])
 
-    await callback.message.edit_text(
+    await edit_message_text(
+        callback.message,
         "Управление фейс-контроль:\n"
         "• Добавить - назначить нового фейс-контроль\n"
         "• Удалить - снять права фейс-контроль\n"
@@ -77,36 +87,30 @@ async def face_control_menu(callback: CallbackQuery):
     )
 
 
-@router.callback_query(F.data == "face_control_add")
+@router.callback_query(Data("face_control_add"))
 async def face_control_add(callback: CallbackQuery, state: FSMContext):
     """Start process of adding a face control user."""
-    user = await get_user(callback.from_user.id)
-    if not user.is_superuser:
-        return
-
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
     ])
-    await callback.message.edit_text(
+    await edit_message_text(
+        callback.message,
         "Введите Telegram ID пользователя, которого хотите назначить фейс-контроль.\n"
         "ID можно получить, если пользователь перешлет сообщение от @getmyid_bot", reply_markup=keyboard
     )
     await state.set_state(FaceControlState.waiting_user_id)
 
 
-@router.callback_query(F.data == "face_control_remove")
+@router.callback_query(Data("face_control_remove"))
 async def face_control_remove(callback: CallbackQuery):
     """Show list of face control users to remove."""
-    user = await get_user(callback.from_user.id)
-    if not user.is_superuser:
-        return
-
     face_controls = await list_face_control()
     if not face_controls:
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
         ])
-        await callback.message.edit_text(
+        await edit_message_text(
+            callback.message,
             "Нет назначенных фейс-контроль",
             reply_markup=keyboard
         )
@@ -115,19 +119,20 @@ async def face_control_remove(callback: CallbackQuery):
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(
             text=f"@{fc.username or 'No username'} ({fc.user_id})",
-            callback_data=f"face_control_remove_{fc.user_id}"
+            callback_data=FaceControlRemove(user_id=fc.user_id).pack()
         )]
         for fc in face_controls
     ])
     keyboard.inline_keyboard.append([InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")])
 
-    await callback.message.edit_text(
+    await edit_message_text(
+        callback.message,
         "Выберите пользователя, которого хотите снять с фейс-контроль:",
         reply_markup=keyboard
     )
 
 
-@router.callback_query(F.data == "face_control_list")
+@router.callback_query(Data("face_control_list"))
 async def face_control_list(callback: CallbackQuery):
     """List all face control users."""
     try:
@@ -136,7 +141,8 @@ async def face_control_list(callback: CallbackQuery):
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
             ])
-            await callback.message.edit_text(
+            await edit_message_text(
+                callback.message,
                 "Нет назначенных фейс-контроль",
                 reply_markup=keyboard
             )
@@ -149,20 +155,17 @@ async def face_control_list(callback: CallbackQuery):
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
         ])
-        await callback.message.edit_text(msg, reply_markup=keyboard)
+        await edit_message_text(callback.message, msg, reply_markup=keyboard)
     except Exception as e:
-        print(f"Error listing face control users: {e}")
+        logger.exception(f"Error listing face control users: {e}")
+        count_handled_error(face_control_list)
         await callback.answer("Произошла ошибка при получении списка фейс-контроль")
 
 
-@router.callback_query(F.data.startswith("face_control_remove_"))
-async def face_control_remove_confirm(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(FaceControlRemove.filter())
+async def face_control_remove_confirm(callback: CallbackQuery, callback_data: FaceControlRemove, state: FSMContext):
     """Confirm removal of face control user."""
-    user = await get_user(callback.from_user.id)
-    if not user.is_superuser:
-        return
-
-    user_id = int(callback.data.split("_")[-1])
+    user_id = callback_data.user_id
     face_control = await get_face_control(user_id)
     if face_control == "not found":
         await callback.answer("Пользователь не найден")
@@ -170,50 +173,45 @@ async def face_control_remove_confirm(callback: CallbackQuery, state: FSMContext
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="✅ Да", callback_data=f"face_control_confirm_remove_{user_id}"),
+            InlineKeyboardButton(text="✅ Да", callback_data=FaceControlConfirmRemove(user_id=user_id).pack()),
             InlineKeyboardButton(text="❌ Нет", callback_data="face_control_cancel_remove")
         ]
     ])
 
-    await callback.message.edit_text(
+    await edit_message_text(
+        callback.message,
         f"Вы уверены, что хотите снять права фейс-контроль у пользователя @{face_control.username or 'No username'}?",
         reply_markup=keyboard
     )
 
 
-@router.callback_query(F.data.startswith("face_control_confirm_remove_"))
-async def face_control_remove_execute(callback: CallbackQuery):
+@router.callback_query(FaceControlConfirmRemove.filter())
+async def face_control_remove_execute(callback: CallbackQuery, callback_data: FaceControlConfirmRemove):
     """Execute removal of face control user."""
-    user = await get_user(callback.from_user.id)
-    if not user.is_superuser:
-        return
-
-    user_id = int(callback.data.split("_")[-1])
+    user_id = callback_data.user_id
     success = await remove_face_control(user_id)
+    if success:
+        role_cache.revoke_face_control(user_id)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
     ])
     
     if success:
-        await callback.message.edit_text("✅ Пользователь снят с фейс-контроль", reply_markup=keyboard)
+        await edit_message_text(callback.message, "✅ Пользователь снят с фейс-контроль", reply_markup=keyboard)
     else:
-        await callback.message.edit_text("❌ Не удалось снять пользователя с фейс-контроль", reply_markup=keyboard)
+        await edit_message_text(callback.message, "❌ Не удалось снять пользователя с фейс-контроль", reply_markup=keyboard)
 
 
-@router.callback_query(F.data == "face_control_cancel_remove")
+@router.callback_query(Data("face_control_cancel_remove"))
 async def face_control_cancel_remove(callback: CallbackQuery):
     """Cancel removal of face control user."""
-    await callback.message.edit_text("❌ Операция отменена")
+    await edit_message_text(callback.message, "❌ Операция отменена")
 
 
-@router.message(FaceControlState.waiting_user_id)
+@router.message(FaceControlState.waiting_user_id, IsSuperuser())
 async def face_control_add_process(message: Message, state: FSMContext):
     """Process adding a new face control user."""
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-
     try:
         user_id = int(message.text)
         target_user = await get_user(user_id)
@@ -230,12 +228,14 @@ async def face_control_add_process(message: Message, state: FSMContext):
             return
 
         # Add user as face control
-        await add_face_control(
+        added = await add_face_control(
             user_id=user_id,
             admin_id=message.from_user.id,
             username=target_user.handler,
             full_name=""
         )
+        if added:
+            role_cache.grant_face_control(user_id)
 
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="◀️ Назад", callback_data="face_control")]
@@ -247,12 +247,26 @@ async def face_control_add_process(message: Message, state: FSMContext):
     except ValueError:
         await safe_send_message(bot, message, "❌ Неверный формат ID. Введите числовой ID пользователя")
     except Exception as e:
-        print(f"Error adding face control: {e}")
+        logger.exception(f"Error adding face control: {e}")
+        count_handled_error(face_control_add_process)
         await safe_send_message(bot, message, "❌ Произошла ошибка при назначении фейс-контроль")
     
     await state.clear()
 
 
+@router.message(Command("reset_delivery"), IsSuperuser())
+async def cmd_reset_delivery(message: Message, command: CommandObject):
+    """Clear undeliverable flags for all users or for a single user ID."""
+    tg_id = None
+    if command.args:
+        if not command.args.strip().isdigit():
+            await safe_send_message(bot, message, "❌ Неверный формат ID. Введите числовой ID пользователя")
+            return
+        tg_id = int(command.args.strip())
+    cnt = await reset_delivery_status(tg_id)
+    await safe_send_message(bot, message, f"✅ Сброшено отметок о недоступности: {cnt or 0}")
+
+
 class EventCreateState(StatesGroup):
     waiting_event_name = State()
     waiting_event_date = State()
@@ -261,11 +275,8 @@ class EventCreateState(StatesGroup):
     waiting_links_count = State()
 
 
-@router.message(Command("add_event"))
+@router.message(Command("add_event"), IsSuperuser())
 async def cmd_add_event(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     await safe_send_message(bot, message, "Введите полное название события")
     await state.set_state(EventCreateState.waiting_event_name)
 
@@ -361,12 +372,9 @@ class EventState(StatesGroup):
     waiting_links_count = State()
 
 
-@router.message(Command("get_link"))
+@router.message(Command("get_link"), IsSuperuser())
 async def get_link(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    events = await get_all_events_in_p()
+    events = event_cache.active_names()
     if not events:
         await safe_send_message(bot, message, 'У вас нет событий((')
     await safe_send_message(bot, message, text="Выберете событие", reply_markup=post_ev_target(events))
@@ -401,12 +409,9 @@ async def make_link(message: Message, state: FSMContext):
     await state.clear()
 
 
-@router.message(Command("end_event"))
+@router.message(Command("end_event"), IsSuperuser())
 async def cmd_end_event(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    events = await get_all_events_in_p()
+    events = event_cache.active_names()
     if not events:
         await safe_send_message(bot, message, "Нет активных событий(")
         return
@@ -430,7 +435,7 @@ async def process_end_event(message: Message, state: FSMContext):
                                                f"аудитории", reply_markup=apply_winner())
 
 
-@router.callback_query(F.data == "reroll")
+@router.callback_query(Data("reroll"))
 async def reroll_end_event(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     bad_ids = data.get("bad_ids")
@@ -450,7 +455,7 @@ async def reroll_end_event(callback: CallbackQuery, state: FSMContext):
                                  f"аудитории", reply_markup=apply_winner())
 
 
-@router.callback_query(F.data == "confirm")
+@router.callback_query(Data("confirm"))
 async def confirm_end_event(callback: CallbackQuery, state: FSMContext):
     await safe_send_message(bot, callback, text="Отличное, рассылаю все информацию")
     data = await state.get_data()
@@ -458,21 +463,24 @@ async def confirm_end_event(callback: CallbackQuery, state: FSMContext):
     user_id = data.get("user_id")
     await update_event(event_name, {'winner': user_id, "status": "end"})
     user = await get_user(user_id)
-    user_ids = await get_users_tg_id_in_event(event_name)
+    participants = await get_event_participants(event_name)
+    if participants is None:
+        await safe_send_message(bot, callback, "Не удалось получить участников, попробуйте еще раз")
+        return
+    await state.clear()
+    user_ids = [uid for uid, status, deliverable in participants if status == 'been' and deliverable]
+    bad_user_ids = [uid for uid, status, _ in participants if status == 'reg']
     if not user_ids:
-        await safe_send_message(bot, user_id, text=f"У вас нет пользователей))",
+        await safe_send_message(bot, callback, text=f"У вас нет пользователей))",
                                 reply_markup=single_command_button_keyboard())
     else:
-        for user_id in user_ids:
-            await safe_send_message(bot, user_id, text=f"Сегодняшний победитель - @{user.handler}",
-                                    reply_markup=single_command_button_keyboard())
-    bad_user_ids = await get_users_tg_id_in_event_bad(event_name)
-    if bad_user_ids:
-        for user_id in bad_user_ids:
-            await update_strick(user_id, 0)
-            await update_user_x_event_row_status(user_id, event_name, 'nbeen')
+        payload = MailingPayload.from_text(f"Сегодняшний победитель - @{user.handler}",
+                                           single_command_button_keyboard())
+        reporter = ProgressReporter(callback.message.chat.id, len(user_ids), details=f"Событие: {event_name}\n")
+        await reporter.start()
+        start_background(fan_out(payload, user_ids, reporter), name=f"winner:{event_name}")
+    await mark_no_shows(event_name, bad_user_ids)
     await safe_send_message(bot, callback, 'Готово')
-    await state.clear()
 
 
 class VacancyState(StatesGroup):
@@ -480,11 +488,8 @@ class VacancyState(StatesGroup):
     waiting_for_vacancy_name_to_delete = State()
 
 
-@router.message(Command("all_vacancies"))
+@router.message(Command("all_vacancies"), IsSuperuser())
 async def cmd_all_vacancies(message: Message):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     vacancies = await get_all_vacancy_names()
     if not vacancies:
         await safe_send_message(bot, message, text="У вас нет активных вакансий")
@@ -495,14 +500,8 @@ async def cmd_all_vacancies(message: Message):
     await safe_send_message(bot, message, text=msg, reply_markup=single_command_button_keyboard())
 
 
-@router.message(Command("add_vacancy"))
+@router.message(Command("add_vacancy"), IsSuperuser())
 async def cmd_add_vacancy(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     await safe_send_message(bot, message, text="Введите название вакансии")
     await state.set_state(VacancyState.waiting_for_vacancy_name)
 
@@ -515,23 +514,17 @@ async def process_vacancy_name(message: Message, state: FSMContext):
     vacancy_name = message.text
     resp = await add_vacancy(vacancy_name)
     if not resp:
-        await message.answer(f"Вакансия с именем '{vacancy_name}' уже существует.\n"
-                             f"Если хотите добавить другую - напишите ее название.\n"
-                             f"Если не хотите напишите \"стоп\"")
+        await safe_send_message(bot, message, f"Вакансия с именем '{vacancy_name}' уже существует.\n"
+                                              f"Если хотите добавить другую - напишите ее название.\n"
+                                              f"Если не хотите напишите \"стоп\"")
     else:
-        await message.answer(f"Вакансия '{vacancy_name}' успешно добавлена.",
-                             reply_markup=single_command_button_keyboard())
+        await safe_send_message(bot, message, f"Вакансия '{vacancy_name}' успешно добавлена.",
+                                reply_markup=single_command_button_keyboard())
         await state.clear()
 
 
-@router.message(Command("dell_vacancy"))
+@router.message(Command("dell_vacancy"), IsSuperuser())
 async def cmd_dell_vacancy(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     vacancies = await get_all_vacancy_names()
     await safe_send_message(bot, message, text="Выберете название вакансии, которую вы хотите удалить",
                             reply_markup=vacancy_selection_keyboard(vacancies))
@@ -543,9 +536,11 @@ async def process_vacancy_name_to_delete(message: Message, state: FSMContext):
     vacancy_name = message.text
     resp = await delete_vacancy(vacancy_name)
     if not resp:
-        await message.answer(f"Вакансии '{vacancy_name}' нет.", reply_markup=single_command_button_keyboard())
+        await safe_send_message(bot, message, f"Вакансии '{vacancy_name}' нет.",
+                                reply_markup=single_command_button_keyboard())
         await state.clear()
-    await message.answer(f"Вакансия '{vacancy_name}' успешно удалена.", reply_markup=single_command_button_keyboard())
+    await safe_send_message(bot, message, f"Вакансия '{vacancy_name}' успешно удалена.",
+                            reply_markup=single_command_button_keyboard())
     await state.clear()
 
 
@@ -566,25 +561,22 @@ class PostState(StatesGroup):
     waiting_for_post_to_all_media_unreg = State()
 
 
-@router.message(Command("send_post"))
+@router.message(Command("send_post"), IsSuperuser())
 async def cmd_send_post(message: Message):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     await safe_send_message(bot, message, text="Выберете кому вы хотите отправить пост", reply_markup=post_target())
 
 
-@router.callback_query(F.data == "cancel")
+@router.callback_query(Data("cancel"))
 async def cancel(callback: CallbackQuery, state: FSMContext):
-    await bot.delete_message(callback.from_user.id, callback.message.message_id)
-    await bot.delete_message(callback.from_user.id, callback.message.message_id - 1)
+    await delete_message(callback.from_user.id, callback.message.message_id)
+    await delete_message(callback.from_user.id, callback.message.message_id - 1)
     await state.clear()
     return
 
 
-@router.callback_query(F.data == "post_to_unreg")
+@router.callback_query(Data("post_to_unreg"))
 async def choose_event(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий")
         return
@@ -599,19 +591,33 @@ async def mb_add_link_unreg(message: Message, state: FSMContext):
     await safe_send_message(bot, message, "Хочешь добавить к посту кнопку с ссылкой?", unreg_yes_no_link_ikb())
 
 
-@router.callback_query(F.data == "unreg_link_no")
+@router.callback_query(Data("unreg_link_no"))
 async def link_no_unreg(callback: CallbackQuery, state: FSMContext):
     await state.update_data({'flag': False})
-    await safe_send_message(bot, callback, text="Отправьте мне пост (текст, фото или видео)\n\nДля отмены введите quit")
+    await safe_send_message(bot, callback, text="Отправьте мне пост (текст, фото, видео, документ, GIF или альбом)\n\nДля отмены введите quit")
     await state.set_state(PostState.waiting_for_post_to_all_media_unreg)
 
 
-@router.callback_query(F.data == "unreg_link_yes")
+@router.callback_query(Data("unreg_link_yes"))
 async def link_yes_unreg(callback: CallbackQuery, state: FSMContext):
     await safe_send_message(bot, callback, text="Отправь мне ссылку\n\nДля отмены введите quit")
     await state.set_state(PostState.waiting_for_post_to_all_text05_unreg)
 
 
+async def _post_messages(message: Message) -> list[Message] | None:
+    """Collect the post (single message or whole album), or None if there is nothing to send."""
+    messages = [message]
+    if message.media_group_id:
+        messages = await collect_album(message)
+        if messages is None:
+            return None
+    if MailingPayload.from_messages(messages) is None:
+        await safe_send_message(bot, message, "Этот тип сообщения нельзя разослать. "
+                                              "Отправьте текст, фото, видео, документ, GIF или альбом")
+        return None
+    return messages
+
+
 @router.message(PostState.waiting_for_post_to_all_media_unreg)
 async def process_post_to_all_media_unreg(message: Message, state: FSMContext):
     if message.text and message.text.lower() == 'quit':
@@ -619,111 +625,46 @@ async def process_post_to_all_media_unreg(message: Message, state: FSMContext):
         await state.clear()
         return
     
+    messages = await _post_messages(message)
+    if messages is None:
+        return
+
     data = await state.get_data()
     event_name = data.get('event_name')
     flag = data.get('flag', False)
-    user_ids = await get_users_unreg_tg_id(event_name)
+    total = await count_users_unreg(event_name)
     
-    if not user_ids:
+    if not total:
         await safe_send_message(bot, message, text="У вас нет пользователей((",
                                 reply_markup=single_command_button_keyboard())
         return
 
-    # Send initial status message
-    status_message = await safe_send_message(bot, message, 
-        f"🚀 Начинаю рассылку для незарегистрированных пользователей события {event_name}...\n"
-        f"Всего получателей: {len(user_ids)}\nОтправлено: 0\nОшибок: 0")
-
     reply_markup = None
     if flag:
         link = data.get('link')
         text = data.get('text')
         reply_markup = link_ikb(text, link)
+    payload = MailingPayload.from_messages(messages, reply_markup or single_command_button_keyboard())
 
-    failed_users = []
-    success_count = 0
-    total = len(user_ids)
-
-    async def update_status(text: str):
-        nonlocal status_message
-        try:
-            await bot.edit_message_text(
-                chat_id=message.chat.id,
-                message_id=status_message.message_id,
-                text=text
-            )
-        except Exception:
-            try:
-                await bot.delete_message(message.chat.id, status_message.message_id)
-            except Exception:
-                pass
-            status_message = await safe_send_message(bot, message, text)
-
-    for i, user_id in enumerate(user_ids, 1):
-        try:
-            if message.photo:
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=message.photo[-1].file_id,
-                    caption=message.caption,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            elif message.video:
-                await bot.send_video(
-                    chat_id=user_id,
-                    video=message.video.file_id,
-                    caption=message.caption,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            else:
-                await safe_send_message(
-                    bot, 
-                    user_id, 
-                    text=message.text,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            success_count += 1
-            
-            # Update status every 10 messages or on last message
-            if i % 10 == 0 or i == total:
-                await update_status(
-                    f"📨 Рассылка в процессе...\n"
-                    f"Событие: {event_name}\n"
-                    f"Всего получателей: {total}\n"
-                    f"Отправлено: {success_count}\n"
-                    f"Ошибок: {len(failed_users)}\n"
-                    f"Прогресс: {i}/{total} ({int(i/total*100)}%)"
-                )
-                
-        except Exception as e:
-            failed_users.append(user_id)
-            continue
-
-    # Send final status
-    await update_status(
-        f"✅ Рассылка завершена!\n"
-        f"Событие: {event_name}\n"
-        f"Всего получателей: {total}\n"
-        f"Успешно отправлено: {success_count}\n"
-        f"Ошибок: {len(failed_users)}"
-    )
-    
     await state.clear()
+    reporter = ProgressReporter(message.chat.id, total, details=f"Событие: {event_name}\n")
+    await reporter.start()
+    await broadcast(payload, iter_users_unreg_tg_id(event_name), reporter)
 
 
-@router.callback_query(F.data == "post_to_all")
+@router.callback_query(Data("post_to_all"))
 async def mb_add_link(callback: CallbackQuery, state: FSMContext):
     await safe_send_message(bot, callback, "Хочешь добавить к посту кнопку с ссылкой?", yes_no_link_ikb())
 
 
-@router.callback_query(F.data == "link_no")
+@router.callback_query(Data("link_no"))
 async def link_no(callback: CallbackQuery, state: FSMContext):
     await state.update_data({'flag': False})
-    await safe_send_message(bot, callback, text="Отправьте мне пост (текст, фото или видео)\n\nДля отмены введите quit")
+    await safe_send_message(bot, callback, text="Отправьте мне пост (текст, фото, видео, документ, GIF или альбом)\n\nДля отмены введите quit")
     await state.set_state(PostState.waiting_for_post_to_all_media)
 
 
-@router.callback_query(F.data == "link_yes")
+@router.callback_query(Data("link_yes"))
 async def link_yes(callback: CallbackQuery, state: FSMContext):
     await safe_send_message(bot, callback, text="Отправь мне ссылку\n\nДля отмены введите quit")
     await state.set_state(PostState.waiting_for_post_to_all_text05)
@@ -736,16 +677,16 @@ async def process_post_to_all_media(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    user_ids = await get_users_tg_id()
-    if not user_ids:
+    messages = await _post_messages(message)
+    if messages is None:
+        return
+
+    total = await count_recipients('all')
+    if not total:
         await safe_send_message(bot, message, text="У вас нет пользователей((",
                                 reply_markup=single_command_button_keyboard())
         return
 
-    # Send initial status message
-    status_message = await safe_send_message(bot, message, 
-        f"🚀 Начинаю рассылку...\nВсего получателей: {len(user_ids)}\nОтправлено: 0\nОшибок: 0")
-    
     data = await state.get_data()
     flag = data.get('flag', False)
     reply_markup = None
@@ -753,74 +694,12 @@ async def process_post_to_all_media(message: Message, state: FSMContext):
         link = data.get('link')
         text = data.get('text')
         reply_markup = link_ikb(text, link)
+    payload = MailingPayload.from_messages(messages, reply_markup or single_command_button_keyboard())
 
-    failed_users = []
-    success_count = 0
-    total = len(user_ids)
-
-    async def update_status(text: str):
-        nonlocal status_message
-        try:
-            await bot.edit_message_text(
-                chat_id=message.chat.id,
-                message_id=status_message.message_id,
-                text=text
-            )
-        except Exception:
-            try:
-                await bot.delete_message(message.chat.id, status_message.message_id)
-            except Exception:
-                pass
-            status_message = await safe_send_message(bot, message, text)
-
-    for i, user_id in enumerate(user_ids, 1):
-        try:
-            if message.photo:
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=message.photo[-1].file_id,
-                    caption=message.caption,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            elif message.video:
-                await bot.send_video(
-                    chat_id=user_id,
-                    video=message.video.file_id,
-                    caption=message.caption,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            else:
-                await safe_send_message(
-                    bot, 
-                    user_id, 
-                    text=message.text,
-                    reply_markup=reply_markup or single_command_button_keyboard()
-                )
-            success_count += 1
-            
-            # Update status every 10 messages or on last message
-            if i % 10 == 0 or i == total:
-                await update_status(
-                    f"📨 Рассылка в процессе...\n"
-                    f"Всего получателей: {total}\n"
-                    f"Отправлено: {success_count}\n"
-                    f"Ошибок: {len(failed_users)}\n"
-                    f"Прогресс: {i}/{total} ({int(i/total*100)}%)"
-                )
-                
-        except Exception as e:
-            failed_users.append(user_id)
-            continue
-
-    # Send final status
-    await update_status(
-        f"✅ Рассылка завершена!\n"
-        f"Всего получателей: {total}\n"
-        f"Успешно отправлено: {success_count}\n"
-        f"Ошибок: {len(failed_users)}"
-    )
-    
     await state.clear()
+    reporter = ProgressReporter(message.chat.id, total)
+    await reporter.start()
+    await broadcast(payload, iter_users_tg_id(), reporter)
 
 
 @router.message(PostState.waiting_for_post_to_all_text05)
@@ -841,7 +720,7 @@ async def cmd_post_to_all(message: Message, state: FSMContext):
         await state.clear()
         return
     await state.update_data({'text': message.text})
-    await safe_send_message(bot, message, text="Отправьте мне пост (текст, фото или видео)\n\nДля отмены введите quit")
+    await safe_send_message(bot, message, text="Отправьте мне пост (текст, фото, видео, документ, GIF или альбом)\n\nДля отмены введите quit")
     await state.set_state(PostState.waiting_for_post_to_all_media)
 
 
@@ -851,26 +730,28 @@ async def process_post_to_all(message: Message, state: FSMContext):
         await safe_send_message(bot, message, 'Вы вышли')
         await state.clear()
         return
-    user_ids = await get_users_tg_id()
+    total = await count_recipients('all')
     data = await state.get_data()
     flag = data.get('flag')
     if flag:
         link = data.get('link')
         text = data.get('text')
-    if not user_ids:
+    if not total:
         await safe_send_message(bot, message, text="У вас нет пользователей((",
                                 reply_markup=single_command_button_keyboard())
         return
-    for user_id in user_ids:
-        await safe_send_message(bot, user_id, text=message.text,
-                                reply_markup=(single_command_button_keyboard() if not flag else link_ikb(text, link)))
-    await safe_send_message(bot, message, "Готово", reply_markup=single_command_button_keyboard())
+    payload = MailingPayload.from_text(
+        message.text, single_command_button_keyboard() if not flag else link_ikb(text, link)
+    )
     await state.clear()
+    reporter = ProgressReporter(message.chat.id, total)
+    await reporter.start()
+    await broadcast(payload, iter_users_tg_id(), reporter)
 
 
-@router.callback_query(F.data == "post_to_ev")
+@router.callback_query(Data("post_to_ev"))
 async def cmd_post_to_ev(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий")
         return
@@ -885,7 +766,7 @@ async def pre_process_post_to_ev(message: Message, state: FSMContext):
         await safe_send_message(bot, message, 'Вы вышли')
         await state.clear()
         return
-    await safe_send_message(bot, message, text="Отправьте мне пост (текст, фото или видео)\n\nДля отмены введите quit")
+    await safe_send_message(bot, message, text="Отправьте мне пост (текст, фото, видео, документ, GIF или альбом)\n\nДля отмены введите quit")
     await state.update_data(event_name=message.text)
     await state.set_state(PostState.waiting_for_post_to_ev_media)
 
@@ -897,92 +778,28 @@ async def process_post_to_ev_media(message: Message, state: FSMContext):
         await state.clear()
         return
 
+    messages = await _post_messages(message)
+    if messages is None:
+        return
+
     data = await state.get_data()
     event_name = data.get("event_name")
-    user_ids = await get_users_tg_id_in_event(event_name)
-    if not user_ids:
+    total = await count_recipients('event', event_name)
+    if not total:
         await safe_send_message(bot, message, text="У вас нет пользователей принявших участие в этом событии",
                                 reply_markup=single_command_button_keyboard())
         return
+    payload = MailingPayload.from_messages(messages, single_command_button_keyboard())
 
-    # Send initial status message
-    status_message = await safe_send_message(bot, message, 
-        f"🚀 Начинаю рассылку для события {event_name}...\nВсего получателей: {len(user_ids)}\nОтправлено: 0\nОшибок: 0")
-
-    failed_users = []
-    success_count = 0
-    total = len(user_ids)
-
-    async def update_status(text: str):
-        nonlocal status_message
-        try:
-            await bot.edit_message_text(
-                chat_id=message.chat.id,
-                message_id=status_message.message_id,
-                text=text
-            )
-        except Exception:
-            try:
-                await bot.delete_message(message.chat.id, status_message.message_id)
-            except Exception:
-                pass
-            status_message = await safe_send_message(bot, message, text)
-
-    for i, user_id in enumerate(user_ids, 1):
-        try:
-            if message.photo:
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=message.photo[-1].file_id,
-                    caption=message.caption,
-                    reply_markup=single_command_button_keyboard()
-                )
-            elif message.video:
-                await bot.send_video(
-                    chat_id=user_id,
-                    video=message.video.file_id,
-                    caption=message.caption,
-                    reply_markup=single_command_button_keyboard()
-                )
-            else:
-                await safe_send_message(
-                    bot, 
-                    user_id, 
-                    text=message.text,
-                    reply_markup=single_command_button_keyboard()
-                )
-            success_count += 1
-            
-            # Update status every 10 messages or on last message
-            if i % 10 == 0 or i == total:
-                await update_status(
-                    f"📨 Рассылка в процессе...\n"
-                    f"Событие: {event_name}\n"
-                    f"Всего получателей: {total}\n"
-                    f"Отправлено: {success_count}\n"
-                    f"Ошибок: {len(failed_users)}\n"
-                    f"Прогресс: {i}/{total} ({int(i/total*100)}%)"
-                )
-                
-        except Exception as e:
-            failed_users.append(user_id)
-            continue
-
-    # Send final status
-    await update_status(
-        f"✅ Рассылка завершена!\n"
-        f"Событие: {event_name}\n"
-        f"Всего получателей: {total}\n"
-        f"Успешно отправлено: {success_count}\n"
-        f"Ошибок: {len(failed_users)}"
-    )
-    
     await state.clear()
+    reporter = ProgressReporter(message.chat.id, total, details=f"Событие: {event_name}\n")
+    await reporter.start()
+    await broadcast(payload, iter_users_tg_id_in_event(event_name), reporter)
 
 
-@router.callback_query(F.data == "post_wth_op_to_ev")
+@router.callback_query(Data("post_wth_op_to_ev"))
 async def cmd_post_to_ev(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий")
         return
@@ -1020,15 +837,244 @@ async def process_post_to_wth_op_to_ev(message: Message, state: FSMContext):
         return
     data = await state.get_data()
     event_name = data.get("event_name")
-    user_ids = await get_users_tg_id_in_event(event_name)
-    if not user_ids:
+    total = await count_recipients('event', event_name)
+    if not total:
         await safe_send_message(bot, message, text="У вас нет пользователей принявших участие в этом событии",
                                 reply_markup=single_command_button_keyboard())
         return
-    for user_id in user_ids:
-        await safe_send_message(bot, user_id, text=msg, reply_markup=link_ikb('Форма обратной связи', message.text))
-    await safe_send_message(bot, message, "Готово", reply_markup=single_command_button_keyboard())
+    payload = MailingPayload.from_text(msg, link_ikb('Форма обратной связи', message.text))
+    await state.clear()
+    reporter = ProgressReporter(message.chat.id, total, details=f"Событие: {event_name}\n")
+    await reporter.start()
+    await broadcast(payload, iter_users_tg_id_in_event(event_name), reporter)
+
+
+class ScheduleState(StatesGroup):
+    waiting_event = State()
+    waiting_time = State()
+    waiting_post = State()
+    waiting_remind_event = State()
+    waiting_remind_hours = State()
+
+
+sched_targets = {
+    'all': "Всем пользователям",
+    'event': "Участникам ивента",
+    'unreg': "Незареганным на ивент",
+    'reminder': "Напоминание зареганным",
+}
+
+
+@router.message(Command("schedule_post"), IsSuperuser())
+async def cmd_schedule_post(message: Message):
+    await safe_send_message(bot, message, text="Выберете кому вы хотите отправить отложенный пост",
+                            reply_markup=sched_target())
+
+
+@router.callback_query(Data("sched_all", "sched_ev", "sched_unreg"))
+async def sched_choose_target(callback: CallbackQuery, state: FSMContext):
+    target = {'sched_all': 'all', 'sched_ev': 'event', 'sched_unreg': 'unreg'}[callback.data]
+    await state.update_data({'target': target, 'event_name': None})
+    if target == 'all':
+        await safe_send_message(bot, callback, text="Введите дату и время отправки в формате DD.MM.YY HH:MM"
+                                                    "\n\nДля отмены введите quit")
+        await state.set_state(ScheduleState.waiting_time)
+        return
+    events = event_cache.names()
+    if not events:
+        await safe_send_message(bot, callback, text="У вас нет событий")
+        return
+    await safe_send_message(bot, callback, text="Выберете событие:\n\nДля отмены введите quit",
+                            reply_markup=post_ev_target(events))
+    await state.set_state(ScheduleState.waiting_event)
+
+
+@router.message(ScheduleState.waiting_event)
+async def sched_choose_event(message: Message, state: FSMContext):
+    if message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+    await state.update_data({'event_name': message.text})
+    await safe_send_message(bot, message, text="Введите дату и время отправки в формате DD.MM.YY HH:MM"
+                                               "\n\nДля отмены введите quit")
+    await state.set_state(ScheduleState.waiting_time)
+
+
+@router.message(ScheduleState.waiting_time)
+async def sched_choose_time(message: Message, state: FSMContext):
+    if message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+    run_at = parse_local_time(message.text)
+    if run_at is None:
+        await safe_send_message(bot, message, "Неверный формат. Введите дату и время в формате DD.MM.YY HH:MM")
+        return
+    if run_at <= datetime.now(timezone.utc):
+        await safe_send_message(bot, message, "Это время уже прошло, введите время в будущем")
+        return
+    await state.update_data({'run_at': utc_iso(run_at)})
+    await safe_send_message(bot, message, text="Отправьте мне пост (текст, фото, видео, документ, GIF или альбом)"
+                                               "\n\nДля отмены введите quit")
+    await state.set_state(ScheduleState.waiting_post)
+
+
+@router.message(ScheduleState.waiting_post)
+async def sched_save_post(message: Message, state: FSMContext):
+    if message.text and message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+
+    messages = await _post_messages(message)
+    if messages is None:
+        return
+
+    data = await state.get_data()
+    payload = MailingPayload.from_messages(messages, single_command_button_keyboard())
+    post = await create_scheduled_post({
+        'target': data.get('target'),
+        'event_name': data.get('event_name'),
+        'payload': payload.dump(),
+        'run_at': data.get('run_at'),
+        'created_by': message.from_user.id,
+    })
+    if not post:
+        await safe_send_message(bot, message, "❌ Не удалось запланировать пост")
+        await state.clear()
+        return
+    text = f"✅ Пост #{post.id} запланирован на {format_local(post.run_at)}"
+    if quiet_until(datetime.fromisoformat(post.run_at).replace(tzinfo=timezone.utc)):
+        text += "\nЭто время попадает в тихие часы, отправка начнется после их окончания"
+    await safe_send_message(bot, message, text, reply_markup=single_command_button_keyboard())
+    await state.clear()
+
+
+@router.message(Command("scheduled"), IsSuperuser())
+async def cmd_scheduled(message: Message):
+    posts = await get_pending_scheduled_posts()
+    if not posts:
+        await safe_send_message(bot, message, "Нет запланированных рассылок")
+        return
+    lines = []
+    for post in posts:
+        line = f"#{post.id} — {format_local(post.run_at)} — {sched_targets.get(post.target, post.target)}"
+        if post.event_name:
+            line += f" ({post.event_name})"
+        if post.status == 'running' and post.resume_at:
+            line += f" — приостановлена до {format_local(post.resume_at)}, обработано {post.sent_cnt}"
+        elif post.status == 'running':
+            line += f" — идет отправка, обработано {post.sent_cnt}"
+        lines.append(line)
+    pending = [post.id for post in posts if post.status == 'pending']
+    await safe_send_message(bot, message, "Запланированные рассылки:\n\n" + "\n".join(lines),
+                            reply_markup=scheduled_posts_ikb(pending))
+
+
+@router.callback_query(SchedCancel.filter())
+async def sched_cancel(callback: CallbackQuery, callback_data: SchedCancel):
+    post_id = callback_data.post_id
+    if await cancel_scheduled_post(post_id):
+        await safe_send_message(bot, callback, f"✅ Рассылка #{post_id} отменена")
+    else:
+        await safe_send_message(bot, callback, f"❌ Рассылку #{post_id} уже нельзя отменить")
+
+
+@router.message(Command("remind_event"), IsSuperuser())
+async def cmd_remind_event(message: Message, state: FSMContext):
+    events = event_cache.active_names()
+    if not events:
+        await safe_send_message(bot, message, text="У вас нет активных событий")
+        return
+    await safe_send_message(bot, message, text="Выберете событие:\n\nДля отмены введите quit",
+                            reply_markup=post_ev_target(events))
+    await state.set_state(ScheduleState.waiting_remind_event)
+
+
+@router.message(ScheduleState.waiting_remind_event)
+async def remind_choose_event(message: Message, state: FSMContext):
+    if message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+    await state.update_data({'event_name': message.text})
+    await safe_send_message(bot, message, text="За сколько часов до начала напомнить? Введите числа через пробел, "
+                                               "например: 24 2\n\nДля отмены введите quit")
+    await state.set_state(ScheduleState.waiting_remind_hours)
+
+
+@router.message(ScheduleState.waiting_remind_hours)
+async def remind_choose_hours(message: Message, state: FSMContext):
+    if message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+    parts = message.text.split()
+    if not parts or not all(part.isdigit() for part in parts):
+        await safe_send_message(bot, message, "Неверный формат. Введите количество часов через пробел, например: 24 2")
+        return
+    data = await state.get_data()
+    event = await event_cache.get(data.get('event_name'))
+    if event == "not created" or not event:
+        await safe_send_message(bot, message, "❌ Событие не найдено")
+        await state.clear()
+        return
+    run_times = await schedule_reminders(event, [int(part) for part in parts], message.from_user.id)
+    if not run_times:
+        await safe_send_message(bot, message, "❌ Не удалось запланировать напоминания: проверьте, что время "
+                                              "события указано в формате HH:MM и еще не наступило",
+                                reply_markup=single_command_button_keyboard())
+    else:
+        times = "\n".join(f"{run_at:%d.%m.%y %H:%M}" for run_at in run_times)
+        await safe_send_message(bot, message, f"✅ Напоминания запланированы:\n{times}",
+                                reply_markup=single_command_button_keyboard())
+    await state.clear()
+
+
+class QrBatchState(StatesGroup):
+    waiting_event = State()
+
+
+@router.message(Command("pregen_qr"), IsSuperuser())
+async def cmd_pregen_qr(message: Message, state: FSMContext):
+    events = event_cache.active_names()
+    if not events:
+        await safe_send_message(bot, message, text="У вас нет активных событий")
+        return
+    await safe_send_message(bot, message, text="Выберете событие:\n\nДля отмены введите quit",
+                            reply_markup=post_ev_target(events))
+    await state.set_state(QrBatchState.waiting_event)
+
+
+@router.message(QrBatchState.waiting_event)
+async def pregen_choose_event(message: Message, state: FSMContext):
+    if message.text.lower() == 'quit':
+        await safe_send_message(bot, message, 'Вы вышли')
+        await state.clear()
+        return
+    await state.update_data({'event_name': message.text})
+    await safe_send_message(bot, message, "Сразу отправить QR коды пользователям?", reply_markup=pregen_push_ikb())
+
+
+@router.callback_query(Data("pregen_push_yes", "pregen_push_no"))
+async def pregen_run(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    event_name = data.get('event_name')
     await state.clear()
+    event = await event_cache.get(event_name)
+    if not event or event == "not created":
+        await safe_send_message(bot, callback, "❌ Событие не найдено")
+        return
+    user_ids = await get_users_tg_id_in_event_bad(event_name)
+    if not user_ids:
+        await safe_send_message(bot, callback, text="У вас нет зарегистрированных на это событие пользователей",
+                                reply_markup=single_command_button_keyboard())
+        return
+
+    await safe_send_message(bot, callback, f"⏳ Генерирую QR коды: {len(user_ids)}...")
+    start_background(run_pregen(callback.from_user.id, event, user_ids, callback.data == "pregen_push_yes"),
+                     name=f"pregen_qr:{event_name}")
 
 
 class StatState(StatesGroup):
@@ -1039,23 +1085,20 @@ class StatState(StatesGroup):
     waiting_for_ev2 = State()
 
 
-@router.message(Command("send_stat"))
+@router.message(Command("send_stat"), IsSuperuser())
 async def cmd_send_stat(message: Message):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     await safe_send_message(bot, message, text="Выберете какую статистику вы хотите получить",
                             reply_markup=stat_target())
 
 
-@router.callback_query(F.data == "stat_all")
+@router.callback_query(Data("stat_all"))
 async def cmd_stat_all(callback: CallbackQuery):
     await get_stat_all(callback.from_user.id)
 
 
-@router.callback_query(F.data == "stat_ev")
+@router.callback_query(Data("stat_ev"))
 async def cmd_stat_ev(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1070,14 +1113,14 @@ async def process_post_to_all(message: Message, state: FSMContext):
     await state.clear()
 
 
-@router.callback_query(F.data == "stat_quest")
+@router.callback_query(Data("stat_quest"))
 async def cmd_stat_ev(callback: CallbackQuery):
     await get_stat_quest(callback.from_user.id)
 
 
-@router.callback_query(F.data == 'stat_give_away')
+@router.callback_query(Data('stat_give_away'))
 async def cmd_stat_give_away(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1108,9 +1151,9 @@ async def cmd_stat_give_away3(message: Message, state: FSMContext):
     await state.clear()
 
 
-@router.callback_query(F.data == 'stat_reg_out')
+@router.callback_query(Data('stat_reg_out'))
 async def cmd_stat_reg(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1125,9 +1168,9 @@ async def cmd_stat_reg2(message: Message, state: FSMContext):
     await state.clear()
 
 
-@router.callback_query(F.data == 'stat_reg')
+@router.callback_query(Data('stat_reg'))
 async def cmd_stat_reg(callback: CallbackQuery, state: FSMContext):
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, callback, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1147,12 +1190,9 @@ class WinnerState(StatesGroup):
     wait_give_away_id = State()
 
 
-@router.message(Command('get_result'))
+@router.message(Command('get_result'), IsSuperuser())
 async def cmd_get_result(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, message, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1198,12 +1238,9 @@ class GiveAwayState(StatesGroup):
     waiting_id = State()
 
 
-@router.message(Command('create_give_away'))
+@router.message(Command('create_give_away'), IsSuperuser())
 async def cmd_create_give_away(message: Message, state: FSMContext):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
-    events = await get_all_events()
+    events = event_cache.names()
     if not events:
         await safe_send_message(bot, message, text="У вас нет событий", reply_markup=single_command_button_keyboard())
         await state.clear()
@@ -1248,20 +1285,22 @@ async def cmd_create_give_away4(message: Message, state: FSMContext):
     await state.clear()
 
 
-@router.message(Command("give_colors"))
+@router.message(Command("give_colors"), IsSuperuser())
 async def give_colors(message: Message):
-    user = await get_user(message.from_user.id)
-    if not user.is_superuser:
-        return
     users = await get_all_for_networking()
     if not users:
         await safe_send_message(bot, message.from_user.id, "Пока никто не зарегистрировался на нетворкинг")
         return
-    for user in users:
-        colors = ["Локация", "Меню", "Команда", "Маркетинг"]
-        color = random.choice(colors)
-        await safe_send_message(bot, user, f"Ваша тема - {color}!")
-    await delete_all_from_networking()
-    await safe_send_message(bot, message.from_user.id, "Готово")
+    reporter = ProgressReporter(message.chat.id, len(users), details="Нетворкинг\n")
+    await reporter.start()
+    delivered = await run_networking_round(users, reporter)
+    if delivered is None:
+        await safe_send_message(bot, message.from_user.id, "Не удалось сохранить темы, попробуйте еще раз")
+    elif len(delivered) < len(users):
+        await safe_send_message(bot, message.from_user.id,
+                                f"Готово, не доставлено {len(users) - len(delivered)}. "
+                                f"Их темы сохранены, повторите /give_colors")
+    else:
+        await safe_send_message(bot, message.from_user.id, "Готово")
 
 # постоянная ссылка на нетворкинг, по который пользователь добаляется в бд с нетворкингом, когда виталя нажимает раздачу цветов, все поулчают по цвету а бд сносится (все внутри)
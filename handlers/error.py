@@ -3,19 +3,20 @@ Telegram Errors
 Global error and safe message handlers for bot.
 """
 # --------------------------------------------------------------------------------
-import asyncio
+from functools import partial
 
 import requests
 from aiogram import Router, types, Bot
 from aiogram.enums import ParseMode
 from aiogram.exceptions import (
     TelegramBadRequest, TelegramRetryAfter,
-    TelegramUnauthorizedError, TelegramNetworkError,
+    TelegramUnauthorizedError, TelegramNetworkError, TelegramForbiddenError,
 )
-from aiogram.types import Message, CallbackQuery
-from aiohttp import ClientConnectorError
+from aiogram.types import Message
 
 from bot_instance import logger, bot
+from database.req import mark_user_undeliverable
+from handlers.send_queue import RETRYABLE_ERRORS, send_queue
 from keyboards.keyboards import single_command_button_keyboard
 
 router = Router()
@@ -44,23 +45,27 @@ async def global_error_handler(event: types.Update, exception: Exception) -> boo
         )
         return True
     elif isinstance(exception, TelegramRetryAfter):
+        # Sends are retried per chat by the send queue; never park the update here
         logger.error(
             f"Request limit exceeded. Retry after {exception.retry_after} "
             "seconds."
         )
-        await asyncio.sleep(exception.retry_after)
         return True
     elif isinstance(exception, TelegramUnauthorizedError):
         logger.error(f"Authorization error: {exception}")
         return True
     elif isinstance(exception, TelegramNetworkError):
         logger.error(f"Network error: {exception}")
-        await asyncio.sleep(5)
         if event.message:
-            await safe_send_message(
-                bot,
+            send_queue.submit(
                 event.message.chat.id,
-                text="Повторная попытка..."
+                partial(
+                    bot.send_message,
+                    chat_id=event.message.chat.id,
+                    text="Повторная попытка...",
+                    reply_markup=single_command_button_keyboard(),
+                ),
+                delay=5,
             )
         return True
     else:
@@ -75,10 +80,9 @@ async def safe_send_message(
         text: str,
         reply_markup=single_command_button_keyboard(),
         retry_attempts: int = 3,
-        delay: int = 5,
 ) -> Message | None:
     """
-    Send message with retry and error handling.
+    Send message through the send queue with retry and error handling.
 
     Args:
         bott (Bot): Bot instance to send message.
@@ -86,50 +90,112 @@ async def safe_send_message(
         text (str): Message text.
         reply_markup: Reply keyboard markup.
         retry_attempts (int): Max retry attempts.
-        delay (int): Delay between retries in seconds.
 
     Returns:
         Message|None: Sent message or None if failed.
     """
-    for attempt in range(retry_attempts):
-        try:
-            if isinstance(recipient, types.Message):
-                msg = await recipient.answer(
-                    text, reply_markup=reply_markup,
-                    parse_mode=ParseMode.HTML
-                )
-            elif isinstance(recipient, types.CallbackQuery):
-                msg = await recipient.message.answer(
-                    text, reply_markup=reply_markup,
-                    parse_mode=ParseMode.HTML
-                )
-            elif isinstance(recipient, int):
-                msg = await bott.send_message(
-                    chat_id=recipient, text=text,
-                    reply_markup=reply_markup,
-                    parse_mode=ParseMode.HTML
-                )
-            else:
-                raise TypeError(
-                    f"Неподдерживаемый тип recipient: {type(recipient)}"
-                )
-            return msg
-        except ClientConnectorError as e:
-            logger.error(
-                f"Ошибка подключения: {e}. Попытка {attempt + 1} "
-                f"из {retry_attempts}."
-            )
-            if attempt < retry_attempts - 1:
-                await asyncio.sleep(delay)
-            else:
-                logger.error(
-                    f"Не удалось отправить сообщение после "
-                    f"{retry_attempts} попыток."
-                )
-                return None
-        except Exception as e:
-            logger.error(str(e))
-            return None
+    if isinstance(recipient, types.Message):
+        chat_id = recipient.chat.id
+    elif isinstance(recipient, types.CallbackQuery):
+        chat_id = recipient.message.chat.id
+    elif isinstance(recipient, int):
+        chat_id = recipient
+    else:
+        logger.error(f"Неподдерживаемый тип recipient: {type(recipient)}")
+        return None
+    try:
+        return await send_queue.submit(
+            chat_id,
+            partial(
+                bott.send_message,
+                chat_id=chat_id, text=text,
+                reply_markup=reply_markup,
+                parse_mode=ParseMode.HTML
+            ),
+            attempts=retry_attempts,
+        )
+    except RETRYABLE_ERRORS:
+        return None
+    except Exception as e:
+        logger.error(str(e))
+        await note_delivery_failure(chat_id, e)
+        return None
+
+
+# --------------------------------------------------------------------------------
+async def edit_message_text(message: Message, text: str, reply_markup=None) -> Message | bool:
+    """
+    Edit a bot message through the send queue.
+
+    Args:
+        message (Message): Message to edit.
+        text (str): New message text.
+        reply_markup: Inline keyboard markup.
+
+    Returns:
+        Message|bool: Edited message, or True for inline messages.
+    """
+    return await send_queue.send(
+        bot.edit_message_text,
+        chat_id=message.chat.id,
+        message_id=message.message_id,
+        text=text,
+        reply_markup=reply_markup,
+    )
+
+
+async def delete_message(chat_id: int, message_id: int) -> bool:
+    """
+    Delete a message through the send queue.
+
+    Args:
+        chat_id (int): Chat identifier.
+        message_id (int): Message identifier.
+
+    Returns:
+        bool: True on success.
+    """
+    return await send_queue.send(bot.delete_message, chat_id=chat_id, message_id=message_id)
+
+
+# --------------------------------------------------------------------------------
+def delivery_failure_reason(exception: Exception) -> str | None:
+    """
+    Classify a send error that means the chat is permanently unreachable.
+
+    Args:
+        exception (Exception): Error raised by a Bot API send.
+
+    Returns:
+        str|None: 'blocked', 'deactivated', 'chat_not_found' or None.
+    """
+    text = str(exception).lower()
+    if isinstance(exception, TelegramForbiddenError):
+        if "deactivated" in text:
+            return "deactivated"
+        return "blocked"
+    if isinstance(exception, TelegramBadRequest) and "chat not found" in text:
+        return "chat_not_found"
+    return None
+
+
+# --------------------------------------------------------------------------------
+async def note_delivery_failure(chat_id: int, exception: Exception) -> bool:
+    """
+    Flag the recipient as undeliverable if the error is permanent.
+
+    Args:
+        chat_id (int): Recipient chat identifier.
+        exception (Exception): Error raised by a Bot API send.
+
+    Returns:
+        bool: True if the recipient was flagged.
+    """
+    reason = delivery_failure_reason(exception)
+    if reason is None:
+        return False
+    await mark_user_undeliverable(chat_id, reason)
+    return True
 
 
 # --------------------------------------------------------------------------------
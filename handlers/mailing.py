@@ -0,0 +1,358 @@
+"""
+Mailing Payloads
+Pre-built broadcast requests for text, media and album posts.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import json
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable
+
+from aiogram.methods import (
+    SendAnimation,
+    SendDocument,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendVideo,
+    TelegramMethod,
+)
+from aiogram.types import (
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+from bot_instance import bot, logger
+from errors.errors import DatabaseConnectionError
+from handlers.error import note_delivery_failure
+from handlers.send_queue import send_queue
+
+ALBUM_WAIT = 1.0
+# Sends in flight per fan-out; pacing is still done by the send queue
+FAN_OUT_CONCURRENCY = 50
+# Recipients of a list sent per broadcast page, between checkpoints
+BROADCAST_PAGE = 500
+
+_albums: dict[str, list[Message]] = {}
+# References to running background mailings so they are not garbage collected
+_background: set[asyncio.Task] = set()
+
+_METHODS = {
+    method.__name__: method
+    for method in (SendAnimation, SendDocument, SendMediaGroup, SendMessage, SendPhoto, SendVideo)
+}
+
+
+# --------------------------------------------------------------------------------
+async def collect_album(message: Message, wait: float = ALBUM_WAIT) -> list[Message] | None:
+    """
+    Gather all messages of a media group into one list.
+
+    Telegram delivers every album item as a separate update, so the first
+    item waits for the rest and receives the whole album while later items
+    get None and should be ignored by the handler.
+
+    Args:
+        message (Message): Incoming album item.
+        wait (float): Seconds to wait for the remaining items.
+
+    Returns:
+        list[Message] | None: Album items ordered by message ID or None.
+    """
+    group_id = message.media_group_id
+    if group_id in _albums:
+        _albums[group_id].append(message)
+        return None
+    _albums[group_id] = [message]
+    await asyncio.sleep(wait)
+    return sorted(_albums.pop(group_id), key=lambda m: m.message_id)
+
+
+# --------------------------------------------------------------------------------
+def _input_media(message: Message):
+    """
+    Convert an album item into InputMedia reusing its file_id.
+
+    Args:
+        message (Message): Album item.
+
+    Returns:
+        InputMedia | None: Input media or None for unsupported content.
+    """
+    if message.photo:
+        return InputMediaPhoto(media=message.photo[-1].file_id, caption=message.caption)
+    if message.video:
+        return InputMediaVideo(media=message.video.file_id, caption=message.caption)
+    if message.document:
+        return InputMediaDocument(media=message.document.file_id, caption=message.caption)
+    return None
+
+
+# --------------------------------------------------------------------------------
+class MailingPayload:
+    """
+    Recipient-independent send request built once per mailing.
+
+    Media is referenced by the file_id Telegram assigned to the admin's
+    message, so nothing is uploaded again; each recipient gets a shallow
+    copy of the template with only chat_id replaced.
+
+    Args:
+        template (TelegramMethod): Validated request with a placeholder chat_id.
+    """
+
+    def __init__(self, template: TelegramMethod):
+        self._template = template
+
+    # ----------------------------------------------------------------------------
+    @classmethod
+    def from_messages(cls, messages: list[Message], reply_markup=None) -> "MailingPayload | None":
+        """
+        Build payload from the admin's post.
+
+        Albums are sent without reply markup because Telegram does not
+        support keyboards on media groups.
+
+        Args:
+            messages (list[Message]): Single post or all album items.
+            reply_markup: Markup attached to every copy.
+
+        Returns:
+            MailingPayload | None: Payload or None for unsupported content.
+        """
+        first = messages[0]
+        if len(messages) > 1:
+            media = [_input_media(m) for m in messages]
+            if None in media:
+                return None
+            return cls(SendMediaGroup(chat_id=0, media=media))
+        if first.photo:
+            return cls(SendPhoto(
+                chat_id=0, photo=first.photo[-1].file_id,
+                caption=first.caption, reply_markup=reply_markup,
+            ))
+        if first.video:
+            return cls(SendVideo(
+                chat_id=0, video=first.video.file_id,
+                caption=first.caption, reply_markup=reply_markup,
+            ))
+        if first.animation:
+            return cls(SendAnimation(
+                chat_id=0, animation=first.animation.file_id,
+                caption=first.caption, reply_markup=reply_markup,
+            ))
+        if first.document:
+            return cls(SendDocument(
+                chat_id=0, document=first.document.file_id,
+                caption=first.caption, reply_markup=reply_markup,
+            ))
+        if first.text:
+            return cls(SendMessage(chat_id=0, text=first.text, reply_markup=reply_markup))
+        return None
+
+    # ----------------------------------------------------------------------------
+    @classmethod
+    def from_text(cls, text: str, reply_markup=None) -> "MailingPayload":
+        """
+        Build text payload.
+
+        Args:
+            text (str): Message text.
+            reply_markup: Markup attached to every copy.
+
+        Returns:
+            MailingPayload: Text payload.
+        """
+        return cls(SendMessage(chat_id=0, text=text, reply_markup=reply_markup))
+
+    # ----------------------------------------------------------------------------
+    def dump(self) -> str:
+        """
+        Serialize payload for storage, e.g. in a scheduled post.
+
+        Unset fields are skipped so bot defaults such as parse_mode are
+        applied again on load; album items keep their explicit media type.
+
+        Returns:
+            str: JSON with the method name and its parameters.
+        """
+        params = self._template.model_dump(mode="json", exclude_defaults=True)
+        if isinstance(self._template, SendMediaGroup):
+            params["media"] = [
+                {**item.model_dump(mode="json", exclude_defaults=True), "type": item.type}
+                for item in self._template.media
+            ]
+        return json.dumps({"method": type(self._template).__name__, "params": params})
+
+    # ----------------------------------------------------------------------------
+    @classmethod
+    def load(cls, raw: str) -> "MailingPayload":
+        """
+        Restore payload serialized by dump().
+
+        Args:
+            raw (str): Stored JSON.
+
+        Returns:
+            MailingPayload: Restored payload.
+        """
+        data = json.loads(raw)
+        return cls(_METHODS[data["method"]].model_validate(data["params"]))
+
+    # ----------------------------------------------------------------------------
+    async def send(self, chat_id: int):
+        """
+        Send payload copy to a recipient through the send queue.
+
+        Args:
+            chat_id (int): Recipient chat identifier.
+
+        Returns:
+            Message | list[Message]: Sent message(s).
+        """
+        method = self._template.model_copy(update={"chat_id": chat_id})
+        return await send_queue.submit(chat_id, partial(bot, method))
+
+
+# --------------------------------------------------------------------------------
+async def _pages(
+        user_ids: list[int] | AsyncIterator[list[int]],
+        size: int = BROADCAST_PAGE,
+) -> AsyncIterator[list[int]]:
+    """Iterate recipients page by page whether given as a list or a stream."""
+    if isinstance(user_ids, list):
+        for start in range(0, len(user_ids), size):
+            yield user_ids[start:start + size]
+        return
+    async for page in user_ids:
+        yield page
+
+
+async def _deliver(
+        send: Callable[[int], Awaitable],
+        user_ids: list[int],
+        reporter,
+        concurrency: int,
+) -> list[int]:
+    """Send to recipients with bounded concurrency; returns failed ones."""
+    limit = asyncio.Semaphore(concurrency)
+    failed_users = []
+
+    async def deliver(user_id: int) -> None:
+        async with limit:
+            try:
+                await send(user_id)
+            except Exception as e:
+                failed_users.append(user_id)
+                await note_delivery_failure(user_id, e)
+                reporter.advance(ok=False)
+            else:
+                reporter.advance()
+
+    await asyncio.gather(*(deliver(user_id) for user_id in user_ids))
+    return failed_users
+
+
+# --------------------------------------------------------------------------------
+async def broadcast(
+        payload: MailingPayload,
+        user_ids: list[int] | AsyncIterator[list[int]],
+        reporter,
+        checkpoint: Callable[[list[int]], Awaitable[bool]] | None = None,
+        concurrency: int = FAN_OUT_CONCURRENCY,
+) -> bool:
+    """
+    Send payload to every recipient page by page and report progress.
+
+    Recipients of a page are sent concurrently, so a chat waiting out a
+    retry-after does not hold up the others; the next page starts once
+    the whole page is done. The final report is always sent, with the
+    partial result if the mailing stops early.
+
+    Args:
+        payload (MailingPayload): Prebuilt payload.
+        user_ids (list[int] | AsyncIterator[list[int]]): Recipient chat
+            identifiers, or pages of them streamed from the database so
+            sending starts before all recipients are fetched.
+        reporter (ProgressReporter): Started progress reporter.
+        checkpoint (Callable[[list[int]], Awaitable[bool]] | None): Awaited
+            after every page with the page sent; returning False stops the
+            mailing, e.g. to pause it.
+        concurrency (int): Maximum number of sends in flight.
+
+    Returns:
+        bool: True if every recipient was processed, False if the mailing
+            was paused by the checkpoint or a page of recipients could not
+            be fetched.
+    """
+    title = "⚠️ Рассылка прервана"
+    try:
+        async for page in _pages(user_ids):
+            await _deliver(payload.send, page, reporter, concurrency)
+            if checkpoint is not None and not await checkpoint(page):
+                title = "⏸ Рассылка приостановлена"
+                return False
+        title = "✅ Рассылка завершена!"
+        return True
+    except DatabaseConnectionError:
+        logger.error("Рассылка прервана: не удалось получить получателей из базы данных")
+        title = "⚠️ Рассылка прервана: ошибка базы данных"
+        return False
+    finally:
+        await reporter.finish(title)
+
+
+# --------------------------------------------------------------------------------
+async def fan_out(
+        payload: MailingPayload | Callable[[int], Awaitable],
+        user_ids: list[int],
+        reporter,
+        concurrency: int = FAN_OUT_CONCURRENCY,
+) -> list[int]:
+    """
+    Send payload to all recipients concurrently and report progress.
+
+    Unlike broadcast(), all recipients are sent as one batch without
+    checkpoints, so it cannot be paused and resumed.
+
+    Args:
+        payload (MailingPayload | Callable[[int], Awaitable]): Prebuilt
+            payload, or a coroutine function sending to one chat for
+            content that differs per recipient.
+        user_ids (list[int]): Recipient chat identifiers.
+        reporter (ProgressReporter): Started progress reporter.
+        concurrency (int): Maximum number of sends in flight.
+
+    Returns:
+        list[int]: Recipients the payload could not be delivered to.
+    """
+    send = payload.send if isinstance(payload, MailingPayload) else payload
+    failed_users = await _deliver(send, user_ids, reporter, concurrency)
+    await reporter.finish()
+    return failed_users
+
+
+# --------------------------------------------------------------------------------
+def start_background(coro: Awaitable, name: str) -> asyncio.Task:
+    """
+    Run a mailing job without blocking the handler that started it.
+
+    Args:
+        coro (Awaitable): Job coroutine.
+        name (str): Task name used in logs.
+
+    Returns:
+        asyncio.Task: Started task.
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _background_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Фоновая рассылка {task.get_name()} завершилась с ошибкой", exc_info=task.exception())
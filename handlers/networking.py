@@ -0,0 +1,86 @@
+"""
+Networking Rounds
+Balanced topic assignment and concurrent delivery for /give_colors.
+"""
+# --------------------------------------------------------------------------------
+import random
+from collections import Counter
+
+from bot_instance import bot, logger
+from database.req import clear_networking, get_networking_assignments, save_networking_assignments
+from handlers.mailing import FAN_OUT_CONCURRENCY, _deliver
+from handlers.send_queue import send_queue
+
+TOPICS = ("Локация", "Меню", "Команда", "Маркетинг")
+
+
+# --------------------------------------------------------------------------------
+def assign_topics(user_ids: list[int], assigned: dict[int, str]) -> dict[int, str]:
+    """
+    Give new participants topics so that group sizes differ by at most one.
+
+    Topics kept from an unfinished round count towards the group sizes;
+    participants are shuffled so the groups are still random.
+
+    Args:
+        user_ids (list[int]): Participants of the round.
+        assigned (dict[int, str]): Topics assigned earlier by user ID.
+
+    Returns:
+        dict[int, str]: Topics of participants without an assignment.
+    """
+    sizes = Counter({topic: 0 for topic in TOPICS})
+    sizes.update(assigned[user_id] for user_id in user_ids if assigned.get(user_id) in sizes)
+    new = [user_id for user_id in user_ids if user_id not in assigned]
+    random.shuffle(new)
+    topics = {}
+    for user_id in new:
+        # Random choice among the smallest groups
+        smallest = min(sizes.values())
+        topic = random.choice([topic for topic, size in sizes.items() if size == smallest])
+        sizes[topic] += 1
+        topics[user_id] = topic
+    return topics
+
+
+# --------------------------------------------------------------------------------
+async def run_round(user_ids: list[int], reporter) -> list[int] | None:
+    """
+    Assign and persist topics, send them through the rate-limited send
+    queue and clear only participants who received their topic.
+
+    Participants whose message failed keep their networking entry and
+    topic, so repeating the round re-sends the same topic to them. The
+    final report is sent on every path, including a failed save.
+
+    Args:
+        user_ids (list[int]): Participants of the round.
+        reporter (ProgressReporter): Started progress reporter.
+
+    Returns:
+        list[int] | None: Participants who received their topic, or None
+        if assignments could not be stored.
+    """
+    title = "⚠️ Темы не сохранены, рассылка не начата"
+    try:
+        assigned = await get_networking_assignments()
+        if assigned is None:
+            return None
+        new = assign_topics(user_ids, assigned)
+        if not await save_networking_assignments(new):
+            return None
+        topics = {**assigned, **new}
+
+        async def send_topic(user_id: int) -> None:
+            await send_queue.send(bot.send_message, chat_id=user_id, text=f"Ваша тема - {topics[user_id]}!")
+
+        title = "⚠️ Рассылка прервана"
+        failed = set(await _deliver(send_topic, user_ids, reporter, FAN_OUT_CONCURRENCY))
+        delivered = [user_id for user_id in user_ids if user_id not in failed]
+        await clear_networking(delivered)
+        title = "✅ Рассылка завершена!"
+    finally:
+        await reporter.finish(title)
+    if failed:
+        logger.warning(f"Нетворкинг: тема не доставлена {len(failed)} участникам")
+    return delivered
@@ -0,0 +1,170 @@
+"""
+Mailing Progress
+Throttled status message with throughput and ETA for long mailings.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import time
+from functools import partial
+
+from aiogram.exceptions import TelegramBadRequest
+
+from bot_instance import bot, logger
+from handlers.error import safe_send_message
+from handlers.send_queue import send_queue
+
+
+# --------------------------------------------------------------------------------
+class ProgressReporter:
+    """
+    Status message for a mailing edited at most once per interval.
+
+    Progress calls only record counters; an edit is scheduled in the
+    background when the interval has passed and no other edit is in flight,
+    so intermediate states are coalesced and the mailing loop never waits
+    on status updates.
+
+    Args:
+        chat_id (int): Admin chat receiving the status.
+        total (int): Total number of recipients.
+        details (str): Extra status lines, e.g. the event name.
+        interval (float): Minimal seconds between status edits.
+    """
+
+    def __init__(self, chat_id: int, total: int, details: str = "", interval: float = 5.0):
+        self.chat_id = chat_id
+        self.total = total
+        self.details = details
+        self.interval = interval
+        self.success = 0
+        self.failed = 0
+        self._message = None
+        self._started = time.monotonic()
+        self._last_edit = 0.0
+        self._task: asyncio.Task | None = None
+
+    # ----------------------------------------------------------------------------
+    @property
+    def done(self) -> int:
+        """
+        Number of processed recipients.
+
+        Returns:
+            int: Successful plus failed sends.
+        """
+        return self.success + self.failed
+
+    # ----------------------------------------------------------------------------
+    async def start(self) -> None:
+        """
+        Send the initial status message.
+
+        Returns:
+            None
+        """
+        self._started = time.monotonic()
+        self._last_edit = self._started
+        self._message = await safe_send_message(
+            bot, self.chat_id,
+            f"🚀 Начинаю рассылку...\n{self.details}"
+            f"Всего получателей: {self.total}\nОтправлено: 0\nОшибок: 0"
+        )
+
+    # ----------------------------------------------------------------------------
+    def advance(self, ok: bool = True) -> None:
+        """
+        Record one processed recipient and schedule an edit if due.
+
+        Args:
+            ok (bool): Whether the send succeeded.
+
+        Returns:
+            None
+        """
+        if ok:
+            self.success += 1
+        else:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self._last_edit < self.interval:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._last_edit = now
+        self._task = asyncio.create_task(self._edit(self.render()))
+
+    # ----------------------------------------------------------------------------
+    async def finish(self, title: str = "✅ Рассылка завершена!") -> None:
+        """
+        Wait for a pending edit and show the final summary.
+
+        Args:
+            title (str): Summary headline, e.g. for a paused mailing.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._edit(self.render(final=True, title=title))
+
+    # ----------------------------------------------------------------------------
+    def render(self, final: bool = False, title: str = "✅ Рассылка завершена!") -> str:
+        """
+        Build status text with throughput and ETA.
+
+        Args:
+            final (bool): Render the completion summary.
+            title (str): Summary headline.
+
+        Returns:
+            str: Status text.
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        rate = self.done / elapsed
+        if final:
+            return (
+                f"{title}\n{self.details}"
+                f"Всего получателей: {self.total}\n"
+                f"Успешно отправлено: {self.success}\n"
+                f"Ошибок: {self.failed}\n"
+                f"Время: {int(elapsed)} с, скорость: {rate:.1f} сообщ/с"
+            )
+        percent = int(self.done / self.total * 100) if self.total else 100
+        eta = int((self.total - self.done) / rate) if rate > 0 else 0
+        return (
+            f"📨 Рассылка в процессе...\n{self.details}"
+            f"Всего получателей: {self.total}\n"
+            f"Отправлено: {self.success}\n"
+            f"Ошибок: {self.failed}\n"
+            f"Прогресс: {self.done}/{self.total} ({percent}%)\n"
+            f"Скорость: {rate:.1f} сообщ/с, осталось ~{eta} с"
+        )
+
+    # ----------------------------------------------------------------------------
+    async def _edit(self, text: str) -> None:
+        """
+        Edit status message or replace it if it cannot be edited.
+
+        Args:
+            text (str): New status text.
+
+        Returns:
+            None
+        """
+        if self._message is not None:
+            try:
+                await send_queue.submit(self.chat_id, partial(
+                    bot.edit_message_text,
+                    chat_id=self.chat_id,
+                    message_id=self._message.message_id,
+                    text=text,
+                ))
+                return
+            except TelegramBadRequest as e:
+                if "message is not modified" in str(e):
+                    return
+                logger.warning(f"Не удалось обновить статус рассылки: {e}")
+            except Exception as e:
+                logger.warning(f"Не удалось обновить статус рассылки: {e}")
+        self._message = await safe_send_message(bot, self.chat_id, text)
@@ -0,0 +1,230 @@
+"""
+QR Batch
+Pre-generation of event passes in a worker pool and their planned delivery.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aiogram.types import FSInputFile
+
+from bot_instance import bot, logger
+from database.req import create_qr_codes, get_event, on_event_change
+from handlers.error import safe_send_message
+from handlers.mailing import fan_out
+from handlers.progress import ProgressReporter
+from handlers.qr_image import render_to_file
+from handlers.qr_utils import make_qr_token
+from handlers.send_queue import send_queue
+from keyboards.keyboards import single_command_button_keyboard
+
+QR_CACHE_DIR = "qr_cache"
+
+_pool: ProcessPoolExecutor | None = None
+
+
+# --------------------------------------------------------------------------------
+def qr_path(user_id: int, event_name: str) -> str:
+    """
+    Get file path of a pre-generated pass.
+
+    Args:
+        user_id (int): Telegram user identifier.
+        event_name (str): Event name.
+
+    Returns:
+        str: PNG file path.
+    """
+    return os.path.join(QR_CACHE_DIR, event_name, f"{user_id}.png")
+
+
+# --------------------------------------------------------------------------------
+def pregenerated_qr(user_id: int, event_name: str) -> str | None:
+    """
+    Find a pre-generated pass.
+
+    Args:
+        user_id (int): Telegram user identifier.
+        event_name (str): Event name.
+
+    Returns:
+        str | None: PNG file path or None if it was not generated.
+    """
+    path = qr_path(user_id, event_name)
+    return path if os.path.exists(path) else None
+
+
+# --------------------------------------------------------------------------------
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the render pool on first use and reuse it afterwards."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def close_qr_pool() -> None:
+    """
+    Stop the render pool without blocking the event loop, cancelling
+    renders that have not started yet.
+
+    Returns:
+        None
+    """
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+
+# --------------------------------------------------------------------------------
+async def pregenerate(event_name: str, user_ids: list[int]) -> list[int]:
+    """
+    Render missing passes in parallel and store missing QR code records.
+
+    Rendering is CPU-bound pure-Python drawing, so it runs in a process
+    pool instead of the event loop. Workers are spawned rather than forked
+    because the logging listener thread may hold locks at fork time, and
+    only import handlers.qr_image, which does not load the bot. The pool
+    is created once and stopped by close_qr_pool() at shutdown. Tokens are deterministic, so passes already in the cache are reused
+    and a repeated run only adds users registered since.
+
+    Args:
+        event_name (str): Event name.
+        user_ids (list[int]): Registered users.
+
+    Returns:
+        list[int]: Users who have a generated pass.
+    """
+    done = [user_id for user_id in user_ids if pregenerated_qr(user_id, event_name)]
+    missing = [user_id for user_id in user_ids if not pregenerated_qr(user_id, event_name)]
+    if missing:
+        bot_username = (await bot.get_me()).username
+        os.makedirs(os.path.join(QR_CACHE_DIR, event_name), exist_ok=True)
+        loop = asyncio.get_running_loop()
+        pool = _get_pool()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                pool, render_to_file, qr_path(user_id, event_name),
+                f"https://t.me/{bot_username}?start={make_qr_token(user_id, event_name)}",
+            )
+            for user_id in missing
+        ), return_exceptions=True)
+        for user_id, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.error(f"Не удалось сгенерировать QR код для {user_id}: {result}")
+            else:
+                done.append(user_id)
+    await create_qr_codes(done, event_name)
+    return done
+
+
+# --------------------------------------------------------------------------------
+async def push_qr_codes(event, user_ids: list[int], reporter) -> None:
+    """
+    Send pre-generated passes through the rate-limited send queue.
+
+    Each user gets their own file, so passes go through fan_out() with a
+    per-user send instead of a shared payload.
+
+    Args:
+        event (Event): Event instance.
+        user_ids (list[int]): Users with pre-generated passes.
+        reporter (ProgressReporter): Started progress reporter.
+
+    Returns:
+        None
+    """
+    caption = (
+        f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
+        f"Это ваш пропуск на мероприятие:\n"
+        f"Название: {event.desc}\n"
+        f"Дата: {event.date}\n"
+        f"Время: {event.time}\n"
+        f"Место: {event.place}\n\n"
+        f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
+    )
+
+    async def send_pass(user_id: int) -> None:
+        await send_queue.send(
+            bot.send_photo,
+            chat_id=user_id,
+            photo=FSInputFile(qr_path(user_id, event.name)),
+            caption=caption,
+        )
+
+    await fan_out(send_pass, user_ids, reporter)
+
+
+# --------------------------------------------------------------------------------
+async def run_pregen(chat_id: int, event, user_ids: list[int], push: bool) -> None:
+    """
+    Generate passes and optionally send them, reporting to the admin;
+    meant to run as a background task.
+
+    Args:
+        chat_id (int): Admin chat receiving reports.
+        event (Event): Event instance.
+        user_ids (list[int]): Registered users.
+        push (bool): Send the passes right after generation.
+
+    Returns:
+        None
+    """
+    started = time.monotonic()
+    done = await pregenerate(event.name, user_ids)
+    await safe_send_message(bot, chat_id, f"✅ Сгенерировано QR кодов: {len(done)} из {len(user_ids)} "
+                                          f"за {int(time.monotonic() - started)} с",
+                            reply_markup=single_command_button_keyboard())
+    if push and done:
+        reporter = ProgressReporter(chat_id, len(done), details=f"Событие: {event.name}\n")
+        await reporter.start()
+        await push_qr_codes(event, done, reporter)
+
+
+# --------------------------------------------------------------------------------
+async def drop_qr_cache(event_name: str) -> None:
+    """
+    Delete pre-generated passes of an event.
+
+    Args:
+        event_name (str): Event name.
+
+    Returns:
+        None
+    """
+    path = os.path.join(QR_CACHE_DIR, event_name)
+    if os.path.isdir(path):
+        await asyncio.to_thread(shutil.rmtree, path, True)
+        logger.info(f"Удалены заготовленные QR коды события {event_name}")
+
+
+async def purge_qr_cache(active: list[str]) -> None:
+    """
+    Delete pre-generated passes of all events that are not in progress,
+    e.g. at startup for events ended while the bot was down.
+
+    Args:
+        active (list[str]): Names of events in progress.
+
+    Returns:
+        None
+    """
+    if not os.path.isdir(QR_CACHE_DIR):
+        return
+    for name in os.listdir(QR_CACHE_DIR):
+        if name not in active:
+            await drop_qr_cache(name)
+
+
+async def _on_event_change(name: str) -> None:
+    event = await get_event(name)
+    if event == "not created" or (event is not None and event.status != 'in_progress'):
+        await drop_qr_cache(name)
+
+
+on_event_change(_on_event_change)
@@ -1,18 +1,102 @@
 """
 QR Code Generator
-Stylish QR code with gradient background and central logo.
+Timed rendering of stylish QR codes and signed QR tokens.
 """
 
-import os
+import base64
+import hashlib
+import hmac
 from io import BytesIO
 
-import qrcode
-from PIL import Image, ImageDraw, ImageColor
+from bot_instance import QR_SECRET, token
+from handlers.qr_image import draw_styled_qr_code
+from monitoring.metrics import tracked
+
+QR_TOKEN_PREFIX = "q-"
+EVENT_KEY_SIZE = 4
+MAC_SIZE = 8
+
+_secret = (QR_SECRET or hashlib.sha256(f"qr-token:{token}".encode()).hexdigest()).encode()
+
+
+# --------------------------------------------------------------------------------
+def event_key(event_name: str) -> bytes:
+    """
+    Get short stable identifier of an event.
+
+    Args:
+        event_name (str): Event name.
+
+    Returns:
+        bytes: EVENT_KEY_SIZE-byte digest of the name.
+    """
+    return hashlib.blake2b(event_name.encode(), digest_size=EVENT_KEY_SIZE).digest()
+
+
+# --------------------------------------------------------------------------------
+def _sign(body: bytes) -> bytes:
+    """
+    Compute truncated HMAC of a token body.
+
+    Args:
+        body (bytes): Event key and packed user ID.
+
+    Returns:
+        bytes: MAC_SIZE-byte signature.
+    """
+    return hmac.new(_secret, body, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+# --------------------------------------------------------------------------------
+def make_qr_token(user_id: int, event_name: str) -> str:
+    """
+    Build signed start payload for a user's event pass.
+
+    The token is the event key, the user ID as a minimal big-endian
+    integer and an HMAC, base64url-encoded without padding, so it stays
+    about 20 characters regardless of the event name length.
+
+    Args:
+        user_id (int): Telegram user identifier.
+        event_name (str): Event name.
+
+    Returns:
+        str: Start payload, e.g. "q-..." to append to the bot link.
+    """
+    body = event_key(event_name) + user_id.to_bytes((user_id.bit_length() + 7) // 8 or 1, "big")
+    raw = body + _sign(body)
+    return QR_TOKEN_PREFIX + base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+# --------------------------------------------------------------------------------
+def parse_qr_token(payload: str) -> tuple[bytes, int] | None:
+    """
+    Verify a signed start payload without touching the database.
+
+    Args:
+        payload (str): Start payload from the QR code.
+
+    Returns:
+        tuple[bytes, int] | None: Event key and user ID, or None if the
+            payload is not a token or its signature does not match.
+    """
+    if not payload.startswith(QR_TOKEN_PREFIX):
+        return None
+    encoded = payload[len(QR_TOKEN_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    except ValueError:
+        return None
+    body, mac = raw[:-MAC_SIZE], raw[-MAC_SIZE:]
+    if len(body) <= EVENT_KEY_SIZE or not hmac.compare_digest(mac, _sign(body)):
+        return None
+    return body[:EVENT_KEY_SIZE], int.from_bytes(body[EVENT_KEY_SIZE:], "big")
 
 
 # --------------------------------------------------------------------------------
 
 
+@tracked()
 def create_styled_qr_code(data: str) -> BytesIO:
     """
     Generate a stylish QR code with gradient background and embedded logo.
@@ -23,98 +107,4 @@ def create_styled_qr_code(data: str) -> BytesIO:
     Returns:
         BytesIO: PNG image of the QR code in memory.
     """
-    bg_top = "#8F2EFF"
-    bg_bottom = "#A259FF"
-    qr_color = "#FFFFFF"
-    box_size = 12
-    border = 4
-    finder_radius = 6
-    logo_ratio = 0.25
-    logo_path = os.path.join(os.path.dirname(__file__), "logo.png")
-
-    # --------------------------------------------------------------------------------
-
-    qr = qrcode.QRCode(
-        version=4,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=box_size,
-        border=border,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    matrix = qr.get_matrix()
-    qr_size = len(matrix)
-    img_px_size = (qr_size + 2 * border) * box_size
-
-    # --------------------------------------------------------------------------------
-
-    qr_img = Image.new("RGBA", (img_px_size, img_px_size))
-    draw = ImageDraw.Draw(qr_img)
-
-    for y in range(img_px_size):
-        ratio = y / img_px_size
-        r = int(ImageColor.getrgb(bg_top)[0] * (1 - ratio)
-                + ImageColor.getrgb(bg_bottom)[0] * ratio)
-        g = int(ImageColor.getrgb(bg_top)[1] * (1 - ratio)
-                + ImageColor.getrgb(bg_bottom)[1] * ratio)
-        b = int(ImageColor.getrgb(bg_top)[2] * (1 - ratio)
-                + ImageColor.getrgb(bg_bottom)[2] * ratio)
-        draw.line([(0, y), (img_px_size, y)], fill=(r, g, b))
-
-    # --------------------------------------------------------------------------------
-
-    finder_positions = [(0, 0), (0, qr_size - 7), (qr_size - 7, 0)]
-
-    def is_finder(i: int, j: int) -> bool:
-        """
-        Check if the given coordinates belong to a finder pattern.
-
-        Args:
-            i (int): Row index in QR matrix.
-            j (int): Column index in QR matrix.
-
-        Returns:
-            bool: True if coordinates are in a finder pattern.
-        """
-        return any(
-            fx <= i < fx + 7 and fy <= j < fy + 7
-            for fx, fy in finder_positions
-        )
-
-    # --------------------------------------------------------------------------------
-
-    for i in range(qr_size):
-        for j in range(qr_size):
-            if matrix[i][j]:
-                x = (j + border) * box_size
-                y = (i + border) * box_size
-                box = [x, y, x + box_size - 1, y + box_size - 1]
-
-                if is_finder(i, j):
-                    draw.rounded_rectangle(box, radius=finder_radius, fill=qr_color)
-                else:
-                    draw.rectangle(box, fill=qr_color)
-
-    # --------------------------------------------------------------------------------
-
-    if logo_path and os.path.exists(logo_path):
-        logo = Image.open(logo_path).convert("RGBA")
-        logo_size = int(img_px_size * logo_ratio)
-        logo = logo.resize((logo_size, logo_size), Image.LANCZOS)
-
-        mask = Image.new('L', (logo_size, logo_size), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.ellipse((0, 0, logo_size, logo_size), fill=255)
-
-        logo.putalpha(mask)
-
-        pos = ((img_px_size - logo_size) // 2, (img_px_size - logo_size) // 2)
-        qr_img.paste(logo, pos, mask=logo)
-
-    # --------------------------------------------------------------------------------
-
-    output = BytesIO()
-    qr_img.save(output, format="PNG")
-    output.seek(0)
-
-    return output
+    return draw_styled_qr_code(data)
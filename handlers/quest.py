@@ -4,20 +4,22 @@ Handlers for questionnaire FSM and callbacks.
 """
 
 # --------------------------------------------------------------------------------
-from aiogram import Router, F, types
+import asyncio
+import time
+
+from aiogram import F, types
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery
 
-from bot_instance import bot
+from bot_instance import bot, logger
 from database.req import (
-    create_questionary,
-    update_questionary,
-    get_questionary,
+    save_questionaries,
     get_all_vacancy_names,
 )
-from handlers.error import safe_send_message
+from handlers.error import edit_message_text, safe_send_message
+from handlers.routing import CallbackRouter, Data
 from keyboards.keyboards import (
     vacancy_selection_keyboard,
     another_vacancy_keyboard,
@@ -25,7 +27,14 @@ from keyboards.keyboards import (
     quest_keyboard_2,
 )
 
-router = Router()
+router = CallbackRouter()
+
+# Forms idle this long are checkpointed to the database
+DRAFT_IDLE = 600.0
+DRAFT_CHECK_INTERVAL = 60.0
+
+# Unsaved answers by user ID with the time of the last answer
+_drafts: dict[int, tuple[dict, float]] = {}
 
 # --------------------------------------------------------------------------------
 
@@ -88,6 +97,74 @@ class Questionnaire(StatesGroup):
     another_vacancy = State()
 
 
+# --------------------------------------------------------------------------------
+async def remember_answer(user_id: int, state: FSMContext, answer: dict) -> dict:
+    """
+    Buffer an answer in FSM data instead of writing it to the database.
+
+    Args:
+        user_id (int): Telegram user identifier.
+        state (FSMContext): FSM context instance.
+        answer (dict): Questionary field with its value.
+
+    Returns:
+        dict: All answers given so far.
+    """
+    data = await state.get_data()
+    answers = {**data.get("answers", {}), **answer}
+    await state.update_data(answers=answers)
+    _drafts[user_id] = (answers, time.monotonic())
+    return answers
+
+
+# --------------------------------------------------------------------------------
+async def checkpoint_drafts(idle: float = DRAFT_IDLE) -> None:
+    """
+    Save answers of forms left unfinished for at least `idle` seconds.
+
+    Args:
+        idle (float): Minimal time since the last answer.
+
+    Returns:
+        None
+    """
+    now = time.monotonic()
+    stale = {user_id: answers for user_id, (answers, at) in _drafts.items() if now - at >= idle}
+    if not stale:
+        return
+    if not await save_questionaries(stale):
+        # One bad row must not block the others: retry them one by one
+        total = len(stale)
+        stale = {
+            user_id: answers for user_id, answers in stale.items()
+            if await save_questionaries({user_id: answers})
+        }
+        logger.warning(f"Не удалось сохранить {total - len(stale)} незавершенных анкет, повтор позже")
+    for user_id, answers in stale.items():
+        # Keep drafts that received new answers while saving
+        if _drafts.get(user_id, (None,))[0] is answers:
+            del _drafts[user_id]
+
+
+# --------------------------------------------------------------------------------
+async def run_draft_checkpoints(interval: float = DRAFT_CHECK_INTERVAL) -> None:
+    """
+    Checkpoint abandoned forms until cancelled, then save all drafts.
+
+    Args:
+        interval (float): Seconds between checks.
+
+    Returns:
+        None
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await checkpoint_drafts()
+    finally:
+        await checkpoint_drafts(idle=0.0)
+
+
 # --------------------------------------------------------------------------------
 @router.message(F.text == "Стать частью команды HSE SPB Business Club")
 async def start2(message: types.Message):
@@ -118,7 +195,7 @@ async def start(message: types.Message):
 
 
 # --------------------------------------------------------------------------------
-@router.callback_query(F.data == "next")
+@router.callback_query(Data("next"))
 async def start_2(callback: CallbackQuery):
     """
     Send details message and second keyboard on callback.
@@ -150,9 +227,6 @@ async def start_nu(message: types.Message, state: FSMContext):
             text="К сожалению сейчас нет доступных вакансий"
         )
         return
-    quest = await get_questionary(message.from_user.id)
-    if quest == "not created":
-        await create_questionary(message.from_user.id)
     current = await state.get_state()
     second_states = [
         Questionnaire.motivation,
@@ -195,7 +269,7 @@ async def enter_full_name(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'full_name': message.text})
+    await remember_answer(message.from_user.id, state, {'full_name': message.text})
     await safe_send_message(bot, message, text="Введите свою степень обучения")
     await state.set_state(Questionnaire.degree)
 
@@ -210,7 +284,7 @@ async def enter_degree(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'degree': message.text})
+    await remember_answer(message.from_user.id, state, {'degree': message.text})
     await safe_send_message(bot, message, text="Введите свой курс")
     await state.set_state(Questionnaire.course)
 
@@ -225,7 +299,7 @@ async def enter_course(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'course': message.text})
+    await remember_answer(message.from_user.id, state, {'course': message.text})
     await safe_send_message(bot, message, text="Напишите свою образовательную программу")
     await state.set_state(Questionnaire.program)
 
@@ -240,7 +314,7 @@ async def enter_program(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'program': message.text})
+    await remember_answer(message.from_user.id, state, {'program': message.text})
     await safe_send_message(bot, message, text="Введите свою электронную почту")
     await state.set_state(Questionnaire.email)
 
@@ -255,7 +329,7 @@ async def enter_email(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'email': message.text})
+    await remember_answer(message.from_user.id, state, {'email': message.text})
     vacancies = await get_all_vacancy_names()
     await safe_send_message(
         bot,
@@ -276,7 +350,7 @@ async def enter_vacancy(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'vacancy': message.text})
+    await remember_answer(message.from_user.id, state, {'vacancy': message.text})
     await safe_send_message(
         bot,
         message,
@@ -287,7 +361,7 @@ async def enter_vacancy(message: types.Message, state: FSMContext):
 
 
 # --------------------------------------------------------------------------------
-@router.callback_query(StateFilter(Questionnaire.another_vacancy), F.data.startswith("another_"))
+@router.callback_query(StateFilter(Questionnaire.another_vacancy), Data("another_yes", "another_no"))
 async def ask_another_vacancy(callback: CallbackQuery, state: FSMContext):
     """
     Handle another vacancy choice or continue questionnaire.
@@ -298,13 +372,14 @@ async def ask_another_vacancy(callback: CallbackQuery, state: FSMContext):
     """
     if callback.data == "another_yes":
         vacancies = await get_all_vacancy_names()
-        await callback.message.edit_text(
+        await edit_message_text(
+            callback.message,
             "Какая вакансия тебя интересует?",
             reply_markup=vacancy_selection_keyboard(vacancies),
         )
         await state.set_state(Questionnaire.vacancy)
     else:
-        await callback.message.edit_text("Спасибо за ваш выбор.")
+        await edit_message_text(callback.message, "Спасибо за ваш выбор.")
         await continue_from_second_part(callback.message, state)
     await callback.answer()
 
@@ -332,7 +407,7 @@ async def enter_motivation(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'motivation': message.text})
+    await remember_answer(message.from_user.id, state, {'motivation': message.text})
     await safe_send_message(bot, message, text="Какие у тебя планы на этот учебный год?")
     await state.set_state(Questionnaire.plans)
 
@@ -347,7 +422,7 @@ async def enter_plans(message: types.Message, state: FSMContext):
         message (types.Message): Incoming message instance.
         state (FSMContext): FSM context instance.
     """
-    await update_questionary(message.from_user.id, {'plans': message.text})
+    await remember_answer(message.from_user.id, state, {'plans': message.text})
     await safe_send_message(bot, message, text="Какие твои сильные качества?")
     await state.set_state(Questionnaire.strengths)
 
@@ -365,7 +440,7 @@ async def enter_strengths(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'strengths': message.text})
+    await remember_answer(message.from_user.id, state, {'strengths': message.text})
     await safe_send_message(bot, message, text="Как ты видишь для себя развитие своей карьеры?")
     await state.set_state(Questionnaire.career_goals)
 
@@ -383,7 +458,7 @@ async def enter_career_goals(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'career_goals': message.text})
+    await remember_answer(message.from_user.id, state, {'career_goals': message.text})
     await safe_send_message(bot, message, text="Почему ты хочешь попасть к нам в команду?")
     await state.set_state(Questionnaire.team_motivation)
 
@@ -401,7 +476,7 @@ async def enter_team_motivation(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'team_motivation': message.text})
+    await remember_answer(message.from_user.id, state, {'team_motivation': message.text})
     await safe_send_message(bot, message, text="В какой роли ты видишь себя в команде?")
     await state.set_state(Questionnaire.role_in_team)
 
@@ -419,7 +494,7 @@ async def enter_role_in_team(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'role_in_team': message.text})
+    await remember_answer(message.from_user.id, state, {'role_in_team': message.text})
     await safe_send_message(bot, message, text="На каких мероприятиях Бизнес-клуба ты был(-а)?")
     await state.set_state(Questionnaire.events)
 
@@ -437,7 +512,7 @@ async def enter_events(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'events': message.text})
+    await remember_answer(message.from_user.id, state, {'events': message.text})
     await safe_send_message(bot, message, text="Где ты узнал(-а) про отбор в Бизнес-клуб?")
     await state.set_state(Questionnaire.found_info)
 
@@ -455,7 +530,7 @@ async def enter_found_info(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'found_info': message.text})
+    await remember_answer(message.from_user.id, state, {'found_info': message.text})
     await safe_send_message(bot, message, text="Отправь ссылку на свое резюме/портфолио")
     await state.set_state(Questionnaire.resume)
 
@@ -473,6 +548,8 @@ async def enter_resume(message: types.Message, state: FSMContext):
     Returns:
         None
     """
-    await update_questionary(message.from_user.id, {'resume': message.text})
+    answers = await remember_answer(message.from_user.id, state, {'resume': message.text})
+    if await save_questionaries({message.from_user.id: answers}):
+        _drafts.pop(message.from_user.id, None)
     await safe_send_message(bot, message, text="Благодарим тебя за заполнение анкеты!")
     await state.clear()
@@ -0,0 +1,189 @@
+"""
+Callback Routing
+Callback query dispatch through a table keyed by the callback data prefix.
+"""
+# --------------------------------------------------------------------------------
+import heapq
+from operator import itemgetter
+from typing import Any, Callable, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import CallbackType, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters import BaseFilter
+from aiogram.filters.callback_data import CallbackData, CallbackQueryFilter
+from aiogram.types import CallbackQuery
+
+from bot_instance import logger
+
+SEPARATOR = ":"
+
+
+# --------------------------------------------------------------------------------
+def route_key(data: str | None) -> str:
+    """
+    Routing key of callback data: the CallbackData prefix, or the whole
+    string for constant buttons.
+
+    Args:
+        data (str | None): Callback data.
+
+    Returns:
+        str: Routing key.
+    """
+    return (data or "").partition(SEPARATOR)[0]
+
+
+# --------------------------------------------------------------------------------
+class Data(BaseFilter):
+    """
+    Pass callbacks whose data equals one of the given constants; used by
+    CallbackRoutes as the handler's routing keys.
+
+    Args:
+        *values (str): Callback data constants, without the separator.
+    """
+
+    def __init__(self, *values: str):
+        if not values or any(SEPARATOR in value for value in values):
+            raise ValueError(f"Константы callback data не могут быть пустыми или содержать {SEPARATOR!r}")
+        self.values = frozenset(values)
+
+    async def __call__(self, callback: CallbackQuery) -> bool:
+        return callback.data in self.values
+
+
+class LegacyData(BaseFilter):
+    """
+    Pass callbacks in a button format used before CallbackData factories
+    and hand the handler the equivalent callback_data.
+
+    Buttons already in users' chats keep their old data, so handlers
+    accept both formats for one release.
+
+    Args:
+        parse (Callable[[str], CallbackData | None]): Converts old data
+            into the factory instance, or returns None if it does not match.
+    """
+
+    def __init__(self, parse: Callable[[str], CallbackData | None]):
+        self.parse = parse
+
+    async def __call__(self, callback: CallbackQuery) -> bool | dict[str, Any]:
+        callback_data = self.parse(callback.data or "")
+        if callback_data is None:
+            return False
+        return {"callback_data": callback_data}
+
+
+def _handler_keys(filters: tuple) -> set[str]:
+    keys = set()
+    for item in filters:
+        if isinstance(item, Data):
+            keys |= item.values
+        elif isinstance(item, CallbackQueryFilter) and item.callback_data.__separator__ == SEPARATOR:
+            keys.add(item.callback_data.__prefix__)
+    return keys
+
+
+# --------------------------------------------------------------------------------
+class CallbackRoutes(TelegramEventObserver):
+    """
+    Callback query observer looking handlers up by route_key instead of
+    checking the filters of every handler in turn.
+
+    Handlers with a Data filter or a CallbackData filter are indexed under
+    their constants or prefix; handlers without one are candidates for
+    every key. Candidates are tried in registration order, as with the
+    stock observer, so the index only skips handlers that could not match
+    and never changes which one wins. Filters still run, so a StateFilter
+    or IsSuperuser next to the key keeps working, and the matched handler
+    goes through the usual middlewares.
+    """
+
+    def __init__(self, router: Router, event_name: str = "callback_query"):
+        super().__init__(router=router, event_name=event_name)
+        # Handlers with their registration position, sorted by it
+        self._routes: dict[str, list[tuple[int, HandlerObject]]] = {}
+        self._unrouted: list[tuple[int, HandlerObject]] = []
+
+    # ----------------------------------------------------------------------------
+    def register(
+            self,
+            callback: CallbackType,
+            *filters: CallbackType,
+            flags: Optional[dict[str, Any]] = None,
+            **kwargs: Any,
+    ) -> CallbackType:
+        super().register(callback, *filters, flags=flags, **kwargs)
+        entry = (len(self.handlers) - 1, self.handlers[-1])
+        keys = _handler_keys(filters)
+        for key in keys:
+            self._routes.setdefault(key, []).append(entry)
+        if not keys:
+            self._unrouted.append(entry)
+        return callback
+
+    # ----------------------------------------------------------------------------
+    async def trigger(self, event: CallbackQuery, **kwargs: Any) -> Any:
+        """
+        Run the first handler, in registration order, among the candidates
+        of the callback's key whose filters pass.
+
+        Args:
+            event (CallbackQuery): Incoming callback query.
+            **kwargs: Handler data.
+
+        Returns:
+            Any: Handler result, or UNHANDLED to continue propagation.
+        """
+        candidates = heapq.merge(self._routes.get(route_key(event.data), ()), self._unrouted, key=itemgetter(0))
+        for _, handler in candidates:
+            kwargs["handler"] = handler
+            result, data = await handler.check(event, **kwargs)
+            if not result:
+                continue
+            kwargs.update(data)
+            try:
+                wrapped_inner = self.outer_middleware.wrap_middlewares(
+                    self._resolve_middlewares(),
+                    handler.call,
+                )
+                return await wrapped_inner(event, kwargs)
+            except SkipHandler:
+                continue
+        return UNHANDLED
+
+
+# --------------------------------------------------------------------------------
+class CallbackRouter(Router):
+    """
+    Router whose callback queries are dispatched by CallbackRoutes.
+    """
+
+    def __init__(self, *, name: Optional[str] = None):
+        super().__init__(name=name)
+        self.callback_query = CallbackRoutes(router=self)
+        self.observers["callback_query"] = self.callback_query
+
+
+# --------------------------------------------------------------------------------
+# Included after all other routers, so it only sees callbacks none of them
+# handled, e.g. buttons of keyboards sent before an update or routing mistakes
+fallback_router = Router(name="callback_fallback")
+
+
+@fallback_router.callback_query()
+async def unhandled_callback(callback: CallbackQuery) -> None:
+    """
+    Log a callback no router handled and tell the user the button is stale.
+
+    Args:
+        callback (CallbackQuery): Unhandled callback query.
+
+    Returns:
+        None
+    """
+    logger.warning(f"Необработанный callback {callback.data!r} от пользователя {callback.from_user.id}")
+    await callback.answer("Кнопка устарела, вызовите меню заново")
@@ -0,0 +1,334 @@
+"""
+Mailing Scheduler
+Background task sending scheduled posts and event reminders outside quiet hours.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from bot_instance import BOT_TZ, QUIET_HOURS, bot, logger
+from database.event_cache import event_cache
+from database.req import (
+    count_recipients,
+    create_scheduled_post,
+    get_due_scheduled_posts,
+    iter_recipients,
+    update_scheduled_post,
+)
+from handlers.error import safe_send_message
+from handlers.mailing import MailingPayload, broadcast
+from handlers.progress import ProgressReporter
+from keyboards.keyboards import single_command_button_keyboard
+
+POLL_INTERVAL = 30.0
+# Reminders falling into quiet hours are moved this long before they begin
+QUIET_LEAD = timedelta(minutes=30)
+
+TZ = ZoneInfo(BOT_TZ)
+
+
+# --------------------------------------------------------------------------------
+def _parse_quiet_hours(raw: str) -> tuple[int, int] | None:
+    """
+    Parse quiet hours window like "23-9".
+
+    Args:
+        raw (str): Window as "start-end" local hours; empty or "off" disables it.
+
+    Returns:
+        tuple[int, int] | None: Start and end hour or None when disabled.
+    """
+    match = re.fullmatch(r"\s*(\d{1,2})\s*-\s*(\d{1,2})\s*", raw or "")
+    if not match:
+        return None
+    start, end = int(match.group(1)) % 24, int(match.group(2)) % 24
+    if start == end:
+        return None
+    return start, end
+
+
+QUIET = _parse_quiet_hours(QUIET_HOURS)
+
+
+# --------------------------------------------------------------------------------
+def quiet_window(now: datetime) -> tuple[datetime, datetime] | None:
+    """
+    Get the quiet hours window containing a moment.
+
+    Args:
+        now (datetime): Timezone-aware moment.
+
+    Returns:
+        tuple[datetime, datetime] | None: Start and end of the window or
+            None outside quiet hours.
+    """
+    if QUIET is None:
+        return None
+    start, end = QUIET
+    local = now.astimezone(TZ)
+    if start < end:
+        inside = start <= local.hour < end
+    else:
+        inside = local.hour >= start or local.hour < end
+    if not inside:
+        return None
+    since = local.replace(hour=start, minute=0, second=0, microsecond=0)
+    if since > local:
+        since -= timedelta(days=1)
+    until = local.replace(hour=end, minute=0, second=0, microsecond=0)
+    if until <= local:
+        until += timedelta(days=1)
+    return since, until
+
+
+def quiet_until(now: datetime) -> datetime | None:
+    """
+    Get the end of the quiet hours window containing a moment.
+
+    Args:
+        now (datetime): Timezone-aware moment.
+
+    Returns:
+        datetime | None: End of the window or None outside quiet hours.
+    """
+    window = quiet_window(now)
+    return window[1] if window is not None else None
+
+
+# --------------------------------------------------------------------------------
+def utc_iso(moment: datetime) -> str:
+    """
+    Format a timezone-aware moment like datetime.utcnow().isoformat().
+
+    Args:
+        moment (datetime): Timezone-aware moment.
+
+    Returns:
+        str: Naive UTC ISO string comparable with stored timestamps.
+    """
+    return moment.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+# --------------------------------------------------------------------------------
+def format_local(run_at: str) -> str:
+    """
+    Format a stored UTC timestamp in the bot timezone.
+
+    Args:
+        run_at (str): Naive UTC ISO string.
+
+    Returns:
+        str: Local time as "DD.MM.YY HH:MM".
+    """
+    moment = datetime.fromisoformat(run_at).replace(tzinfo=timezone.utc)
+    return f"{moment.astimezone(TZ):%d.%m.%y %H:%M}"
+
+
+# --------------------------------------------------------------------------------
+def parse_local_time(text: str) -> datetime | None:
+    """
+    Parse admin input "DD.MM.YY HH:MM" in the bot timezone.
+
+    Args:
+        text (str): User input.
+
+    Returns:
+        datetime | None: Timezone-aware moment or None on invalid input.
+    """
+    try:
+        return datetime.strptime(text.strip(), "%d.%m.%y %H:%M").replace(tzinfo=TZ)
+    except ValueError:
+        return None
+
+
+# --------------------------------------------------------------------------------
+def event_start(event) -> datetime | None:
+    """
+    Get event start from its name ("eventDD_MM_YY") and free-text time.
+
+    Args:
+        event (Event): Event instance.
+
+    Returns:
+        datetime | None: Timezone-aware start or None if it cannot be parsed.
+    """
+    date_match = re.fullmatch(r"event(\d{2})_(\d{2})_(\d{2})", event.name or "")
+    time_match = re.search(r"(\d{1,2})[:.](\d{2})", event.time or "")
+    if not date_match or not time_match:
+        return None
+    day, mon, year = (int(part) for part in date_match.groups())
+    try:
+        return datetime(
+            2000 + year, mon, day,
+            int(time_match.group(1)), int(time_match.group(2)),
+            tzinfo=TZ,
+        )
+    except ValueError:
+        return None
+
+
+# --------------------------------------------------------------------------------
+async def schedule_reminders(event, hours_before: list[int], created_by: int) -> list[datetime]:
+    """
+    Schedule reminders for registered users before an event starts.
+
+    A reminder falling into quiet hours is moved to QUIET_LEAD before they
+    begin, since held until their end it would arrive after the start.
+
+    Args:
+        event (Event): Event instance with a parsable start time.
+        hours_before (list[int]): Offsets before the start in hours.
+        created_by (int): Admin Telegram ID receiving mailing reports.
+
+    Returns:
+        list[datetime]: Send times of the created reminders still in the future.
+    """
+    start = event_start(event)
+    if start is None:
+        return []
+    payload = MailingPayload.from_text(
+        f"Напоминаем о мероприятии «{event.desc}»!\n\n"
+        f"📅 {event.date}, {event.time}\n"
+        f"📍 {event.place}",
+        single_command_button_keyboard(),
+    ).dump()
+    now = datetime.now(timezone.utc)
+    scheduled = []
+    for hours in sorted(set(hours_before), reverse=True):
+        run_at = start - timedelta(hours=hours)
+        window = quiet_window(run_at)
+        if window is not None:
+            # Held until quiet hours end it could reach users only after the
+            # start, so it goes out before they begin instead
+            run_at = window[0] - QUIET_LEAD
+        if run_at <= now or run_at in scheduled:
+            continue
+        await create_scheduled_post({
+            'target': 'reminder',
+            'event_name': event.name,
+            'payload': payload,
+            'run_at': utc_iso(run_at),
+            'created_by': created_by,
+        })
+        scheduled.append(run_at)
+    return scheduled
+
+
+# --------------------------------------------------------------------------------
+async def reminder_deadline(post) -> datetime | None:
+    """
+    Get the moment after which a scheduled post is no longer worth sending.
+
+    Args:
+        post (ScheduledPost): Scheduled post.
+
+    Returns:
+        datetime | None: Event start for reminders, None for other posts or
+            events whose start cannot be parsed.
+    """
+    if post.target != 'reminder':
+        return None
+    event = await event_cache.get(post.event_name)
+    if not event or event == "not created":
+        return None
+    return event_start(event)
+
+
+# --------------------------------------------------------------------------------
+async def expire_post(post, reason: str) -> None:
+    """
+    Drop a scheduled post that is too late to send and tell its author.
+
+    Args:
+        post (ScheduledPost): Scheduled post.
+        reason (str): Why the post is dropped, shown to the admin.
+
+    Returns:
+        None
+    """
+    await update_scheduled_post(post.id, {'status': 'expired'})
+    logger.info(f"Рассылка #{post.id} отменена: {reason}")
+    await safe_send_message(bot, post.created_by, f"⏹ Отложенная рассылка #{post.id} отменена: {reason}")
+
+
+# --------------------------------------------------------------------------------
+async def run_post(post) -> None:
+    """
+    Send a scheduled post, resuming after the last saved checkpoint.
+
+    Recipients are streamed by ascending ID and the last ID of every sent
+    page is saved, so a restart continues with the first user after it
+    even if recipients were added or marked undeliverable meanwhile. When
+    quiet hours begin the post is parked with resume_at and picked up by
+    a later poll; if recipients could not be fetched it stays running and
+    is resumed on the next poll. A reminder that could only go out after
+    its event starts is expired instead.
+
+    Args:
+        post (ScheduledPost): Due scheduled post.
+
+    Returns:
+        None
+    """
+    deadline = await reminder_deadline(post)
+    if deadline is not None and datetime.now(timezone.utc) >= deadline:
+        await expire_post(post, "мероприятие уже началось")
+        return
+    total = await count_recipients(post.target, post.event_name, post.last_user_id)
+    if total is None:
+        # Database error: the post stays due and is retried on the next poll
+        return
+    payload = MailingPayload.load(post.payload)
+    sent_cnt = post.sent_cnt or 0
+    await update_scheduled_post(post.id, {'status': 'running', 'resume_at': None})
+
+    async def checkpoint(page: list[int]) -> bool:
+        nonlocal sent_cnt
+        sent_cnt += len(page)
+        await update_scheduled_post(post.id, {'sent_cnt': sent_cnt, 'last_user_id': page[-1]})
+        until = quiet_until(datetime.now(timezone.utc))
+        if until is None:
+            return True
+        if deadline is not None and until >= deadline:
+            await expire_post(post, "тихие часы закончатся уже после начала мероприятия")
+            return False
+        await update_scheduled_post(post.id, {'resume_at': utc_iso(until)})
+        logger.info(f"Рассылка #{post.id} приостановлена до {until:%H:%M} (тихие часы)")
+        return False
+
+    details = f"Отложенная рассылка #{post.id}\n"
+    if post.event_name:
+        details += f"Событие: {post.event_name}\n"
+    if sent_cnt:
+        # The counters below cover this run only, not the pages sent before the pause
+        details += f"Продолжение: уже обработано {sent_cnt}, ниже — оставшиеся получатели\n"
+    reporter = ProgressReporter(post.created_by, total, details=details)
+    await reporter.start()
+    recipients = iter_recipients(post.target, post.event_name, post.last_user_id)
+    if await broadcast(payload, recipients, reporter, checkpoint):
+        await update_scheduled_post(post.id, {'status': 'done'})
+
+
+# --------------------------------------------------------------------------------
+async def run_scheduler(interval: float = POLL_INTERVAL) -> None:
+    """
+    Poll for due posts and send them one by one outside quiet hours.
+
+    Args:
+        interval (float): Seconds between polls.
+
+    Returns:
+        None
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        if quiet_until(now) is None:
+            for post in await get_due_scheduled_posts(utc_iso(now)) or []:
+                try:
+                    await run_post(post)
+                except Exception as e:
+                    logger.exception(f"Ошибка отложенной рассылки #{post.id}: {e}")
+                    await update_scheduled_post(post.id, {'status': 'failed'})
+        await asyncio.sleep(interval)
@@ -0,0 +1,299 @@
+"""
+Send Queue
+Outbound message scheduler with per-chat ordering and global rate control.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import random
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiohttp import ClientConnectorError
+
+from bot_instance import logger
+from monitoring.tracing import attach, current_span
+
+RETRYABLE_ERRORS = (
+    TelegramNetworkError,
+    TelegramServerError,
+    ClientConnectorError,
+    asyncio.TimeoutError,
+)
+
+
+# --------------------------------------------------------------------------------
+class _RateLimiter:
+    """
+    Evenly spaced global rate limiter based on slot reservation.
+
+    Args:
+        rate (float): Maximum number of calls per second.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until the next free send slot.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# --------------------------------------------------------------------------------
+class _Job:
+    """
+    Single queued Bot API call.
+
+    Args:
+        call (Callable[[], Awaitable]): Factory producing the request coroutine.
+        future (asyncio.Future): Future resolved with the call result.
+        not_before (float): Loop time before which the call must not run.
+        attempts (int): Maximum attempts on retryable errors.
+        parent (Span | None): Span active at submit time, restored in the worker.
+    """
+    __slots__ = ("call", "future", "not_before", "attempts", "parent")
+
+    def __init__(self, call, future, not_before, attempts, parent=None):
+        self.call = call
+        self.future = future
+        self.not_before = not_before
+        self.attempts = attempts
+        self.parent = parent
+
+
+# --------------------------------------------------------------------------------
+def _retrieve_exception(future: asyncio.Future) -> None:
+    """
+    Mark future exception as retrieved for fire-and-forget submissions.
+
+    Args:
+        future (asyncio.Future): Finished job future.
+    """
+    if not future.cancelled():
+        future.exception()
+
+
+# --------------------------------------------------------------------------------
+def _resolve(future: asyncio.Future, result: Any = None, exc: BaseException | None = None) -> None:
+    """
+    Set future outcome unless the caller has already cancelled it.
+
+    Args:
+        future (asyncio.Future): Job future.
+        result (Any): Call result.
+        exc (BaseException | None): Raised exception, if any.
+    """
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+# --------------------------------------------------------------------------------
+class SendQueue:
+    """
+    Per-chat FIFO queues drained under a shared global rate limit.
+
+    Each chat is served by its own short-lived worker, so a
+    TelegramRetryAfter or a network backoff only delays the affected chat
+    while all other chats keep sending.
+
+    Args:
+        rate (float): Global sends per second.
+        max_attempts (int): Default attempts on retryable errors.
+        max_retry_after (int): Rate-limit waits per job before it fails.
+        base_delay (float): First backoff delay in seconds.
+        max_delay (float): Upper bound of a single backoff delay.
+    """
+
+    def __init__(
+            self,
+            rate: float = 25.0,
+            max_attempts: int = 5,
+            max_retry_after: int = 5,
+            base_delay: float = 1.0,
+            max_delay: float = 30.0,
+    ):
+        self.max_attempts = max_attempts
+        self.max_retry_after = max_retry_after
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limiter = _RateLimiter(rate)
+        self._chats: dict[int, deque[_Job]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    # ----------------------------------------------------------------------------
+    def submit(
+            self,
+            chat_id: int,
+            call: Callable[[], Awaitable[Any]],
+            delay: float = 0.0,
+            attempts: int | None = None,
+    ) -> asyncio.Future:
+        """
+        Enqueue a Bot API call for a chat.
+
+        Args:
+            chat_id (int): Target chat, used as the ordering key.
+            call (Callable[[], Awaitable]): Factory producing the request coroutine.
+            delay (float): Minimal delay before the first attempt in seconds.
+            attempts (int | None): Attempts on retryable errors.
+
+        Returns:
+            asyncio.Future: Future with the call result; may be left unawaited.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_retrieve_exception)
+        job = _Job(call, future, loop.time() + delay, attempts or self.max_attempts, current_span())
+        self._chats.setdefault(chat_id, deque()).append(job)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = loop.create_task(self._drain(chat_id))
+        return future
+
+    # ----------------------------------------------------------------------------
+    async def send(self, method: Callable[..., Awaitable[Any]], /, **params) -> Any:
+        """
+        Enqueue a bot method call and wait for its result.
+
+        Args:
+            method (Callable): Bound Bot method, e.g. ``bot.send_photo``.
+            **params: Method parameters; must include ``chat_id``.
+
+        Returns:
+            Any: Result of the Bot API call.
+        """
+        return await self.submit(params["chat_id"], partial(method, **params))
+
+    # ----------------------------------------------------------------------------
+    def backoff(self, attempt: int) -> float:
+        """
+        Compute jittered exponential backoff delay.
+
+        Args:
+            attempt (int): Number of failed attempts so far.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    # ----------------------------------------------------------------------------
+    async def _drain(self, chat_id: int) -> None:
+        """
+        Run queued jobs of one chat in order until the queue is empty.
+
+        Args:
+            chat_id (int): Chat whose queue is drained.
+        """
+        jobs = self._chats[chat_id]
+        try:
+            while jobs:
+                await self._run(chat_id, jobs[0])
+                jobs.popleft()
+        finally:
+            for job in jobs:
+                job.future.cancel()
+            self._chats.pop(chat_id, None)
+            self._workers.pop(chat_id, None)
+
+    # ----------------------------------------------------------------------------
+    async def _run(self, chat_id: int, job: _Job) -> None:
+        """
+        Execute one job honouring retry-after and backoff for its chat.
+
+        Args:
+            chat_id (int): Target chat.
+            job (_Job): Job to execute.
+        """
+        loop = asyncio.get_running_loop()
+        failures = 0
+        throttled = 0
+        while not job.future.done():
+            wait = job.not_before - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._limiter.acquire()
+            try:
+                with attach(job.parent):
+                    result = await job.call()
+            except TelegramRetryAfter as e:
+                throttled += 1
+                if throttled > self.max_retry_after:
+                    logger.error(
+                        f"Чат {chat_id}: лимит превышен {throttled} раз подряд, отправка отменена"
+                    )
+                    _resolve(job.future, exc=e)
+                    return
+                logger.warning(
+                    f"Чат {chat_id}: превышен лимит, повтор через {e.retry_after} с."
+                )
+                job.not_before = loop.time() + e.retry_after
+            except RETRYABLE_ERRORS as e:
+                throttled = 0
+                failures += 1
+                if failures >= job.attempts:
+                    logger.error(
+                        f"Не удалось отправить сообщение в чат {chat_id} после "
+                        f"{failures} попыток: {e}"
+                    )
+                    _resolve(job.future, exc=e)
+                    return
+                job.not_before = loop.time() + self.backoff(failures)
+                logger.warning(
+                    f"Ошибка подключения: {e}. Попытка {failures} из {job.attempts}."
+                )
+            except Exception as e:
+                _resolve(job.future, exc=e)
+                return
+            else:
+                _resolve(job.future, result=result)
+                return
+
+    # ----------------------------------------------------------------------------
+    def set_rate(self, rate: float) -> None:
+        """
+        Replace the global rate limit, e.g. to lift it in load tests.
+
+        Args:
+            rate (float): Global sends per second.
+        """
+        self._limiter = _RateLimiter(rate)
+
+    # ----------------------------------------------------------------------------
+    async def close(self) -> None:
+        """
+        Cancel all chat workers and pending jobs.
+
+        Returns:
+            None
+        """
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+# --------------------------------------------------------------------------------
+send_queue = SendQueue()
@@ -1,24 +1,34 @@
-from aiogram import Router, F
+from aiogram import F
 from aiogram.filters import Command, CommandStart
 from aiogram.filters.command import CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
-
-from bot_instance import bot
-from database.req import get_user, create_user, create_user_x_event_row, get_all_user_events, get_event, \
-    update_user_x_event_row_status, update_reg_event, check_completly_reg_event, create_reg_event, get_reg_event, \
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile, \
+    FSInputFile
+
+from bot_instance import bot, logger
+from database.checkin_cache import checkin_cache
+from database.event_cache import event_cache
+from database.role_cache import Roles
+from database.req import get_user, create_user, create_user_x_event_row, \
+    update_user_x_event_row_status, save_reg_event_registration, get_reg_event, \
     get_user_x_event_row, get_ref_give_away, create_ref_give_away, delete_user_x_event_row, delete_ref_give_away_row, \
-    get_all_hosts_in_event_ids, get_host, add_money, one_more_event, get_user_rank_by_money, get_top_10_users_by_money, \
-    add_referal_cnt, update_strick, add_user_to_networking, create_qr_code, get_face_control
-from handlers.error import safe_send_message
-from handlers.qr_utils import create_styled_qr_code
+    get_host, add_money, one_more_event, get_user_rank_by_money, get_top_10_users_by_money, \
+    add_referal_cnt, update_strick, add_user_to_networking, create_qr_code, \
+    reset_delivery_status, get_check_in_view, check_in, record_attendance
+from handlers.error import delete_message, edit_message_text, safe_send_message
+from handlers.send_queue import send_queue
+from handlers.qr_batch import pregenerated_qr
+from handlers.qr_utils import QR_TOKEN_PREFIX, create_styled_qr_code, event_key, make_qr_token, parse_qr_token
 from handlers.quest import start
+from handlers.routing import CallbackRouter, Data, LegacyData
+from keyboards.callbacks import QrEvent, RefEvent, VerifyQr, legacy_qr_event, legacy_ref_event, legacy_verify_qr
+from monitoring.metrics import count_handled_error
 from keyboards.keyboards import single_command_button_keyboard, events_ikb, yes_no_ikb, yes_no_hse_ikb, get_ref_ikb, \
     top_ikb
 from errors.errors import Error404
 
-router = Router()
+router = CallbackRouter()
 
 
 class EventReg(StatesGroup):
@@ -30,6 +40,18 @@ class EventReg(StatesGroup):
     waiting_org = State()
 
 
+# RegEvent fields collected by EventReg, kept in FSM data until the last step
+REG_FIELDS = ('name', 'surname', 'fathername', 'phone', 'mail', 'org')
+
+
+async def remember_reg_field(state: FSMContext, field: str, value: str) -> dict:
+    """Buffer a registration form answer in FSM data and return the form."""
+    data = await state.get_data()
+    form = {**data.get('reg_form', {}), field: value}
+    await state.update_data(reg_form=form)
+    return form
+
+
 give_away_ids = {1568674379: 'hsespbcareer',
                  1426453089: 'Коляна',
                  483458201: 'Me. Only for tests'}
@@ -56,13 +78,16 @@ mmsg = """
 async def cmd_start(message: Message, command: CommandObject, state: FSMContext):
     hash_value = command.args
 
-    if hash_value and hash_value.startswith('qr_'):
+    if hash_value and (hash_value.startswith('qr_') or hash_value.startswith(QR_TOKEN_PREFIX)):
         # Create a new command object for check_qr
         check_qr_command = CommandObject(command=message.text, args=hash_value)
         await cmd_check_qr(message, check_qr_command)
         return
 
     user = await get_user(message.from_user.id)
+    if user and user != "not created" and user.delivery_status:
+        # User came back after blocking the bot, make them reachable again
+        await reset_delivery_status(user.id)
     if hash_value:
         if hash_value == 'networking':
             if user == "not created":
@@ -73,7 +98,7 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
                 await safe_send_message(bot, message.from_user.id, 'Вы уже участвуете в нетворкинге')
             else:
                 await safe_send_message(bot, message.from_user.id, 'Поздравляем! Вы участвуете в нетворкинге')
-            await bot.delete_message(message.from_user.id, message.message_id - 1)
+            await delete_message(message.from_user.id, message.message_id - 1)
         elif hash_value[:3] == 'reg':
             if user == "not created":
                 user = await create_user(message.from_user.id,
@@ -85,7 +110,7 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
             user_x_event = await get_user_x_event_row(message.from_user.id, event_name)
             if user_x_event == 'not created':
                 await create_user_x_event_row(message.from_user.id, event_name, hash_value.split('_')[-1])
-                event = await get_event(event_name)
+                event = await event_cache.get(event_name)
                 if event == 'not created':
                     await safe_send_message(bot, message, 'Такого события не существует..')
                 await state.update_data({'name': event_name})
@@ -109,14 +134,14 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
                 user_x_event = await get_user_x_event_row(message.from_user.id, event_name)
                 if user_x_event == 'not created':
                     await create_user_x_event_row(message.from_user.id, event_name, str(user_id))
-                    event = await get_event(event_name)
+                    event = await event_cache.get(event_name)
                     if event == 'not created':
                         await safe_send_message(bot, message, 'Такого события не существует..')
                     await state.update_data({'name': event_name})
                     await safe_send_message(bot, message, f'Хотите зарегистрироваться на мероприятие "{event.desc}",'
                                                           f'которое пройдет {event.date} в {event.time}',
                                             reply_markup=yes_no_ikb())
-                    hosts_ids = await get_all_hosts_in_event_ids(event_name)
+                    hosts_ids = await event_cache.hosts(event_name)
                     if hosts_ids and user_id in hosts_ids:
                         ref_give_away = await get_ref_give_away(message.from_user.id, event_name)
                         if not ref_give_away:
@@ -167,7 +192,7 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
             ref_giver = await get_user(int(row.first_contact))
             await safe_send_message(bot, message, text="QR-код удачно отсканирован!",
                                     reply_markup=single_command_button_keyboard())
-            hosts_ids = await get_all_hosts_in_event_ids(hash_value)
+            hosts_ids = await event_cache.hosts(hash_value)
             if (not hosts_ids and ref_giver != 'not created') or (
                     hosts_ids and ref_giver != 'not created' and ref_giver.id not in hosts_ids):
                 await safe_send_message(bot, ref_giver.id,
@@ -195,7 +220,7 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
     # TODO: to del after bets
 
 
-@router.callback_query(F.data == "event_no")
+@router.callback_query(Data("event_no"))
 async def reg_event_part0_5(callback: CallbackQuery, state: FSMContext):
     await safe_send_message(bot, callback, "Это очень грустно((", reply_markup=single_command_button_keyboard())
     data = await state.get_data()
@@ -209,34 +234,66 @@ async def reg_event_part0_5(callback: CallbackQuery, state: FSMContext):
     await state.clear()
 
 
-@router.callback_query(F.data == "event_yes")
+@router.callback_query(Data("event_yes"))
 async def reg_event_part1(callback: CallbackQuery, state: FSMContext):
     """Handle event registration confirmation."""
     await safe_send_message(bot, callback, "Вы студент/сотрудник НИУ ВШЭ?", reply_markup=yes_no_hse_ikb())
 
 
-@router.callback_query(F.data == "hse_yes")
+@router.callback_query(Data("hse_yes"))
 async def reg_event_part1_5(callback: CallbackQuery, state: FSMContext):
     """Handle HSE student/employee registration."""
     data = await state.get_data()
     name = data.get('name')
-    event = await get_event(name)
+    event = await event_cache.get(name)
     await create_user_x_event_row(callback.from_user.id, name, callback.from_user.username)
     bot_username = (await bot.get_me()).username
-    qr_data = f"https://t.me/{bot_username}?start=qr_{callback.from_user.id}_{name}"
+    qr_data = f"https://t.me/{bot_username}?start={make_qr_token(callback.from_user.id, name)}"
     qr_image = create_styled_qr_code(qr_data)
     await create_qr_code(callback.from_user.id, name)
-    temp_file = "temp_qr.png"
-    with open(temp_file, "wb") as f:
-        f.write(qr_image.getvalue())
-    try:
+    await safe_send_message(bot, callback,
+                            f"Мы вас ждем на мероприятии \"{event.desc}\", которое пройдет {event.date} в {event.time}\n"
+                            f"Место проведение - {event.place}",
+                            reply_markup=get_ref_ikb(name)
+                            )
+    await send_queue.send(
+        bot.send_photo,
+        chat_id=callback.message.chat.id,
+        photo=BufferedInputFile(qr_image.getvalue(), filename="qr.png"),
+        caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
+                f"Это ваш пропуск на мероприятие:\n"
+                f"Название: {event.desc}\n"
+                f"Дата: {event.date}\n"
+                f"Время: {event.time}\n"
+                f"Место: {event.place}\n\n"
+                f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
+    )
+    await state.clear()
+
+
+@router.callback_query(Data("hse_no"))
+async def reg_event_part2(callback: CallbackQuery, state: FSMContext):
+    """Handle non-HSE user registration."""
+    reg_event = await get_reg_event(callback.from_user.id)
+    if reg_event and all(getattr(reg_event, field) for field in REG_FIELDS):
+        data = await state.get_data()
+        name = data.get('name')
+        event = await event_cache.get(name)
+        await create_user_x_event_row(callback.from_user.id, name, callback.from_user.username)
+        bot_username = (await bot.get_me()).username
+        qr_data = f"https://t.me/{bot_username}?start={make_qr_token(callback.from_user.id, name)}"
+        qr_image = create_styled_qr_code(qr_data)
+        await create_qr_code(callback.from_user.id, name)
         await safe_send_message(bot, callback,
+                                "Ваши данные уже сохранены!\n"
                                 f"Мы вас ждем на мероприятии \"{event.desc}\", которое пройдет {event.date} в {event.time}\n"
                                 f"Место проведение - {event.place}",
                                 reply_markup=get_ref_ikb(name)
                                 )
-        await callback.message.answer_photo(
-            photo=FSInputFile(temp_file),
+        await send_queue.send(
+            bot.send_photo,
+            chat_id=callback.message.chat.id,
+            photo=BufferedInputFile(qr_image.getvalue(), filename="qr.png"),
             caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
                     f"Это ваш пропуск на мероприятие:\n"
                     f"Название: {event.desc}\n"
@@ -245,55 +302,6 @@ async def reg_event_part1_5(callback: CallbackQuery, state: FSMContext):
                     f"Место: {event.place}\n\n"
                     f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
         )
-    finally:
-        import os
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-    await state.clear()
-
-
-@router.callback_query(F.data == "hse_no")
-async def reg_event_part2(callback: CallbackQuery, state: FSMContext):
-    """Handle non-HSE user registration."""
-    reg_event = await get_reg_event(callback.from_user.id)
-    if not reg_event:
-        await create_reg_event(callback.from_user.id)
-        flag = False
-    else:
-        flag = await check_completly_reg_event(callback.from_user.id)
-    if flag:
-        data = await state.get_data()
-        name = data.get('name')
-        event = await get_event(name)
-        await create_user_x_event_row(callback.from_user.id, name, callback.from_user.username)
-        bot_username = (await bot.get_me()).username
-        qr_data = f"https://t.me/{bot_username}?start=qr_{callback.from_user.id}_{name}"
-        qr_image = create_styled_qr_code(qr_data)
-        await create_qr_code(callback.from_user.id, name)
-        temp_file = "temp_qr.png"
-        with open(temp_file, "wb") as f:
-            f.write(qr_image.getvalue())
-        try:
-            await safe_send_message(bot, callback,
-                                    "Ваши данные уже сохранены!\n"
-                                    f"Мы вас ждем на мероприятии \"{event.desc}\", которое пройдет {event.date} в {event.time}\n"
-                                    f"Место проведение - {event.place}",
-                                    reply_markup=get_ref_ikb(name)
-                                    )
-            await callback.message.answer_photo(
-                photo=FSInputFile(temp_file),
-                caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
-                        f"Это ваш пропуск на мероприятие:\n"
-                        f"Название: {event.desc}\n"
-                        f"Дата: {event.date}\n"
-                        f"Время: {event.time}\n"
-                        f"Место: {event.place}\n\n"
-                        f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
-            )
-        finally:
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
         await state.clear()
     else:
         await safe_send_message(bot, callback,
@@ -303,35 +311,35 @@ async def reg_event_part2(callback: CallbackQuery, state: FSMContext):
 
 @router.message(EventReg.waiting_name)
 async def reg_event_part3(message: Message, state: FSMContext):
-    await update_reg_event(message.from_user.id, {'name': message.text})
+    await remember_reg_field(state, 'name', message.text)
     await safe_send_message(bot, message, 'Напишите, пожалуйста, вашу фамилию')
     await state.set_state(EventReg.waiting_surname)
 
 
 @router.message(EventReg.waiting_surname)
 async def reg_event_part3(message: Message, state: FSMContext):
-    await update_reg_event(message.from_user.id, {'surname': message.text})
+    await remember_reg_field(state, 'surname', message.text)
     await safe_send_message(bot, message, 'Напишите, пожалуйста, ваше отчество')
     await state.set_state(EventReg.waiting_fathername)
 
 
 @router.message(EventReg.waiting_fathername)
 async def reg_event_part3(message: Message, state: FSMContext):
-    await update_reg_event(message.from_user.id, {'fathername': message.text})
+    await remember_reg_field(state, 'fathername', message.text)
     await safe_send_message(bot, message, 'Укажите, пожалуйста, ваш мобильный телефон')
     await state.set_state(EventReg.waiting_phone)
 
 
 @router.message(EventReg.waiting_phone)
 async def reg_event_part3(message: Message, state: FSMContext):
-    await update_reg_event(message.from_user.id, {'phone': message.text})
+    await remember_reg_field(state, 'phone', message.text)
     await safe_send_message(bot, message, 'Укажите, пожалуйста, вашу почту')
     await state.set_state(EventReg.waiting_mail)
 
 
 @router.message(EventReg.waiting_mail)
 async def reg_event_part3(message: Message, state: FSMContext):
-    await update_reg_event(message.from_user.id, {'mail': message.text})
+    await remember_reg_field(state, 'mail', message.text)
     await safe_send_message(bot, message, 'Укажите, пожалуйста, из какого вы вуза/организации')
     await state.set_state(EventReg.waiting_org)
 
@@ -339,40 +347,33 @@ async def reg_event_part3(message: Message, state: FSMContext):
 @router.message(EventReg.waiting_org)
 async def reg_event_part3(message: Message, state: FSMContext):
     """Handle organization input and complete registration."""
-    await update_reg_event(message.from_user.id, {'org': message.text})
-    if await check_completly_reg_event(message.from_user.id):
-        data = await state.get_data()
-        name = data.get('name')
-        event = await get_event(name)
-        await create_user_x_event_row(message.from_user.id, name, message.from_user.username)
+    form = await remember_reg_field(state, 'org', message.text)
+    data = await state.get_data()
+    name = data.get('name')
+    if all(form.get(field) for field in REG_FIELDS) and await save_reg_event_registration(
+            message.from_user.id, form, name, message.from_user.username):
+        event = await event_cache.get(name)
         bot_username = (await bot.get_me()).username
-        qr_data = f"https://t.me/{bot_username}?start=qr_{message.from_user.id}_{name}"
+        qr_data = f"https://t.me/{bot_username}?start={make_qr_token(message.from_user.id, name)}"
         qr_image = create_styled_qr_code(qr_data)
-        await create_qr_code(message.from_user.id, name)
-        temp_file = "temp_qr.png"
-        with open(temp_file, "wb") as f:
-            f.write(qr_image.getvalue())
-        try:
-            await safe_send_message(bot, message,
-                                    f"Мы вас ждем на мероприятии \"{event.desc}\", которое пройдет {event.date} в {event.time}\n"
-                                    f"Место проведение - {event.place}\n\n"
-                                    f"⚠ Обязательно возьмите с собой паспорт!",
-                                    reply_markup=get_ref_ikb(name)
-                                    )
-            await message.answer_photo(
-                photo=FSInputFile(temp_file),
-                caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
-                        f"Это ваш пропуск на мероприятие:\n"
-                        f"Название: {event.desc}\n"
-                        f"Дата: {event.date}\n"
-                        f"Время: {event.time}\n"
-                        f"Место: {event.place}\n\n"
-                        f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
-            )
-        finally:
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        await safe_send_message(bot, message,
+                                f"Мы вас ждем на мероприятии \"{event.desc}\", которое пройдет {event.date} в {event.time}\n"
+                                f"Место проведение - {event.place}\n\n"
+                                f"⚠ Обязательно возьмите с собой паспорт!",
+                                reply_markup=get_ref_ikb(name)
+                                )
+        await send_queue.send(
+            bot.send_photo,
+            chat_id=message.chat.id,
+            photo=BufferedInputFile(qr_image.getvalue(), filename="qr.png"),
+            caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
+                    f"Это ваш пропуск на мероприятие:\n"
+                    f"Название: {event.desc}\n"
+                    f"Дата: {event.date}\n"
+                    f"Время: {event.time}\n"
+                    f"Место: {event.place}\n\n"
+                    f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
+        )
     else:
         await safe_send_message(bot, message, 'Что то пошло не так, начните регистрацию заново, пожалуйста\n'
                                               'Для этого повторно перейдите по ссылке')
@@ -380,9 +381,8 @@ async def reg_event_part3(message: Message, state: FSMContext):
 
 
 @router.message(Command("info"))
-async def cmd_info(message: Message):
-    user = await get_user(message.from_user.id)
-    if user.is_superuser:
+async def cmd_info(message: Message, roles: Roles):
+    if roles.superuser:
         await safe_send_message(bot, message, text="Список доступных команд:\n"
                                                    "/start - перезапуск бота\n"
                                                    "/info - информация о доступных командах\n"
@@ -393,12 +393,17 @@ async def cmd_info(message: Message):
                                                    "/my_qr - получить QR код для последнего мероприятия\n"
                                                    "/send_stat - получить статистику о пользователях\n"
                                                    "/send_post - отправить пост пользователям\n"
+                                                   "/schedule_post - запланировать пост на заданное время\n"
+                                                   "/scheduled - список запланированных рассылок\n"
+                                                   "/remind_event - запланировать напоминания о событии\n"
+                                                   "/pregen_qr - заранее сгенерировать QR коды участникам события\n"
                                                    "/add_event - создает новое событие\n"
                                                    "/end_event - завершить событие\n"
                                                    "/get_link - получить ссылки на событие\n"
                                                    "/create_give_away - создать дополнительный розыгрыш для инфлюенсера\n"
                                                    "/get_result - получить победителя в дополнительном розыгрыше\n"
-                                                   "/face_control - управление фейс-контроль (добавление/удаление/просмотр)")
+                                                   "/face_control - управление фейс-контроль (добавление/удаление/просмотр)\n"
+                                                   "/reset_delivery - сбросить отметки о заблокировавших бота пользователях")
     else:
         await safe_send_message(bot, message, text="Список доступных команд:\n"
                                                    "/start - перезапуск бота\n"
@@ -419,7 +424,7 @@ async def cmd_profile(message: Message):
     await safe_send_message(bot, message, msg, reply_markup=top_ikb())
 
 
-@router.callback_query(F.data == 'top')
+@router.callback_query(Data('top'))
 async def top_inline(message: Message):
     await cmd_top(message)
 
@@ -444,7 +449,7 @@ async def cmd_top(message: Message):
 
 @router.message(Command("get_ref"))
 async def get_ref_v2_part1(message: Message):
-    events = await get_all_user_events(message.from_user.id)
+    events = await event_cache.user_events(message.from_user.id)
     if not events:
         await safe_send_message(bot, message, "Вы не зарегистрированы ни на одно событие и не можете никого никуда "
                                               "пригласить", reply_markup=single_command_button_keyboard())
@@ -453,179 +458,187 @@ async def get_ref_v2_part1(message: Message):
                             reply_markup=events_ikb(events))
 
 
-@router.callback_query(F.data.startswith("verify_"))
-async def process_verification(callback: CallbackQuery):
-    """Handle QR code verification by admin."""
-    try:
-        # Print the callback data for debugging
-        print(f"Callback data: {callback.data}")
-
-        # Split the callback data to get user_id, event_name and action
-        parts = callback.data.split('_')
-        print(f"Split parts: {parts}")  # Debug print
-
-        if len(parts) < 4:
-            await callback.answer("Неверный формат данных")
-            return
-
-        # The first part is 'verify', then user_id, then event_name (which may contain underscores)
-        # and finally the action (allow/deny)
-        verify_prefix = parts[0]
-        user_id = parts[1]
-        action = parts[-1]  # Last part is always the action
-
-        # Everything in between is the event name
-        event_name = '_'.join(parts[2:-1])
-
-        print(
-            f"Parsed data: verify_prefix={verify_prefix}, user_id={user_id}, event_name={event_name}, action={action}")  # Debug print
-
-        user_id = int(user_id)
+def _check_in_card(user, event, reg_event) -> str:
+    """Render attendee and event details shown to face control."""
+    user_info = ""
+    if reg_event:
+        user_info = f"\nФИО: {reg_event.surname} {reg_event.name} {reg_event.fathername}\nТелефон: {reg_event.phone}"
+    return (
+        f"Пользователь: @{user.handler}{user_info}\n"
+        f"Мероприятие: {event.desc}\n"
+        f"Дата: {event.date}\n"
+        f"Время: {event.time}\n"
+        f"Место: {event.place}"
+    )
 
-        # Get user and event info
-        user = await get_user(user_id)
-        event = await get_event(event_name)
 
-        if user == "not created" or event == "not created":
+@router.callback_query(VerifyQr.filter())
+@router.callback_query(LegacyData(legacy_verify_qr))
+async def process_verification(callback: CallbackQuery, callback_data: VerifyQr):
+    """Handle QR code verification by admin."""
+    try:
+        user_id = callback_data.user_id
+        event_name = callback_data.event_name
+        action = callback_data.action
+
+        # Get user, event and scanner rights from memory or one query
+        view = checkin_cache.lookup(user_id, event_name, callback.from_user.id)
+        if view is None:
+            view = await get_check_in_view(user_id, event_name, callback.from_user.id)
+        if not view or view == "not found":
             await callback.answer("Пользователь или мероприятие не найдены")
             return
-
-        # Get user registration details
-        reg_event = await get_reg_event(user_id)
-        user_info = ""
-        if reg_event:
-            user_info = f"\nФИО: {reg_event.surname} {reg_event.name} {reg_event.fathername}\nТелефон: {reg_event.phone}"
+        if not (view['scanner_is_superuser'] or view['scanner_is_face_control']):
+            await callback.answer("Недостаточно прав для проверки QR кода")
+            return
+        if view['status'] not in ('reg', 'been'):
+            await callback.answer("Пользователь не зарегистрирован на это мероприятие")
+            return
+        event = view['event']
+        card = _check_in_card(view['user'], event, view['reg_event'])
 
         if action == "allow":
-            # Update user_x_event status to 'been'
-            await update_user_x_event_row_status(user_id, event_name, 'been')
-
-            # Add money and update event count
-            await add_money(user_id, 1)
-            await one_more_event(user_id)
-            await update_strick(user_id)
+            # Exactly one of concurrent presses wins. For cached events the answer
+            # below is provisional: the check-in is written by the next flush, and
+            # if the database rejects it the scanner is notified by
+            # notify_check_in_rejected
+            checked_in = checkin_cache.mark_been(user_id, event_name, callback.from_user.id)
+            if checked_in is None:
+                checked_in = bool(await check_in([(user_id, event_name)]))
+                if checked_in:
+                    await complete_check_in(user_id, event_name, callback.from_user.id)
+
+            if not checked_in:
+                await callback.answer("⚠️ Этот QR код уже был использован")
+                await edit_message_text(callback.message, f"⚠️ Этот QR код уже был использован!\n\n{card}")
+                return
 
             # Notify admin
             await callback.answer("✅ Пользователь успешно пропущен")
 
             # Notify user
-            await bot.send_message(
+            await safe_send_message(
+                bot,
                 user_id,
                 f"Ваш QR код был успешно отсканирован на мероприятии {event.desc}!"
             )
 
-            # Handle referral bonus if applicable
-            user_x_event = await get_user_x_event_row(user_id, event_name)
-            if user_x_event != "not created" and user_x_event.first_contact != '0':
-                ref_giver = await get_user(int(user_x_event.first_contact))
-                if ref_giver != "not created":
-                    hosts_ids = await get_all_hosts_in_event_ids(event_name)
-                    if (not hosts_ids and ref_giver != 'not created') or (
-                            hosts_ids and ref_giver != 'not created' and ref_giver.id not in hosts_ids):
-                        await safe_send_message(bot, ref_giver.id,
-                                                f'Вы получили 2 монетки за то что приглашенный вами человек @{user.handler} посетил событие!')
-                        await add_money(ref_giver.id, 2)
-                        await add_referal_cnt(ref_giver.id)
-                        await safe_send_message(bot, user_id,
-                                                f'Вы получили монетку за то что вы зарегистрировались по реферальной ссылке @{ref_giver.handler}!')
-                        await add_money(user_id, 1)
-
             # Update the message with verification result
-            await callback.message.edit_text(
-                f"✅ Пользователь пропущен:\n"
-                f"Пользователь: @{user.handler}{user_info}\n"
-                f"Мероприятие: {event.desc}\n"
-                f"Дата: {event.date}\n"
-                f"Время: {event.time}\n"
-                f"Место: {event.place}"
-            )
+            await edit_message_text(callback.message, f"✅ Пользователь пропущен:\n{card}")
         else:
             # Just notify admin for deny
             await callback.answer("❌ Пользователь не пропущен")
             # Update the message with verification result
-            await callback.message.edit_text(
-                f"❌ Пользователь не пропущен:\n"
-                f"Пользователь: @{user.handler}{user_info}\n"
-                f"Мероприятие: {event.desc}\n"
-                f"Дата: {event.date}\n"
-                f"Время: {event.time}\n"
-                f"Место: {event.place}"
-            )
+            await edit_message_text(callback.message, f"❌ Пользователь не пропущен:\n{card}")
 
     except Exception as e:
-        print(f"Verification error: {e}")
+        logger.exception(f"Verification error: {e}")
+        count_handled_error(process_verification)
         await callback.answer("Произошла ошибка при обработке верификации")
 
 
-@router.callback_query(lambda c: c.data.startswith("qr_"))
-async def process_qr_event_selection(callback: CallbackQuery):
+async def notify_check_in_rejected(user_id: int, event_name: str, verified_by: int):
+    """Tell the scanner a provisionally accepted check-in was not saved."""
+    await safe_send_message(bot, verified_by,
+                            f"⚠️ Отметка о посещении пользователя {user_id} на мероприятии {event_name} "
+                            f"не сохранена: регистрация уже не активна. Отсканируйте QR код повторно")
+
+
+async def complete_check_in(user_id: int, event_name: str, verified_by: int):
+    """Record attendance and award coins once a check-in is confirmed by the database."""
+    await record_attendance(user_id, event_name, verified_by)
+
+    # Add money and update event count
+    await add_money(user_id, 1)
+    await one_more_event(user_id)
+    await update_strick(user_id)
+
+    # Handle referral bonus if applicable
+    user_x_event = await get_user_x_event_row(user_id, event_name)
+    if user_x_event != "not created" and user_x_event.first_contact != '0':
+        ref_giver = await get_user(int(user_x_event.first_contact))
+        if ref_giver != "not created":
+            hosts_ids = await event_cache.hosts(event_name)
+            if (not hosts_ids and ref_giver != 'not created') or (
+                    hosts_ids and ref_giver != 'not created' and ref_giver.id not in hosts_ids):
+                user = await get_user(user_id)
+                await safe_send_message(bot, ref_giver.id,
+                                        f'Вы получили 2 монетки за то что приглашенный вами человек @{user.handler} посетил событие!')
+                await add_money(ref_giver.id, 2)
+                await add_referal_cnt(ref_giver.id)
+                await safe_send_message(bot, user_id,
+                                        f'Вы получили монетку за то что вы зарегистрировались по реферальной ссылке @{ref_giver.handler}!')
+                await add_money(user_id, 1)
+
+
+checkin_cache.on_check_in(complete_check_in)
+checkin_cache.on_check_in_rejected(notify_check_in_rejected)
+
+
+@router.callback_query(QrEvent.filter())
+@router.callback_query(LegacyData(legacy_qr_event))
+async def process_qr_event_selection(callback: CallbackQuery, callback_data: QrEvent):
     """Handle event selection for QR code generation."""
     try:
-        event_name = callback.data
-        event = await get_event(event_name.replace('qr_', ''))
+        event_name = callback_data.event_name
+        event = await event_cache.get(event_name)
         
         if event == "not created":
             await callback.answer("Мероприятие не найдено")
             return
 
         # Verify that user is registered for this event
-        user_x_event = await get_user_x_event_row(callback.from_user.id, event_name.replace('qr_', ''))
-        if user_x_event == "not created":
+        if not await event_cache.is_registered(callback.from_user.id, event_name):
             await callback.answer("Вы не зарегистрированы на это мероприятие")
             return
 
-        # Generate QR code
-        bot_username = (await bot.get_me()).username
-        qr_data = f"https://t.me/{bot_username}?start=qr_{callback.from_user.id}_{event_name.replace('qr_', '')}"
-        qr_image = create_styled_qr_code(qr_data)
-
-        # Create QR code record
-        await create_qr_code(callback.from_user.id, event_name.replace('qr_', ''))
-
-        # Save QR code to a temporary file
-        temp_file = "temp_qr.png"
-        with open(temp_file, "wb") as f:
-            f.write(qr_image.getvalue())
-
-        try:
-            # Send QR code with detailed caption
-            await callback.message.answer_photo(
-                photo=FSInputFile(temp_file),
-                caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
-                        f"Это ваш пропуск на мероприятие:\n"
-                        f"Название: {event.desc}\n"
-                        f"Дата: {event.date}\n"
-                        f"Время: {event.time}\n"
-                        f"Место: {event.place}\n\n"
-                        f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
-            )
-            # Delete the keyboard message
-            await callback.message.delete()
-        finally:
-            # Clean up temporary file
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        # Use the pass pre-generated by /pregen_qr if there is one
+        photo_file = pregenerated_qr(callback.from_user.id, event_name)
+        if photo_file is not None:
+            photo = FSInputFile(photo_file)
+        else:
+            # Generate QR code
+            bot_username = (await bot.get_me()).username
+            qr_data = f"https://t.me/{bot_username}?start={make_qr_token(callback.from_user.id, event_name)}"
+            qr_image = create_styled_qr_code(qr_data)
+
+            # Create QR code record
+            await create_qr_code(callback.from_user.id, event_name)
+            photo = BufferedInputFile(qr_image.getvalue(), filename="qr.png")
+
+        # Send QR code with detailed caption
+        await send_queue.send(
+            bot.send_photo,
+            chat_id=callback.message.chat.id,
+            photo=photo,
+            caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
+                    f"Это ваш пропуск на мероприятие:\n"
+                    f"Название: {event.desc}\n"
+                    f"Дата: {event.date}\n"
+                    f"Время: {event.time}\n"
+                    f"Место: {event.place}\n\n"
+                    f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
+        )
+        # Delete the keyboard message
+        await delete_message(callback.message.chat.id, callback.message.message_id)
     except Exception as e:
-        print(f"QR code generation error: {e}")
+        logger.exception(f"QR code generation error: {e}")
+        count_handled_error(process_qr_event_selection)
         await callback.answer("Произошла ошибка при генерации QR кода")
 
 
-@router.callback_query()
-async def get_ref_v2_part2(callback: CallbackQuery):
+@router.callback_query(RefEvent.filter())
+@router.callback_query(LegacyData(legacy_ref_event))
+async def get_ref_v2_part2(callback: CallbackQuery, callback_data: RefEvent):
     """Handle event selection for referral link generation."""
-    # Skip if this is a QR code callback
-    if callback.data.startswith("qr_"):
-        print("Skipping QR callback in general handler")  # Debug print
-        return
-        
     try:
-        event = await get_event(callback.data)
-        if event == "not created":
+        event_name = callback_data.event_name
+        event = await event_cache.get(event_name)
+        if event == "not created" or not await event_cache.is_registered(callback.from_user.id, event_name):
             await callback.answer("Мероприятие не найдено")
             return
 
-        data = f'ref_{callback.data}__{callback.from_user.id}'
+        data = f'ref_{event_name}__{callback.from_user.id}'
         url = f"https://t.me/HSE_SPB_Business_Club_Bot?start={data}"
 
         await safe_send_message(bot, callback,
@@ -633,16 +646,11 @@ async def get_ref_v2_part2(callback: CallbackQuery):
                                 reply_markup=single_command_button_keyboard()
                                 )
     except Exception as e:
-        print(f"Referral link generation error: {e}")
+        logger.exception(f"Referral link generation error: {e}")
+        count_handled_error(get_ref_v2_part2)
         await callback.answer("Произошла ошибка при создании реферальной ссылки")
 
 
-async def is_user_event(callback: CallbackQuery) -> bool:
-    """Check if the callback data corresponds to one of user's events."""
-    events = await get_all_user_events(callback.from_user.id)
-    return callback.data in [ev.name for ev in events]
-
-
 @router.message(Command("my_qr"))
 async def cmd_my_qr(message: Message):
     """Handle /my_qr command to get QR code for event registration."""
@@ -663,75 +671,21 @@ async def handle_qr_request(message: Message):
         return
 
     # Get all user's events
-    events = await get_all_user_events(message.from_user.id)
+    events = await event_cache.user_events(message.from_user.id)
     if not events:
         await safe_send_message(bot, message, "У вас нет активных регистраций на мероприятия")
         return
 
     # Show keyboard with event selection
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=ev.desc, callback_data=f"qr_{ev.name}")]
+        [InlineKeyboardButton(text=ev.desc, callback_data=QrEvent(event_name=ev.name).pack())]
         for ev in events
     ])
     await safe_send_message(bot, message, "Выберите мероприятие, для которого хотите получить QR код:",
                           reply_markup=keyboard)
 
 
-@router.callback_query(lambda c: c.data.startswith("qr_"))
-async def process_qr_event_selection(callback: CallbackQuery):
-    """Handle event selection for QR code generation."""
-    try:
-        event_name = callback.data
-        event = await get_event(event_name.replace('qr_', ''))
-        
-        if event == "not created":
-            await callback.answer("Мероприятие не найдено")
-            return
-
-        # Verify that user is registered for this event
-        user_x_event = await get_user_x_event_row(callback.from_user.id, event_name)
-        if user_x_event == "not created":
-            await callback.answer("Вы не зарегистрированы на это мероприятие")
-            return
-
-        # Generate QR code
-        bot_username = (await bot.get_me()).username
-        qr_data = f"https://t.me/{bot_username}?start=qr_{callback.from_user.id}_{event_name}"
-        qr_image = create_styled_qr_code(qr_data)
-
-        # Create QR code record
-        await create_qr_code(callback.from_user.id, event_name)
-
-        # Save QR code to a temporary file
-        temp_file = "temp_qr.png"
-        with open(temp_file, "wb") as f:
-            f.write(qr_image.getvalue())
-
-        try:
-            # Send QR code with detailed caption
-            await callback.message.answer_photo(
-                photo=FSInputFile(temp_file),
-                caption=f"⚠️ ВАЖНО: Сохраните этот QR код!\n\n"
-                        f"Это ваш пропуск на мероприятие:\n"
-                        f"Название: {event.desc}\n"
-                        f"Дата: {event.date}\n"
-                        f"Время: {event.time}\n"
-                        f"Место: {event.place}\n\n"
-                        f"Покажите этот QR код при входе на мероприятие. Без него вас могут не пропустить!"
-            )
-            # Delete the keyboard message
-            await callback.message.delete()
-        finally:
-            # Clean up temporary file
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-    except Exception as e:
-        print(f"QR code generation error: {e}")
-        await callback.answer("Произошла ошибка при генерации QR кода")
-
-
-@router.callback_query(F.data == "yes")
+@router.callback_query(Data("yes"))
 async def process_reg_yes(callback: CallbackQuery, state: FSMContext):
     """Handle event registration confirmation."""
     data = await state.get_data()
@@ -739,38 +693,38 @@ async def process_reg_yes(callback: CallbackQuery, state: FSMContext):
 
     # Create registration
     await create_user_x_event_row(callback.from_user.id, event_name, callback.from_user.username)
-    event = await get_event(event_name)
+    event = await event_cache.get(event_name)
 
     # Generate and send QR code
     bot_username = (await bot.get_me()).username
-    qr_data = f"https://t.me/{bot_username}?start=qr_{callback.from_user.id}_{event_name}"
+    qr_data = f"https://t.me/{bot_username}?start={make_qr_token(callback.from_user.id, event_name)}"
     qr_image = create_styled_qr_code(qr_data)
     await create_qr_code(callback.from_user.id, event_name)
 
-    # Save QR code to a temporary file
-    temp_file = "temp_qr.png"
-    with open(temp_file, "wb") as f:
-        f.write(qr_image.getvalue())
-
-    try:
-        await callback.message.answer_photo(
-            photo=FSInputFile(temp_file),
-            caption=f"Вы успешно зарегистрировались на мероприятие!\n\n"
-                    f"Название: {event.desc}\n"
-                    f"Дата: {event.date}\n"
-                    f"Время: {event.time}\n"
-                    f"Место: {event.place}\n\n"
-                    f"Покажите этот QR код при входе на мероприятие."
-        )
-    finally:
-        # Clean up temporary file
-        import os
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+    await send_queue.send(
+        bot.send_photo,
+        chat_id=callback.message.chat.id,
+        photo=BufferedInputFile(qr_image.getvalue(), filename="qr.png"),
+        caption=f"Вы успешно зарегистрировались на мероприятие!\n\n"
+                f"Название: {event.desc}\n"
+                f"Дата: {event.date}\n"
+                f"Время: {event.time}\n"
+                f"Место: {event.place}\n\n"
+                f"Покажите этот QR код при входе на мероприятие."
+    )
 
     await state.clear()
 
 
+async def _event_name_by_key(key: bytes) -> str | None:
+    """Resolve short event key from a QR token, from memory for active events."""
+    event_name = checkin_cache.event_name_by_key(key)
+    if event_name is None:
+        names = event_cache.names()
+        event_name = next((name for name in names if event_key(name) == key), None)
+    return event_name
+
+
 @router.message(Command("check_qr"))
 async def cmd_check_qr(message: Message, command: CommandObject):
     """Handle QR code verification via command."""
@@ -779,35 +733,40 @@ async def cmd_check_qr(message: Message, command: CommandObject):
         return
 
     hash_value = command.args
-    if not hash_value.startswith('qr_'):
+    if not hash_value.startswith('qr_') and not hash_value.startswith(QR_TOKEN_PREFIX):
         await safe_send_message(bot, message, "Недействительный QR код")
         return
 
     try:
-        # Split only on first two underscores to preserve event name
-        parts = hash_value.split('_', 2)
-        if len(parts) != 3:
-            await safe_send_message(bot, message, "Недействительный QR код")
-            return
-
-        _, user_id, event_name = parts
-        user_id = int(user_id)
+        if hash_value.startswith(QR_TOKEN_PREFIX):
+            # Signed token: checked locally, the event is resolved by its short key
+            token = parse_qr_token(hash_value)
+            event_name = await _event_name_by_key(token[0]) if token else None
+            if event_name is None:
+                await safe_send_message(bot, message, "Недействительный QR код")
+                return
+            user_id = token[1]
+        else:
+            # Legacy format: split only on first two underscores to preserve event name
+            parts = hash_value.split('_', 2)
+            if len(parts) != 3:
+                await safe_send_message(bot, message, "Недействительный QR код")
+                return
 
-        # Get user and event info
-        user = await get_user(user_id)
-        event = await get_event(event_name)
+            _, user_id, event_name = parts
+            user_id = int(user_id)
 
-        if user == "not created" or event == "not created":
+        # Attendee, event, registration and scanner rights from memory or one query
+        view = checkin_cache.lookup(user_id, event_name, message.from_user.id)
+        if view is None:
+            view = await get_check_in_view(user_id, event_name, message.from_user.id)
+        if not view or view == "not found":
             await safe_send_message(bot, message, "Недействительный QR код")
             return
+        user, event, status = view['user'], view['event'], view['status']
 
         # Check if user is registered for the event
-        user_x_event = await get_user_x_event_row(user_id, event_name)
-        if user_x_event == "not created":
-            await safe_send_message(bot, message, "Пользователь не зарегистрирован на это мероприятие")
-            return
-
-        if user_x_event.status not in ['reg', 'been']:
+        if status not in ['reg', 'been']:
             await safe_send_message(bot, message, "Пользователь не зарегистрирован на это мероприятие")
             return
 
@@ -817,26 +776,12 @@ async def cmd_check_qr(message: Message, command: CommandObject):
             return
 
         # Check if scanner is superuser or face control
-        scanner = await get_user(message.from_user.id)
-        face_control = await get_face_control(message.from_user.id)
-        
-        if scanner.is_superuser or face_control != "not found":
-            # Get user registration details
-            reg_event = await get_reg_event(user_id)
-            user_info = ""
-            if reg_event:
-                user_info = f"\nФИО: {reg_event.surname} {reg_event.name} {reg_event.fathername}\nТелефон: {reg_event.phone}"
+        if view['scanner_is_superuser'] or view['scanner_is_face_control']:
+            card = _check_in_card(user, event, view['reg_event'])
 
             # Check if QR code was already used
-            if user_x_event.status == 'been':
-                await safe_send_message(bot, message,
-                                        f"⚠️ Этот QR код уже был использован!\n\n"
-                                        f"Пользователь: @{user.handler}{user_info}\n"
-                                        f"Мероприятие: {event.desc}\n"
-                                        f"Дата: {event.date}\n"
-                                        f"Время: {event.time}\n"
-                                        f"Место: {event.place}"
-                                        )
+            if status == 'been':
+                await safe_send_message(bot, message, f"⚠️ Этот QR код уже был использован!\n\n{card}")
                 return
 
             # Show verification buttons
@@ -844,24 +789,16 @@ async def cmd_check_qr(message: Message, command: CommandObject):
                 [
                     InlineKeyboardButton(
                         text="✅ Пропустить",
-                        callback_data=f"verify_{user_id}_{event_name}_allow"
+                        callback_data=VerifyQr(user_id=user_id, event_name=event_name, action="allow").pack()
                     ),
                     InlineKeyboardButton(
                         text="❌ Не пропускать",
-                        callback_data=f"verify_{user_id}_{event_name}_deny"
+                        callback_data=VerifyQr(user_id=user_id, event_name=event_name, action="deny").pack()
                     )
                 ]
             ])
 
-            await message.answer(
-                f"Проверка QR кода:\n"
-                f"Пользователь: @{user.handler}{user_info}\n"
-                f"Мероприятие: {event.desc}\n"
-                f"Дата: {event.date}\n"
-                f"Время: {event.time}\n"
-                f"Место: {event.place}",
-                reply_markup=keyboard
-            )
+            await safe_send_message(bot, message, f"Проверка QR кода:\n{card}", reply_markup=keyboard)
         else:
             # Check if the QR code belongs to the user who scanned it
             if user_id != message.from_user.id:
@@ -877,5 +814,6 @@ async def cmd_check_qr(message: Message, command: CommandObject):
                                     f"Место: {event.place}")
 
     except Exception as e:
-        print(f"QR verification error: {e}")
+        logger.exception(f"QR verification error: {e}")
+        count_handled_error(cmd_check_qr)
         await safe_send_message(bot, message, "Произошла ошибка при проверке QR кода")
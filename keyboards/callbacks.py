@@ -0,0 +1,70 @@
+"""
+Callback Data
+Callback data factories for inline buttons carrying parameters.
+"""
+# --------------------------------------------------------------------------------
+import re
+
+from aiogram.filters.callback_data import CallbackData
+
+
+# --------------------------------------------------------------------------------
+class RefEvent(CallbackData, prefix="ref"):
+    """Referral link request for an event."""
+    event_name: str
+
+
+class QrEvent(CallbackData, prefix="qr"):
+    """QR pass request for an event."""
+    event_name: str
+
+
+class VerifyQr(CallbackData, prefix="verify"):
+    """Face control decision on a scanned QR pass; action is allow or deny."""
+    user_id: int
+    event_name: str
+    action: str
+
+
+# --------------------------------------------------------------------------------
+class SchedCancel(CallbackData, prefix="sched_cancel"):
+    """Cancellation of a scheduled mailing."""
+    post_id: int
+
+
+class FaceControlRemove(CallbackData, prefix="fc_remove"):
+    """Face control user picked for removal."""
+    user_id: int
+
+
+class FaceControlConfirmRemove(CallbackData, prefix="fc_confirm_remove"):
+    """Confirmed removal of a face control user."""
+    user_id: int
+
+
+# --------------------------------------------------------------------------------
+# Parsers of the button data used before these factories, for LegacyData.
+# Such buttons stay in users' chats; drop the parsers after the next release.
+def legacy_ref_event(data: str) -> RefEvent | None:
+    """Parse a bare event name, e.g. "event01_01_30", of a referral button."""
+    if re.fullmatch(r"event\d{2}_\d{2}_\d{2}", data):
+        return RefEvent(event_name=data)
+    return None
+
+
+def legacy_qr_event(data: str) -> QrEvent | None:
+    """Parse "qr_<event_name>" of a QR pass button."""
+    prefix, _, event_name = data.partition("_")
+    if prefix != "qr" or not event_name:
+        return None
+    return QrEvent(event_name=event_name)
+
+
+def legacy_verify_qr(data: str) -> VerifyQr | None:
+    """Parse "verify_<user_id>_<event_name>_<action>" of a face control button."""
+    prefix, _, rest = data.partition("_")
+    user_id, _, rest = rest.partition("_")
+    event_name, _, action = rest.rpartition("_")
+    if prefix != "verify" or not user_id.isdigit() or not event_name or action not in ("allow", "deny"):
+        return None
+    return VerifyQr(user_id=int(user_id), event_name=event_name, action=action)
@@ -11,6 +11,8 @@ from aiogram.types import (
     InlineKeyboardMarkup,
 )
 
+from keyboards.callbacks import RefEvent, SchedCancel
+
 
 # --------------------------------------------------------------------------------
 def make_k_from_list(items: list[str]) -> list[list[KeyboardButton]]:
@@ -94,6 +96,61 @@ def post_target() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=ikb)
 
 
+# --------------------------------------------------------------------------------
+def sched_target() -> InlineKeyboardMarkup:
+    """
+    Create inline keyboard for scheduled post targeting options.
+
+    Returns:
+        InlineKeyboardMarkup: Inline keyboard markup.
+    """
+    ikb = [
+        [InlineKeyboardButton(text="Всем пользователям", callback_data="sched_all")],
+        [InlineKeyboardButton(
+            text="Всем пользователям, незареганным на ивент",
+            callback_data="sched_unreg",
+        )],
+        [InlineKeyboardButton(text="Всем участникам ивента", callback_data="sched_ev")],
+        [InlineKeyboardButton(text="Отмена", callback_data="cancel")],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=ikb)
+
+
+# --------------------------------------------------------------------------------
+def scheduled_posts_ikb(post_ids: list[int]) -> InlineKeyboardMarkup:
+    """
+    Create inline keyboard with cancel buttons for scheduled posts.
+
+    Args:
+        post_ids (list[int]): Scheduled post identifiers.
+
+    Returns:
+        InlineKeyboardMarkup: Inline keyboard markup.
+    """
+    ikb = [
+        [InlineKeyboardButton(text=f"Отменить #{post_id}", callback_data=SchedCancel(post_id=post_id).pack())]
+        for post_id in post_ids
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=ikb)
+
+
+# --------------------------------------------------------------------------------
+def pregen_push_ikb() -> InlineKeyboardMarkup:
+    """
+    Create inline keyboard asking whether to send pre-generated QR codes.
+
+    Returns:
+        InlineKeyboardMarkup: Inline keyboard markup.
+    """
+    ikb = [
+        [
+            InlineKeyboardButton(text='ДА', callback_data='pregen_push_yes'),
+            InlineKeyboardButton(text='НЕТ', callback_data='pregen_push_no'),
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=ikb)
+
+
 # --------------------------------------------------------------------------------
 def post_ev_target(events: list[str]) -> ReplyKeyboardMarkup:
     """
@@ -115,7 +172,7 @@ def post_ev_target(events: list[str]) -> ReplyKeyboardMarkup:
 # --------------------------------------------------------------------------------
 def events_ikb(events: list) -> InlineKeyboardMarkup:
     """
-    Create inline keyboard from event objects.
+    Create inline keyboard requesting a referral link for one of events.
 
     Args:
         events (list): List of event objects with desc and name.
@@ -124,7 +181,7 @@ def events_ikb(events: list) -> InlineKeyboardMarkup:
         InlineKeyboardMarkup: Inline keyboard markup.
     """
     ikb = [
-        [InlineKeyboardButton(text=ev.desc, callback_data=ev.name)]
+        [InlineKeyboardButton(text=ev.desc, callback_data=RefEvent(event_name=ev.name).pack())]
         for ev in events
     ]
     return InlineKeyboardMarkup(inline_keyboard=ikb)
@@ -312,7 +369,7 @@ def get_ref_ikb(event_name: str) -> InlineKeyboardMarkup:
     Returns:
         InlineKeyboardMarkup: Inline keyboard markup.
     """
-    ikb = [[InlineKeyboardButton(text="Получить реферальную ссылку на это мероприятие", callback_data=event_name)]]
+    ikb = [[InlineKeyboardButton(text="Получить реферальную ссылку на это мероприятие", callback_data=RefEvent(event_name=event_name).pack())]]
     return InlineKeyboardMarkup(inline_keyboard=ikb)
 
 
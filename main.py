@@ -8,16 +8,31 @@ import asyncio
 from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from bot_instance import bot
+from bot_instance import bot, logger
 from confige import BotConfig
+from database.checkin_cache import checkin_cache
+from database.event_cache import event_cache
 from database.models import async_main
+from database.role_cache import role_cache
+from middlewares.log_context import LogContextMiddleware
+from middlewares.roles import RoleMiddleware
+from middlewares.timing import TimingMiddleware
+from middlewares.tracing import HandlerTracingMiddleware, RequestTracingMiddleware, UpdateTracingMiddleware
+from monitoring.server import start_metrics_server
+from monitoring.tracing import run_exporter
+from handlers.qr_batch import close_qr_pool, purge_qr_cache
+from handlers.routing import fallback_router
+from handlers.quest import run_draft_checkpoints
+from handlers.scheduler import run_scheduler
+from handlers.send_queue import send_queue
 from handlers import admin, error, quest, user
 
 
 # --------------------------------------------------------------------------------
 def register_routers(dp: Dispatcher) -> None:
     """
-    Include all routers into dispatcher.
+    Include all routers into dispatcher together with the role middleware
+    their filters and handlers rely on.
 
     Args:
         dp (Dispatcher): Dispatcher instance to register routers on.
@@ -25,24 +40,31 @@ def register_routers(dp: Dispatcher) -> None:
     Returns:
         None
     """
+    dp.message.outer_middleware(RoleMiddleware())
+    dp.callback_query.outer_middleware(RoleMiddleware())
     dp.include_routers(
         admin.router,
         quest.router,
         error.router,
         user.router,
+        fallback_router,
     )
 
 
 # --------------------------------------------------------------------------------
 async def main() -> None:
     """
-    Run application: initialize DB, configure bot, and start polling.
+    Run application: initialize DB, configure bot, start scheduler and polling.
 
     Returns:
         None
     """
-    # Initialize database models and connections
+    # Initialize database models and connections, load user roles, warm
+    # the event cache and drop passes of events that are no longer active
     await async_main()
+    await role_cache.load()
+    if await event_cache.load():
+        await purge_qr_cache(event_cache.active_names())
 
     # Create bot configuration and dispatcher
     config = BotConfig(
@@ -55,11 +77,45 @@ async def main() -> None:
     # Register all routers
     register_routers(dp)
 
+    # Time every handler and expose metrics locally
+    dp.message.middleware(TimingMiddleware())
+    dp.callback_query.middleware(TimingMiddleware())
+    metrics_server = await start_metrics_server()
+
+    # Trace updates, handlers and Bot API requests; tag log records with the update
+    dp.update.outer_middleware(LogContextMiddleware())
+    dp.update.outer_middleware(UpdateTracingMiddleware())
+    dp.message.middleware(HandlerTracingMiddleware())
+    dp.callback_query.middleware(HandlerTracingMiddleware())
+    bot.session.middleware(RequestTracingMiddleware())
+    exporter = asyncio.create_task(run_exporter())
+
+    # Start scheduled mailings, the QR check-in cache, role and event refresh
+    # and questionnaire checkpoints in the background
+    scheduler = asyncio.create_task(run_scheduler())
+    checkin = asyncio.create_task(checkin_cache.run())
+    roles = asyncio.create_task(role_cache.run())
+    events = asyncio.create_task(event_cache.run())
+    drafts = asyncio.create_task(run_draft_checkpoints())
+
     # Start the bot polling loop
     try:
         await dp.start_polling(bot, skip_updates=True)
     except Exception as ex:
-        print(f"Exception: {ex}")
+        logger.exception(f"Exception: {ex}")
+    finally:
+        scheduler.cancel()
+        checkin.cancel()
+        roles.cancel()
+        events.cancel()
+        drafts.cancel()
+        await asyncio.gather(scheduler, checkin, roles, events, drafts, return_exceptions=True)
+        await send_queue.close()
+        await close_qr_pool()
+        exporter.cancel()
+        await asyncio.gather(exporter, return_exceptions=True)
+        if metrics_server is not None:
+            await metrics_server.cleanup()
 
 
 # --------------------------------------------------------------------------------
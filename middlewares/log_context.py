@@ -0,0 +1,28 @@
+"""
+Log Context Middleware
+Attach update and user identifiers to log records of an update.
+"""
+# --------------------------------------------------------------------------------
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from monitoring.logs import log_context
+
+
+# --------------------------------------------------------------------------------
+class LogContextMiddleware(BaseMiddleware):
+    """
+    Outer update middleware binding update_id and user_id for logging.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        with log_context(update_id=event.update_id, user_id=user.id if user else None):
+            return await handler(event, data)
@@ -0,0 +1,42 @@
+"""
+Roles Middleware
+Resolve user rights from the role cache and gate admin handlers.
+"""
+# --------------------------------------------------------------------------------
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.filters import BaseFilter
+from aiogram.types import TelegramObject
+
+from database.role_cache import Roles, role_cache
+
+
+# --------------------------------------------------------------------------------
+class RoleMiddleware(BaseMiddleware):
+    """
+    Outer middleware passing the sender's Roles to filters and handlers
+    as the ``roles`` argument.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        data["roles"] = role_cache.roles(user.id) if user else Roles(False, False)
+        return await handler(event, data)
+
+
+# --------------------------------------------------------------------------------
+class IsSuperuser(BaseFilter):
+    """
+    Pass only updates from superusers, without database queries.
+    """
+
+    async def __call__(self, event: TelegramObject, roles: Roles | None = None) -> bool:
+        if roles is None:
+            return role_cache.is_superuser(event.from_user.id)
+        return roles.superuser
@@ -0,0 +1,42 @@
+"""
+Timing Middleware
+Per-handler latency and error metrics for incoming updates.
+"""
+# --------------------------------------------------------------------------------
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from monitoring.metrics import HANDLER_ERRORS, HANDLER_LATENCY
+
+
+# --------------------------------------------------------------------------------
+class TimingMiddleware(BaseMiddleware):
+    """
+    Inner middleware timing the matched handler.
+
+    Registered on dispatcher observers, it wraps handlers of all included
+    routers; the router label is the handler's module, e.g. handlers.user.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        callback = data["handler"].callback
+        labels = {
+            "router": getattr(callback, "__module__", ""),
+            "handler": getattr(callback, "__name__", type(callback).__name__),
+        }
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(**labels)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, **labels)
@@ -0,0 +1,73 @@
+"""
+Tracing Middleware
+Root span per update, handler spans and Bot API request spans.
+"""
+# --------------------------------------------------------------------------------
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from monitoring.tracing import span
+
+
+# --------------------------------------------------------------------------------
+class UpdateTracingMiddleware(BaseMiddleware):
+    """
+    Outer update middleware opening the root span of every update.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        with span(
+                "update",
+                update_id=event.update_id,
+                update_type=event.event_type,
+                user_id=user.id if user else None,
+        ):
+            return await handler(event, data)
+
+
+# --------------------------------------------------------------------------------
+class HandlerTracingMiddleware(BaseMiddleware):
+    """
+    Inner middleware opening a span around the matched handler.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        callback = data["handler"].callback
+        name = getattr(callback, "__name__", type(callback).__name__)
+        with span(f"handler.{name}", router=getattr(callback, "__module__", "")):
+            return await handler(event, data)
+
+
+# --------------------------------------------------------------------------------
+class RequestTracingMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware opening a span around each Bot API request.
+
+    Long polling requests are skipped, they would only measure idle time.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod,
+    ) -> Any:
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+        with span(f"tg.{method.__api_method__}", chat_id=getattr(method, "chat_id", None)):
+            return await make_request(bot, method)
@@ -0,0 +1,173 @@
+"""
+Logging
+Queue-based logging with JSON records, per-logger levels and debug sampling.
+"""
+# --------------------------------------------------------------------------------
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+# Loggers whose INFO records are as chatty as debug output
+SAMPLED_LOGGERS = ("sqlalchemy.engine",)
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+
+# --------------------------------------------------------------------------------
+@contextmanager
+def log_context(**fields):
+    """
+    Attach fields, e.g. update_id and user_id, to records of the with-block.
+
+    Args:
+        **fields: Field values.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+# --------------------------------------------------------------------------------
+class ContextFilter(logging.Filter):
+    """
+    Copy the current log context onto the record in the calling thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+# --------------------------------------------------------------------------------
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a share of debug records and of records from SAMPLED_LOGGERS.
+
+    Args:
+        rate (float): Share of records kept, from 0 to 1.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        if record.levelno > logging.DEBUG and not record.name.startswith(SAMPLED_LOGGERS):
+            return True
+        return random.random() < self.rate
+
+
+# --------------------------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """
+    Render a record as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+# --------------------------------------------------------------------------------
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message and traceback formatting to the
+    listener thread instead of formatting in the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# --------------------------------------------------------------------------------
+def parse_levels(spec: str) -> dict[str, str]:
+    """
+    Parse per-logger levels.
+
+    Args:
+        spec (str): Comma separated pairs, e.g. "aiogram.event=WARNING,handlers=DEBUG".
+
+    Returns:
+        dict[str, str]: Level name by logger name.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+# --------------------------------------------------------------------------------
+def setup_logging(
+        level: str = "INFO",
+        fmt: str = "json",
+        levels: dict[str, str] | None = None,
+        sample_rate: float = 1.0,
+) -> QueueListener:
+    """
+    Route all records through a queue to a stderr handler on a listener thread.
+
+    Args:
+        level (str): Root level.
+        fmt (str): "json" or "text".
+        levels (dict[str, str] | None): Levels of individual loggers.
+        sample_rate (float): Share of debug and SAMPLED_LOGGERS records kept.
+
+    Returns:
+        QueueListener: Started listener, stopped at interpreter exit.
+    """
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(SamplingFilter(sample_rate))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener = QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+# --------------------------------------------------------------------------------
+def _stop_listener(listener: QueueListener) -> None:
+    """
+    Flush queued records and stop the listener unless already stopped.
+
+    Args:
+        listener (QueueListener): Listener to stop.
+
+    Returns:
+        None
+    """
+    if listener._thread is not None:
+        listener.stop()
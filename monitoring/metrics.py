@@ -0,0 +1,272 @@
+"""
+Metrics
+In-process counters and histograms rendered in Prometheus text format.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+
+from monitoring.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: list["_Metric"] = []
+
+
+# --------------------------------------------------------------------------------
+def _escape(value) -> str:
+    """
+    Escape label value for the exposition format.
+
+    Args:
+        value: Label value.
+
+    Returns:
+        str: Escaped value.
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# --------------------------------------------------------------------------------
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    """
+    Format label set as {name="value",...}.
+
+    Args:
+        names (tuple[str, ...]): Label names.
+        values (tuple): Label values in the same order.
+        extra (str): Extra preformatted label, e.g. le="0.1".
+
+    Returns:
+        str: Label block or empty string.
+    """
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# --------------------------------------------------------------------------------
+class _Metric(ABC):
+    """
+    Base metric registered in REGISTRY.
+
+    Args:
+        name (str): Metric name.
+        doc (str): Help text.
+        labelnames (tuple[str, ...]): Label names.
+    """
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        """
+        Render metric family.
+
+        Returns:
+            list[str]: Exposition lines.
+        """
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """
+        Render metric samples without the HELP and TYPE header.
+
+        Returns:
+            list[str]: Sample lines.
+        """
+
+
+# --------------------------------------------------------------------------------
+class Counter(_Metric):
+    """
+    Monotonic counter; the name should end with _total.
+    """
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """
+        Increase counter.
+
+        Args:
+            amount (float): Increment.
+            **labels: Label values.
+
+        Returns:
+            None
+        """
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+# --------------------------------------------------------------------------------
+class Histogram(_Metric):
+    """
+    Latency histogram with cumulative buckets.
+
+    Args:
+        name (str): Metric name.
+        doc (str): Help text.
+        labelnames (tuple[str, ...]): Label names.
+        buckets (tuple[float, ...]): Upper bounds in seconds.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value in seconds.
+            **labels: Label values.
+
+        Returns:
+            None
+        """
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe duration of the with-block.
+
+        Args:
+            **labels: Label values.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# --------------------------------------------------------------------------------
+def render_metrics() -> str:
+    """
+    Render all registered metrics.
+
+    Returns:
+        str: Prometheus text exposition.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------------------------------------
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds", "Update handler latency.", ("router", "handler"),
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Exceptions raised by update handlers.", ("router", "handler"),
+)
+DB_LATENCY = Histogram(
+    "bot_db_call_duration_seconds", "Database call latency.", ("function",),
+)
+DB_ERRORS = Counter(
+    "bot_db_errors_total", "Database call failures, excluding expected not found and conflict results.",
+    ("function", "error"),
+)
+TASK_LATENCY = Histogram(
+    "bot_task_duration_seconds", "CPU-heavy task latency (QR render, Excel export).", ("task",),
+)
+
+
+# --------------------------------------------------------------------------------
+def count_handled_error(handler) -> None:
+    """
+    Count an exception a handler caught itself, with the labels
+    TimingMiddleware uses for exceptions that escape handlers.
+
+    Args:
+        handler (Callable): Handler function.
+
+    Returns:
+        None
+    """
+    HANDLER_ERRORS.inc(router=handler.__module__, handler=handler.__name__)
+
+
+# --------------------------------------------------------------------------------
+def tracked(task: str | None = None):
+    """
+    Decorator recording function duration in TASK_LATENCY and tracing
+    it as a task.* span.
+
+    Args:
+        task (str | None): Task label, defaults to the function name.
+
+    Returns:
+        Callable: Decorator for sync and async functions.
+    """
+
+    def decorator(func):
+        label = task or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(f"task.{label}"), TASK_LATENCY.time(task=label):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(f"task.{label}"), TASK_LATENCY.time(task=label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,51 @@
+"""
+Metrics Server
+Local HTTP endpoint exposing metrics for Prometheus scraping.
+"""
+# --------------------------------------------------------------------------------
+from aiohttp import web
+
+from bot_instance import METRICS_HOST, METRICS_PORT, logger
+from monitoring.metrics import render_metrics
+
+
+# --------------------------------------------------------------------------------
+async def _handle_metrics(request: web.Request) -> web.Response:
+    """
+    Serve metrics in text exposition format.
+
+    Args:
+        request (web.Request): Incoming request.
+
+    Returns:
+        web.Response: Metrics response.
+    """
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+# --------------------------------------------------------------------------------
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> web.AppRunner | None:
+    """
+    Start /metrics endpoint.
+
+    Args:
+        host (str): Bind address.
+        port (int): Bind port; 0 disables the server.
+
+    Returns:
+        web.AppRunner | None: Runner to clean up on shutdown or None.
+    """
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"Не удалось запустить сервер метрик на {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,253 @@
+"""
+Tracing
+Lightweight spans propagated through a contextvar and exported in batches.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiohttp import ClientSession, ClientTimeout
+
+from bot_instance import TRACE_FILE, TRACE_OTLP_ENDPOINT, logger
+
+SERVICE_NAME = "bussines_bot"
+EXPORT_INTERVAL = 2.0
+MAX_BUFFERED = 10000
+
+ENABLED = bool(TRACE_FILE or TRACE_OTLP_ENDPOINT)
+
+_current: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_finished: deque["Span"] = deque(maxlen=MAX_BUFFERED)
+
+
+# --------------------------------------------------------------------------------
+class Span:
+    """
+    Timed operation inside a trace.
+
+    Args:
+        name (str): Operation name.
+        parent (Span | None): Parent span; a new trace is started without it.
+        attributes (dict): Initial attributes.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent: "Span | None" = None, attributes: dict | None = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set(self, **attributes) -> None:
+        """
+        Add attributes to the span.
+
+        Args:
+            **attributes: Attribute values.
+
+        Returns:
+            None
+        """
+        self.attributes.update(attributes)
+
+    def to_json(self) -> dict:
+        """
+        Convert span to a flat JSONL record.
+
+        Returns:
+            dict: Span record.
+        """
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict:
+        """
+        Convert span to OTLP/JSON representation.
+
+        Returns:
+            dict: OTLP span.
+        """
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+# --------------------------------------------------------------------------------
+def current_span() -> Span | None:
+    """
+    Get the active span of the current context.
+
+    Returns:
+        Span | None: Active span or None.
+    """
+    return _current.get()
+
+
+# --------------------------------------------------------------------------------
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Open a child of the active span for the with-block.
+
+    Does nothing when no exporter is configured.
+
+    Args:
+        name (str): Operation name.
+        **attributes: Initial attributes.
+
+    Yields:
+        Span | None: Opened span or None when tracing is disabled.
+    """
+    if not ENABLED:
+        yield None
+        return
+    item = Span(name, _current.get(), attributes)
+    token = _current.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        item.end = time.time_ns()
+        _finished.append(item)
+
+
+# --------------------------------------------------------------------------------
+@contextmanager
+def attach(parent: Span | None):
+    """
+    Make a span captured elsewhere active, e.g. in a queue worker task.
+
+    Args:
+        parent (Span | None): Span to activate.
+    """
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+# --------------------------------------------------------------------------------
+def _write_jsonl(spans: list[Span]) -> None:
+    """
+    Append spans to the JSONL file.
+
+    Args:
+        spans (list[Span]): Finished spans.
+
+    Returns:
+        None
+    """
+    with open(TRACE_FILE, "a", encoding="utf-8") as f:
+        for item in spans:
+            f.write(json.dumps(item.to_json(), ensure_ascii=False, default=str) + "\n")
+
+
+# --------------------------------------------------------------------------------
+async def _post_otlp(session: ClientSession, spans: list[Span]) -> None:
+    """
+    Send spans to an OTLP/HTTP JSON collector.
+
+    Args:
+        session (ClientSession): HTTP session.
+        spans (list[Span]): Finished spans.
+
+    Returns:
+        None
+    """
+    body = {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "monitoring.tracing"},
+                "spans": [item.to_otlp() for item in spans],
+            }],
+        }],
+    }
+    async with session.post(TRACE_OTLP_ENDPOINT, json=body) as response:
+        if response.status >= 400:
+            logger.warning(f"Коллектор трассировки ответил {response.status}")
+
+
+# --------------------------------------------------------------------------------
+async def _export(session: ClientSession | None) -> None:
+    """
+    Export all buffered spans.
+
+    Args:
+        session (ClientSession | None): HTTP session for OTLP export.
+
+    Returns:
+        None
+    """
+    spans = []
+    while _finished:
+        spans.append(_finished.popleft())
+    if not spans:
+        return
+    try:
+        if TRACE_FILE:
+            await asyncio.to_thread(_write_jsonl, spans)
+        if session is not None:
+            await _post_otlp(session, spans)
+    except Exception as e:
+        logger.warning(f"Не удалось выгрузить {len(spans)} спанов: {e}")
+
+
+# --------------------------------------------------------------------------------
+async def run_exporter(interval: float = EXPORT_INTERVAL) -> None:
+    """
+    Periodically export finished spans until cancelled.
+
+    Args:
+        interval (float): Seconds between exports.
+
+    Returns:
+        None
+    """
+    if not ENABLED:
+        return
+    session = ClientSession(timeout=ClientTimeout(total=5)) if TRACE_OTLP_ENDPOINT else None
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await _export(session)
+    finally:
+        await _export(session)
+        if session is not None:
+            await session.close()
@@ -13,20 +13,22 @@ from sqlalchemy.sql import select
 from bot_instance import bot
 from database.models import async_session, UserXEvent, Event
 from database.req import (
-    get_all_users,
+    iter_all_users,
     get_all_users_in_event,
-    get_all_quests,
+    iter_all_quests,
     get_all_from_give_away,
     get_reg_users_stat,
     get_reg_users,
 )
-from errors.errors import Error404
 from errors.handlers import stat_error_handler
 from handlers.error import safe_send_message
+from handlers.send_queue import send_queue
+from monitoring.metrics import tracked
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_all(user_id: int) -> None:
     """
     Retrieve all users and send statistics as Excel.
@@ -37,56 +39,44 @@ async def get_stat_all(user_id: int) -> None:
     Returns:
         None
     """
-    users = await get_all_users()
-    if not users:
+    data = []
+    async for users in iter_all_users():
+        # Visited events of the whole page in one query
+        visited = {user.id: [] for user in users}
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    UserXEvent.user_id,
+                    Event.desc,
+                    Event.date,
+                    Event.time,
+                ).join(
+                    UserXEvent,
+                    Event.name == UserXEvent.event_name
+                ).where(
+                    UserXEvent.user_id.in_(visited),
+                    UserXEvent.status == 'been'
+                ).order_by(Event.date.desc())
+            )
+            for visitor_id, desc, date, event_time in result.all():
+                visited[visitor_id].append(f"{desc} ({date} {event_time})")
+
+        for user in users:
+            data.append({
+                "ID": user.id,
+                "Handler": user.handler,
+                "Is Superuser": user.is_superuser,
+                "Event Count": user.event_cnt,
+                "Strick": user.strick,
+                "Money": user.money,
+                "Referral Count": user.ref_cnt,
+                "Visited Events": "\n".join(visited[user.id]) or "Нет посещенных мероприятий"
+            })
+    if not data:
         await safe_send_message(
             bot, user_id, 'У вас нет подходящих пользователей((')
         return
 
-    # Get all events for each user
-    data = []
-    for user in users:
-        try:
-            # Get all events where user has status 'been'
-            async with async_session() as session:
-                result = await session.execute(
-                    select(
-                        Event,
-                        UserXEvent.status,
-                        UserXEvent.first_contact
-                    ).join(
-                        UserXEvent,
-                        Event.name == UserXEvent.event_name
-                    ).where(
-                        UserXEvent.user_id == user.id,
-                        UserXEvent.status == 'been'
-                    ).order_by(Event.date.desc())
-                )
-                visited_events = result.all()
-
-                # Format visited events info
-                visited_events_info = []
-                for event, status, first_contact in visited_events:
-                    visited_events_info.append(
-                        f"{event.desc} ({event.date} {event.time})"
-                    )
-
-                visited_events_str = "\n".join(
-                    visited_events_info) if visited_events_info else "Нет посещенных мероприятий"
-        except Error404:
-            visited_events_str = "Нет посещенных мероприятий"
-
-        data.append({
-            "ID": user.id,
-            "Handler": user.handler,
-            "Is Superuser": user.is_superuser,
-            "Event Count": user.event_cnt,
-            "Strick": user.strick,
-            "Money": user.money,
-            "Referral Count": user.ref_cnt,
-            "Visited Events": visited_events_str
-        })
-
     df = pd.DataFrame(data)
 
     # Adjust column widths for better readability
@@ -107,11 +97,12 @@ async def get_stat_all(user_id: int) -> None:
         temp_file = BufferedInputFile(
             buffer.read(), filename="user_statistics.xlsx"
         )
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_all_in_ev(user_id: int, event_name: str) -> None:
     """
     Retrieve users in event and send Excel plus summary.
@@ -157,11 +148,12 @@ async def get_stat_all_in_ev(user_id: int, event_name: str) -> None:
             buffer.read(), filename="user_statistics.xlsx"
         )
         await safe_send_message(bot, user_id, msg)
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_quest(user_id: int) -> None:
     """
     Retrieve questionnaire submissions and send as Excel.
@@ -172,11 +164,6 @@ async def get_stat_quest(user_id: int) -> None:
     Returns:
         None
     """
-    users = await get_all_quests()
-    if not users:
-        await safe_send_message(
-            bot, user_id, 'У вас нет подходящих пользователей((')
-        return
     data = [
         {
             "ID": u.user_id,
@@ -196,8 +183,13 @@ async def get_stat_quest(user_id: int) -> None:
             "found_info": u.found_info,
             "resume": u.resume,
         }
-        for u in users
+        async for quests in iter_all_quests()
+        for u in quests
     ]
+    if not data:
+        await safe_send_message(
+            bot, user_id, 'У вас нет подходящих пользователей((')
+        return
     df = pd.DataFrame(data)
     with BytesIO() as buffer:
         with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
@@ -206,11 +198,12 @@ async def get_stat_quest(user_id: int) -> None:
         temp_file = BufferedInputFile(
             buffer.read(), filename="user_statistics.xlsx"
         )
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_ad_give_away(
         user_id: int,
         host_id: int,
@@ -248,11 +241,12 @@ async def get_stat_ad_give_away(
         temp_file = BufferedInputFile(
             buffer.read(), filename="user_statistics.xlsx"
         )
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_reg_out(user_id: int, event_name: str) -> None:
     """
     Retrieve external registrations and send as Excel.
@@ -290,11 +284,12 @@ async def get_stat_reg_out(user_id: int, event_name: str) -> None:
         temp_file = BufferedInputFile(
             buffer.read(), filename="user_statistics.xlsx"
         )
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
 
 
 # --------------------------------------------------------------------------------
 @stat_error_handler
+@tracked()
 async def get_stat_reg(user_id: int, event_name: str) -> None:
     """
     Retrieve registration statistics and send Excel plus summary.
@@ -340,4 +335,4 @@ async def get_stat_reg(user_id: int, event_name: str) -> None:
             buffer.read(), filename="user_statistics.xlsx"
         )
         await safe_send_message(bot, user_id, msg)
-        await bot.send_document(user_id, temp_file)
+        await send_queue.send(bot.send_document, chat_id=user_id, document=temp_file)
@@ -0,0 +1,100 @@
+"""
+Test Fixtures
+Throwaway SQLite database, one event loop per session and seeding helpers.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+# Configure the bot before anything imports bot_instance: the engine is
+# created at import time from DB_URL
+_db_dir = tempfile.mkdtemp(prefix="bot-tests-")
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("TOKEN_API_TG", "123456:test-token")
+os.environ.setdefault("QR_SECRET", "test-secret")
+os.environ.setdefault("LOG_FORMAT", "text")
+os.environ.setdefault("METRICS_PORT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from database.models import Base, Event, User, UserXEvent, async_session, engine
+
+EVENT = "event01_01_30"
+
+
+# --------------------------------------------------------------------------------
+@pytest.fixture(scope="session")
+def loop():
+    """
+    Event loop shared by all tests, so pooled connections stay usable.
+
+    Yields:
+        asyncio.AbstractEventLoop: Session event loop.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def run(loop):
+    """
+    Run a coroutine to completion on the session loop.
+
+    Returns:
+        Callable: loop.run_until_complete.
+    """
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def db(run):
+    """
+    Re-create the schema so every test starts from an empty database.
+
+    Returns:
+        None
+    """
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    run(reset())
+
+
+# --------------------------------------------------------------------------------
+async def seed(users: dict[int, str | None], registrations: dict[tuple[int, str], str] = None,
+               events: tuple[str, ...] = (EVENT,)) -> None:
+    """
+    Insert events, users and their registrations.
+
+    Args:
+        users (dict[int, str | None]): Delivery status by user ID.
+        registrations (dict[tuple[int, str], str]): Status by (user ID, event name).
+        events (tuple[str, ...]): Names of in-progress events.
+
+    Returns:
+        None
+    """
+    async with async_session() as session:
+        session.add_all(
+            Event(name=name, desc=name, date="01.01.30", time="18:00", place="ауд. 101", status="in_progress")
+            for name in events
+        )
+        session.add_all(
+            User(id=user_id, handler=f"user{user_id}", delivery_status=status)
+            for user_id, status in users.items()
+        )
+        await session.flush()
+        session.add_all(
+            UserXEvent(user_id=user_id, event_name=event_name, status=status, first_contact="0")
+            for (user_id, event_name), status in (registrations or {}).items()
+        )
+        await session.commit()
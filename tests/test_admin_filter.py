@@ -0,0 +1,69 @@
+"""
+Admin Filter Tests
+Router-level superuser gate of admin callbacks.
+"""
+# --------------------------------------------------------------------------------
+import itertools
+
+import pytest
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery, Update
+
+from bot_instance import bot
+from database.role_cache import role_cache
+from main import register_routers
+
+SUPERUSER_ID = 1
+USER_ID = 2
+
+_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="module")
+def dispatcher():
+    """
+    Dispatcher with the production routers; routers attach to one parent only.
+
+    Returns:
+        Dispatcher: Dispatcher instance.
+    """
+    dp = Dispatcher()
+    register_routers(dp)
+    return dp
+
+
+def _press(user_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": next(_ids),
+        "callback_query": {
+            "id": str(next(_ids)),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Тест"},
+            "chat_instance": "test",
+            "data": data,
+        },
+    }, context={"bot": bot})
+
+
+# --------------------------------------------------------------------------------
+@pytest.mark.parametrize("user_id, handled_by_admin", [(SUPERUSER_ID, True), (USER_ID, False)])
+def test_admin_callbacks_need_superuser(run, dispatcher, monkeypatch, user_id, handled_by_admin):
+    monkeypatch.setattr(role_cache, "_superusers", frozenset({SUPERUSER_ID}))
+    admin_replies, answers = [], []
+
+    async def fake_send(bot, target, text, *args, **kwargs):
+        admin_replies.append(text)
+
+    async def fake_answer(self, text=None, **kwargs):
+        answers.append(text)
+
+    monkeypatch.setattr("handlers.admin.safe_send_message", fake_send)
+    monkeypatch.setattr(CallbackQuery, "answer", fake_answer)
+
+    run(dispatcher.feed_update(bot, _press(user_id, "post_to_all")))
+
+    if handled_by_admin:
+        assert admin_replies and not answers
+    else:
+        # Falls through every router to the logged fallback
+        assert not admin_replies
+        assert answers == ["Кнопка устарела, вызовите меню заново"]
@@ -0,0 +1,94 @@
+"""
+Check-in Tests
+Conditional check-in UPDATE and the write-behind check-in cache.
+"""
+# --------------------------------------------------------------------------------
+import asyncio
+
+from sqlalchemy import select
+
+from conftest import EVENT, seed
+from database.checkin_cache import CheckInCache
+from database.models import UserXEvent, async_session
+from database.req import check_in, mark_no_shows
+
+
+async def _status(user_id: int, event_name: str = EVENT) -> str:
+    async with async_session() as session:
+        return await session.scalar(
+            select(UserXEvent.status).where(UserXEvent.user_id == user_id, UserXEvent.event_name == event_name)
+        )
+
+
+# --------------------------------------------------------------------------------
+def test_concurrent_check_in_has_one_winner(db, run):
+    run(seed({1: None}, {(1, EVENT): 'reg'}))
+
+    async def scan_many():
+        return await asyncio.gather(*(check_in([(1, EVENT)]) for _ in range(20)))
+
+    results = run(scan_many())
+    assert None not in results
+    assert sum(1 for result in results if result) == 1
+    assert [result for result in results if result] == [[(1, EVENT)]]
+    assert run(_status(1)) == 'been'
+
+
+def test_check_in_only_changes_reg_rows(db, run):
+    run(seed({1: None, 2: None, 3: None}, {(1, EVENT): 'reg', (2, EVENT): 'nbeen', (3, EVENT): 'been'}))
+
+    checked_in = run(check_in([(1, EVENT), (2, EVENT), (3, EVENT), (4, EVENT)]))
+
+    assert checked_in == [(1, EVENT)]
+    assert run(_status(2)) == 'nbeen'
+    assert run(_status(3)) == 'been'
+
+
+# --------------------------------------------------------------------------------
+def test_cache_flush_confirms_and_rejects(db, run):
+    run(seed({1: None, 2: None}, {(1, EVENT): 'reg', (2, EVENT): 'reg'}))
+    cache = CheckInCache()
+    confirmed, rejected = [], []
+
+    async def on_confirmed(*args):
+        confirmed.append(args)
+
+    async def on_rejected(*args):
+        rejected.append(args)
+
+    cache.on_check_in(on_confirmed)
+    cache.on_check_in_rejected(on_rejected)
+    assert run(cache.load())
+
+    assert cache.mark_been(1, EVENT, 99) is True
+    assert cache.mark_been(2, EVENT, 99) is True
+    assert cache.mark_been(1, EVENT, 99) is False
+    # Closed in the database before the write-behind flush
+    run(mark_no_shows(EVENT, [2]))
+    run(cache.flush())
+
+    assert confirmed == [(1, EVENT, 99)]
+    assert rejected == [(2, EVENT, 99)]
+    assert run(_status(1)) == 'been'
+    assert run(_status(2)) == 'nbeen'
+    # The rejected pair is no longer answered from memory
+    assert cache.mark_been(2, EVENT, 99) is None
+    assert cache.lookup(2, EVENT, 99) is None
+
+
+def test_cache_keeps_check_ins_queued_while_database_fails(db, run, monkeypatch):
+    run(seed({1: None}, {(1, EVENT): 'reg'}))
+    cache = CheckInCache()
+    assert run(cache.load())
+    cache.mark_been(1, EVENT, 99)
+
+    async def unavailable(pairs):
+        return None
+
+    monkeypatch.setattr("database.checkin_cache.check_in", unavailable)
+    run(cache.flush())
+    assert run(_status(1)) == 'reg'
+
+    monkeypatch.undo()
+    run(cache.flush())
+    assert run(_status(1)) == 'been'
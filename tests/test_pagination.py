@@ -0,0 +1,112 @@
+"""
+Pagination Tests
+Keyset pagination boundaries and the unregistered-users anti-join.
+"""
+# --------------------------------------------------------------------------------
+import pytest
+from sqlalchemy import select
+
+from conftest import EVENT, seed
+from database.models import User, UserXEvent, async_session
+from database.req import _paginate, iter_users_tg_id, unreg_users_query
+from errors.errors import DatabaseConnectionError
+
+OTHER_EVENT = "event02_01_30"
+
+
+async def _pages(iterator) -> list[list]:
+    return [page async for page in iterator]
+
+
+# --------------------------------------------------------------------------------
+@pytest.mark.parametrize("count, page_size, sizes", [
+    (0, 3, []),
+    (1, 3, [1]),
+    (3, 3, [3]),
+    (4, 3, [3, 1]),
+    (6, 3, [3, 3]),
+    (7, 3, [3, 3, 1]),
+])
+def test_page_boundaries(db, run, count, page_size, sizes):
+    run(seed({user_id: None for user_id in range(1, count + 1)}))
+
+    pages = run(_pages(_paginate(select(User.id), User.id, page_size)))
+
+    assert [len(page) for page in pages] == sizes
+    assert [user_id for page in pages for user_id in page] == list(range(1, count + 1))
+
+
+def test_resume_after_key(db, run):
+    run(seed({user_id: None for user_id in (5, 10, 15, 20, 25)}))
+
+    pages = run(_pages(_paginate(select(User.id), User.id, 2, after=10)))
+
+    assert pages == [[15, 20], [25]]
+
+
+def test_dead_users_are_skipped(db, run):
+    run(seed({1: None, 2: 'blocked', 3: None}))
+
+    assert run(_pages(iter_users_tg_id(page_size=10))) == [[1, 3]]
+    assert run(_pages(iter_users_tg_id(include_dead=True, page_size=10))) == [[1, 2, 3]]
+
+
+def test_failed_page_raises(db, run, monkeypatch):
+    run(seed({user_id: None for user_id in range(1, 5)}))
+    calls = []
+
+    async def flaky(query, key, after, limit):
+        calls.append(after)
+        return [1, 2] if after is None else None
+
+    monkeypatch.setattr("database.req._fetch_page", flaky)
+
+    async def consume():
+        pages = []
+        async for page in _paginate(select(User.id), User.id, 2):
+            pages.append(page)
+        return pages
+
+    with pytest.raises(DatabaseConnectionError):
+        run(consume())
+    assert calls == [None, 2]
+
+
+# --------------------------------------------------------------------------------
+def _not_in_query(event_name: str, include_dead: bool):
+    """The NOT IN query unreg_users_query replaced."""
+    registered = select(UserXEvent.user_id).where(UserXEvent.event_name == event_name)
+    query = select(User.id).where(User.id.not_in(registered))
+    if not include_dead:
+        query = query.where(User.delivery_status.is_(None))
+    return query
+
+
+@pytest.mark.parametrize("include_dead", [False, True])
+def test_unreg_anti_join_matches_not_in(db, run, include_dead):
+    users = {user_id: ('blocked' if user_id % 5 == 0 else None) for user_id in range(1, 41)}
+    registrations = {}
+    for user_id in range(1, 41):
+        if user_id % 2 == 0:
+            registrations[(user_id, EVENT)] = 'reg' if user_id % 4 else 'been'
+        if user_id % 3 == 0:
+            registrations[(user_id, OTHER_EVENT)] = 'reg'
+    run(seed(users, registrations, events=(EVENT, OTHER_EVENT)))
+
+    async def ids(query):
+        async with async_session() as session:
+            return sorted((await session.execute(query)).scalars().all())
+
+    expected = run(ids(_not_in_query(EVENT, include_dead)))
+    assert expected
+    assert run(ids(unreg_users_query(EVENT, include_dead))) == expected
+
+
+def test_unreg_anti_join_ignores_other_events(db, run):
+    run(seed({1: None, 2: None}, {(1, OTHER_EVENT): 'reg'}, events=(EVENT, OTHER_EVENT)))
+
+    async def ids():
+        async with async_session() as session:
+            return sorted((await session.execute(unreg_users_query(EVENT))).scalars().all())
+
+    assert run(ids()) == [1, 2]
@@ -0,0 +1,67 @@
+"""
+QR Token Tests
+Signed start payloads of event passes.
+"""
+# --------------------------------------------------------------------------------
+import base64
+
+import pytest
+
+from handlers.qr_utils import QR_TOKEN_PREFIX, event_key, make_qr_token, parse_qr_token
+
+
+def _raw(token: str) -> bytes:
+    encoded = token[len(QR_TOKEN_PREFIX):]
+    return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+
+
+def _encode(raw: bytes) -> str:
+    return QR_TOKEN_PREFIX + base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+# --------------------------------------------------------------------------------
+@pytest.mark.parametrize("user_id", [0, 1, 255, 256, 123456789, 2 ** 40 + 7])
+def test_round_trip(user_id):
+    token = make_qr_token(user_id, "event01_01_30")
+
+    assert token.startswith(QR_TOKEN_PREFIX)
+    assert parse_qr_token(token) == (event_key("event01_01_30"), user_id)
+
+
+def test_token_fits_start_parameter():
+    token = make_qr_token(2 ** 40, "event01_01_30" * 10)
+
+    # Telegram deep link payloads are limited to 64 characters of [A-Za-z0-9_-]
+    assert len(token) <= 64
+    assert all(char.isalnum() or char in "_-" for char in token)
+
+
+def test_events_have_distinct_keys():
+    assert parse_qr_token(make_qr_token(1, "event01_01_30"))[0] != event_key("event02_01_30")
+
+
+# --------------------------------------------------------------------------------
+def test_tampered_user_id_is_rejected():
+    raw = bytearray(_raw(make_qr_token(1000, "event01_01_30")))
+    raw[5] ^= 0x01
+
+    assert parse_qr_token(_encode(bytes(raw))) is None
+
+
+def test_tampered_signature_is_rejected():
+    raw = bytearray(_raw(make_qr_token(1000, "event01_01_30")))
+    raw[-1] ^= 0x80
+
+    assert parse_qr_token(_encode(bytes(raw))) is None
+
+
+@pytest.mark.parametrize("payload", [
+    "",
+    "reg_event01_01_30",
+    QR_TOKEN_PREFIX,
+    QR_TOKEN_PREFIX + "!!!",
+    QR_TOKEN_PREFIX + "AAAA",
+    QR_TOKEN_PREFIX + "A" * 22,
+])
+def test_malformed_payloads_are_rejected(payload):
+    assert parse_qr_token(payload) is None